@@ -11,10 +11,17 @@ from enum import Enum
 import json
 import ast
 import logging
-from pymongo import MongoClient
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+from database import async_collections, register_indexes
 
 logger = logging.getLogger(__name__)
 
+register_indexes("marketplace_agents", IndexModel([("agent_id", ASCENDING)]))
+register_indexes("agent_installations", IndexModel([("agent_id", ASCENDING), ("user_id", ASCENDING)]))
+register_indexes("agent_analytics", IndexModel([("agent_id", ASCENDING), ("period", ASCENDING), ("date", DESCENDING)]))
+register_indexes("agent_developers", IndexModel([("developer_id", ASCENDING)]))
+
 class AgentStatus(Enum):
     """Agent lifecycle status"""
     DRAFT = "draft"
@@ -95,8 +102,8 @@ class AgentReview:
 class AgentMarketplace:
     """Community agent creation and sharing platform"""
     
-    def __init__(self, db_client: MongoClient):
-        self.db = db_client.aether_browser
+    def __init__(self):
+        self.db = async_collections.db
         self.agents_collection = self.db.marketplace_agents
         self.reviews_collection = self.db.agent_reviews
         self.analytics_collection = self.db.agent_analytics
@@ -166,7 +173,7 @@ class AgentMarketplace:
             agent_doc["status"] = agent.status.value
             agent_doc["security_level"] = agent.security_level.value
             
-            self.agents_collection.insert_one(agent_doc)
+            await self.agents_collection.insert_one(agent_doc)
             
             # Initialize developer profile if new
             await self._ensure_developer_profile(developer_id)
@@ -217,14 +224,14 @@ class AgentMarketplace:
                 ]
             
             # Execute search with ranking
-            agents = list(self.agents_collection.find(
+            agents = await self.agents_collection.find(
                 search_criteria,
                 {"_id": 0}
             ).sort([
                 ("rating", -1),      # Higher rated first
                 ("usage_count", -1), # More popular first
                 ("created_at", -1)   # Newer first
-            ]).limit(20))
+            ]).limit(20).to_list(20)
             
             # Calculate relevance scores
             for agent in agents:
@@ -253,7 +260,7 @@ class AgentMarketplace:
         """Install agent for user"""
         try:
             # Get agent details
-            agent_doc = self.agents_collection.find_one({"agent_id": agent_id})
+            agent_doc = await self.agents_collection.find_one({"agent_id": agent_id})
             if not agent_doc:
                 return {"success": False, "error": "Agent not found"}
             
@@ -278,10 +285,10 @@ class AgentMarketplace:
                 "active": True
             }
             
-            self.db.agent_installations.insert_one(installation)
+            await self.db.agent_installations.insert_one(installation)
             
             # Update agent stats
-            self.agents_collection.update_one(
+            await self.agents_collection.update_one(
                 {"agent_id": agent_id},
                 {"$inc": {"download_count": 1}}
             )
@@ -302,7 +309,7 @@ class AgentMarketplace:
         """Execute installed agent"""
         try:
             # Check if user has agent installed
-            installation = self.db.agent_installations.find_one({
+            installation = await self.db.agent_installations.find_one({
                 "agent_id": agent_id,
                 "user_id": user_id,
                 "active": True
@@ -312,7 +319,7 @@ class AgentMarketplace:
                 return {"success": False, "error": "Agent not installed or inactive"}
             
             # Get agent details
-            agent_doc = self.agents_collection.find_one({"agent_id": agent_id})
+            agent_doc = await self.agents_collection.find_one({"agent_id": agent_id})
             if not agent_doc:
                 return {"success": False, "error": "Agent not found"}
             
@@ -325,7 +332,7 @@ class AgentMarketplace:
             await self._record_agent_usage(agent_id, execution_result)
             
             # Update usage count
-            self.agents_collection.update_one(
+            await self.agents_collection.update_one(
                 {"agent_id": agent_id},
                 {"$inc": {"usage_count": 1}}
             )
@@ -348,7 +355,7 @@ class AgentMarketplace:
             validation_result = await self.security_validator.validate_agent(agent)
             
             # Update agent with results
-            self.agents_collection.update_one(
+            await self.agents_collection.update_one(
                 {"agent_id": agent.agent_id},
                 {
                     "$set": {
@@ -364,7 +371,7 @@ class AgentMarketplace:
         except Exception as e:
             logger.error(f"Security validation error: {e}")
             # Mark as rejected on validation failure
-            self.agents_collection.update_one(
+            await self.agents_collection.update_one(
                 {"agent_id": agent.agent_id},
                 {
                     "$set": {
@@ -439,7 +446,7 @@ class AgentMarketplace:
             today = datetime.utcnow().date().isoformat()
             
             # Update daily analytics
-            self.analytics_collection.update_one(
+            await self.analytics_collection.update_one(
                 {"agent_id": agent_id, "period": "daily", "date": today},
                 {
                     "$inc": {
@@ -457,7 +464,7 @@ class AgentMarketplace:
     async def _ensure_developer_profile(self, developer_id: str):
         """Ensure developer profile exists"""
         try:
-            existing = self.developers_collection.find_one({"developer_id": developer_id})
+            existing = await self.developers_collection.find_one({"developer_id": developer_id})
             if not existing:
                 profile = {
                     "developer_id": developer_id,
@@ -467,7 +474,7 @@ class AgentMarketplace:
                     "total_earnings": 0.0,
                     "reputation_score": 0.0
                 }
-                self.developers_collection.insert_one(profile)
+                await self.developers_collection.insert_one(profile)
         except Exception as e:
             logger.warning(f"Developer profile creation error: {e}")
 
@@ -592,7 +599,7 @@ class RevenueManager:
             "status": "completed"
         }
         
-        self.db.payment_transactions.insert_one(transaction)
+        await self.db.payment_transactions.insert_one(transaction)
         
         return {
             "success": True,
@@ -602,9 +609,9 @@ class RevenueManager:
 
 
 # Initialize functions for integration
-def initialize_agent_marketplace(db_client: MongoClient) -> AgentMarketplace:
+def initialize_agent_marketplace() -> AgentMarketplace:
     """Initialize and return agent marketplace"""
-    return AgentMarketplace(db_client)
+    return AgentMarketplace()
 
 def get_agent_marketplace() -> Optional[AgentMarketplace]:
     """Get the global agent marketplace instance"""
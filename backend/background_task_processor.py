@@ -2,21 +2,46 @@ import asyncio
 import json
 import logging
 import uuid
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, Iterable, Set
+from collections import defaultdict
 from datetime import datetime, timedelta
 from enum import Enum
 from dataclasses import dataclass, asdict
-from pymongo import MongoClient
+from pymongo import MongoClient, IndexModel, ReturnDocument, ASCENDING, DESCENDING
 import time
 import threading
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
-import multiprocessing
 import queue
 import signal
+import socket
 import os
 
+from database import async_collections, register_indexes
+from write_behind import write_behind
+from task_dependency_graph import TaskDependencyGraph
+from task_scheduler import WeightedFairScheduler
+from task_execution import ExecutionClass, ExecutorConfig, TaskExecutor
+from task_quota import TaskQuotaCounters
+import task_workloads
+from task_broker import BrokerMessage, TaskBroker, create_broker
+
 logger = logging.getLogger(__name__)
 
+register_indexes(
+    "background_tasks",
+    IndexModel([("task_id", ASCENDING)], unique=True),
+    IndexModel([("status", ASCENDING), ("scheduled_at", ASCENDING)]),
+    IndexModel([("status", ASCENDING), ("completed_at", ASCENDING)]),
+    IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)]),
+    IndexModel([("depends_on", ASCENDING), ("status", ASCENDING)]),
+    IndexModel([("user_session", ASCENDING), ("status", ASCENDING)]),
+    IndexModel([("status", ASCENDING), ("priority", ASCENDING)])
+)
+register_indexes(
+    "task_execution_logs",
+    IndexModel([("user_session", ASCENDING), ("logged_at", DESCENDING), ("_id", DESCENDING)]),
+    IndexModel([("logged_at", DESCENDING), ("_id", DESCENDING)])
+)
+
 class TaskStatus(Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -73,34 +98,92 @@ class BackgroundTask:
         if self.depends_on is None:
             self.depends_on = []
 
+class TaskQuotaExceeded(Exception):
+    """Raised by submit_task instead of blocking when a queue or per-user quota is full.
+
+    Carries an HTTP-style status_code (429) and a retry_after hint in seconds
+    for API layers to pass through.
+    """
+    status_code = 429
+
+    def __init__(self, message: str, retry_after: int = 5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+# Concurrency caps for task types that contend for a shared resource
+DEFAULT_TYPE_LIMITS = {
+    TaskType.DATABASE_MAINTENANCE: 1,
+    TaskType.FILE_PROCESSING: 4,
+    TaskType.REPORT_GENERATION: 4
+}
+
+# Where each task type's work runs; types not listed run on the event loop
+TASK_EXECUTION_CLASSES = {
+    TaskType.DATA_ANALYSIS: ExecutionClass.PROCESS,
+    TaskType.REPORT_GENERATION: ExecutionClass.PROCESS,
+    TaskType.FILE_PROCESSING: ExecutionClass.THREAD
+}
+
 class BackgroundTaskProcessor:
     """Advanced background task processing system with parallel execution and intelligent scheduling"""
     
-    def __init__(self, db_client: MongoClient, max_workers: int = None):
-        self.db = db_client.aether_browser
+    def __init__(self, db_client: Optional[MongoClient] = None, max_workers: int = None,
+                 type_limits: Optional[Dict[TaskType, int]] = None,
+                 user_queued_limit: Optional[int] = 100, user_running_limit: Optional[int] = None,
+                 execution_classes: Optional[Dict[TaskType, ExecutionClass]] = None,
+                 broker: Optional[TaskBroker] = None, lease_seconds: int = 60):
+        self.db = async_collections
         self.tasks_collection = self.db.background_tasks
         self.task_logs = self.db.task_execution_logs
         
         # Worker configuration
         self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
-        self.max_process_workers = max(1, (os.cpu_count() or 1) // 2)
-        
-        # Execution pools
-        self.thread_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bg_task")
-        self.process_pool = ProcessPoolExecutor(max_workers=self.max_process_workers)
-        
-        # Task queues by priority
-        self.task_queues = {
-            TaskPriority.URGENT: asyncio.Queue(maxsize=50),
-            TaskPriority.CRITICAL: asyncio.Queue(maxsize=100),
-            TaskPriority.HIGH: asyncio.Queue(maxsize=200),
-            TaskPriority.NORMAL: asyncio.Queue(maxsize=500),
-            TaskPriority.LOW: asyncio.Queue(maxsize=1000)
-        }
+        executor_config = ExecutorConfig.from_env()
+        executor_config.max_threads = self.max_workers
+        self.max_process_workers = executor_config.max_processes
+        
+        # Execution pools for thread- and process-class task types
+        self.execution_classes = {**TASK_EXECUTION_CLASSES, **(execution_classes or {})}
+        self.executor = TaskExecutor(executor_config)
+        
+        # Per-user quotas; tasks without a user_session are exempt
+        self.user_queued_limit = user_queued_limit
+        self.user_running_limit = user_running_limit or max(1, self.max_workers // 2)
+        
+        # One weighted-fair ready queue across priorities feeding a shared worker pool
+        self.scheduler = WeightedFairScheduler(
+            TaskPriority,
+            max_queued={
+                TaskPriority.URGENT: 50,
+                TaskPriority.CRITICAL: 100,
+                TaskPriority.HIGH: 200,
+                TaskPriority.NORMAL: 500,
+                TaskPriority.LOW: 1000
+            },
+            type_limits=DEFAULT_TYPE_LIMITS if type_limits is None else type_limits,
+            user_running_limit=self.user_running_limit
+        )
+        self.worker_slots: Optional[asyncio.Semaphore] = None
+        self.free_worker_ids: List[int] = []
+        
+        # Cluster mode: a shared broker feeds every node; None keeps queues node-local
+        self.broker = broker if broker is not None else create_broker()
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.broker_messages: Dict[str, BrokerMessage] = {}  # task_id -> delivery held by this node
+        self.quota = TaskQuotaCounters(self.db.task_quota_counters)  # cluster-wide waiting counts
+        self.quota_reconcile_seconds = 600
+        self.last_quota_reconcile = time.monotonic()
+        self.capacity_available = asyncio.Event()
         
         # Runtime state
         self.running_tasks = {}  # task_id -> task_context
         self.completed_tasks = {}  # task_id -> result
+        self.queued_task_ids: Set[str] = set()  # in a priority queue, not yet picked up
+        self.reserved_slots: Set[str] = set()  # submitted tasks holding room in their priority queue
+        self.waiting_users: Dict[str, str] = {}  # local mode: task_id -> user of accepted tasks not yet started
+        self.waiting_by_user: Dict[str, int] = defaultdict(int)
+        self.dependency_graph = TaskDependencyGraph()  # tasks waiting on depends_on
         self.task_handlers = self._initialize_task_handlers()
         
         # Statistics
@@ -110,6 +193,9 @@ class BackgroundTaskProcessor:
             "failed_tasks": 0,
             "average_execution_time": 0.0,
             "tasks_by_type": {},
+            "rejected_tasks": 0,
+            "claim_conflicts": 0,
+            "reclaimed_tasks": 0,
             "worker_utilization": 0.0
         }
         
@@ -118,7 +204,10 @@ class BackgroundTaskProcessor:
         self.shutdown_requested = False
         
         # Background workers
-        self.worker_tasks = []
+        self.worker_tasks: Set[asyncio.Task] = set()  # executions in flight
+        self.dispatcher_task = None
+        self.consumer_task = None
+        self.heartbeat_task = None
         self.scheduler_task = None
         self.monitor_task = None
         
@@ -147,14 +236,13 @@ class BackgroundTaskProcessor:
         
         logger.info(f"Starting background task processor with {self.max_workers} workers")
         
-        # Start worker tasks for each priority level
-        for priority in TaskPriority:
-            worker_count = self._get_worker_count_for_priority(priority)
-            for i in range(worker_count):
-                worker_task = asyncio.create_task(
-                    self._worker(priority, f"{priority.name.lower()}_worker_{i}")
-                )
-                self.worker_tasks.append(worker_task)
+        # Start the dispatcher feeding the shared worker pool
+        self.worker_slots = asyncio.Semaphore(self.max_workers)
+        self.free_worker_ids = list(range(self.max_workers - 1, -1, -1))
+        self.dispatcher_task = asyncio.create_task(self._dispatcher())
+        if self.broker is not None:
+            self.consumer_task = asyncio.create_task(self._broker_consumer())
+        self.heartbeat_task = asyncio.create_task(self._heartbeat())
         
         # Start scheduler and monitor
         self.scheduler_task = asyncio.create_task(self._task_scheduler())
@@ -163,7 +251,8 @@ class BackgroundTaskProcessor:
         # Load pending tasks from database
         await self._load_pending_tasks()
         
-        logger.info(f"Background task processor started with {len(self.worker_tasks)} workers")
+        logger.info(f"Background task processor {self.node_id} started with a pool of {self.max_workers} workers"
+                    f" ({'broker: ' + type(self.broker).__name__ if self.broker else 'local queues'})")
     
     async def stop(self, timeout: int = 30):
         """Stop the background task processor gracefully"""
@@ -173,7 +262,10 @@ class BackgroundTaskProcessor:
         logger.info("Stopping background task processor...")
         self.shutdown_requested = True
         
-        # Cancel all worker tasks
+        # Stop dispatching, then interrupt executions in flight; they return to the queue
+        for loop_task in (self.dispatcher_task, self.consumer_task, self.heartbeat_task):
+            if loop_task:
+                loop_task.cancel()
         for worker_task in self.worker_tasks:
             worker_task.cancel()
         
@@ -186,41 +278,61 @@ class BackgroundTaskProcessor:
         # Wait for tasks to complete or timeout
         try:
             await asyncio.wait_for(
-                asyncio.gather(*self.worker_tasks, return_exceptions=True), 
+                asyncio.gather(self.dispatcher_task, *self.worker_tasks, return_exceptions=True), 
                 timeout=timeout
             )
         except asyncio.TimeoutError:
             logger.warning("Some background tasks did not complete within timeout")
         
-        # Shutdown thread pools
-        self.thread_pool.shutdown(wait=True)
-        self.process_pool.shutdown(wait=True)
+        # Shutdown thread and process pools
+        self.executor.shutdown(wait=True)
+        
+        # Unacked deliveries become visible to other nodes after the visibility timeout
+        if self.broker is not None:
+            await self.broker.close()
+        
+        # Write out buffered execution logs
+        await write_behind.flush("task_execution_logs")
         
         self.is_running = False
         self.worker_tasks.clear()
         
         logger.info("Background task processor stopped")
     
-    def _get_worker_count_for_priority(self, priority: TaskPriority) -> int:
-        """Get worker count based on priority level"""
-        if priority == TaskPriority.URGENT:
-            return 3
-        elif priority == TaskPriority.CRITICAL:
-            return 2
-        elif priority == TaskPriority.HIGH:
-            return 2
-        elif priority == TaskPriority.NORMAL:
-            return max(2, self.max_workers // 4)
-        else:  # LOW
-            return 1
-    
     async def submit_task(self, task_type: TaskType, parameters: Dict[str, Any], 
                          priority: TaskPriority = TaskPriority.NORMAL,
                          user_session: str = None, depends_on: List[str] = None,
                          scheduled_at: datetime = None, **kwargs) -> str:
-        """Submit a new background task"""
+        """Submit a new background task; raises TaskQuotaExceeded rather than waiting for queue space"""
         
         task_id = str(uuid.uuid4())
+        if self.broker is not None:
+            await self._check_quota(priority, user_session)
+        else:
+            self._reserve_local(task_id, priority, user_session)
+        
+        try:
+            await self._accept_task(task_id, task_type, parameters, priority, user_session,
+                                    depends_on, scheduled_at, **kwargs)
+        except BaseException:
+            self._drop_waiting(task_id)
+            if self.broker is not None:
+                await self.quota.add(user_session, priority.value, -1)
+            raise
+        finally:
+            # Room a task did not use (parked, scheduled for later, failed) goes back
+            if task_id in self.reserved_slots:
+                self.reserved_slots.discard(task_id)
+                await self.scheduler.unreserve(priority)
+        
+        logger.info(f"Submitted background task {task_id}: {task_type.value} (priority: {priority.value})")
+        
+        return task_id
+    
+    async def _accept_task(self, task_id: str, task_type: TaskType, parameters: Dict[str, Any],
+                           priority: TaskPriority, user_session: Optional[str],
+                           depends_on: Optional[List[str]], scheduled_at: Optional[datetime], **kwargs):
+        """Store a submitted task, then queue it or park it until its dependencies complete"""
         
         task = BackgroundTask(
             task_id=task_id,
@@ -241,19 +353,19 @@ class BackgroundTaskProcessor:
         task_doc['priority'] = task.priority.value
         task_doc['status'] = task.status.value
         
-        self.tasks_collection.insert_one(task_doc)
+        await self.tasks_collection.insert_one(task_doc)
         
-        # Add to appropriate queue if ready to execute
-        if self._is_task_ready(task):
-            await self.task_queues[priority].put(task)
+        # Queue now, or park until its dependencies complete
+        states = await self._resolve_dependencies(task.depends_on)
+        failed = [dep_id for dep_id in task.depends_on if states[dep_id] is False]
+        if failed:
+            await self._fail_blocked_tasks([task], failed[0])
+        elif self._park(task, [dep_id for dep_id in task.depends_on if states[dep_id] is None]):
+            await self._dispatch(task)
         
         # Update statistics
         self.stats["total_tasks"] += 1
         self.stats["tasks_by_type"][task_type.value] = self.stats["tasks_by_type"].get(task_type.value, 0) + 1
-        
-        logger.info(f"Submitted background task {task_id}: {task_type.value} (priority: {priority.value})")
-        
-        return task_id
     
     def _is_task_ready(self, task: BackgroundTask) -> bool:
         """Check if task is ready to execute"""
@@ -262,99 +374,421 @@ class BackgroundTaskProcessor:
         if task.scheduled_at and task.scheduled_at > datetime.utcnow():
             return False
         
-        # Check dependencies
-        if task.depends_on:
-            for dep_task_id in task.depends_on:
-                dep_task = self.tasks_collection.find_one({"task_id": dep_task_id})
-                if not dep_task or dep_task["status"] != TaskStatus.COMPLETED.value:
-                    return False
+        # Dependencies: waiting tasks are released by the graph when the last one completes
+        return not self.dependency_graph.is_waiting(task.task_id)
+    
+    async def _resolve_dependencies(self, dependency_ids: Iterable[str],
+                                    known_pending: Set[str] = frozenset()) -> Dict[str, Optional[bool]]:
+        """
+        State of each dependency: True if completed, False if it failed, was
+        cancelled or does not exist, None if it has yet to run. Dependencies
+        not known in memory are looked up with a single query.
+        """
+        
+        states: Dict[str, Optional[bool]] = {}
+        unknown = []
+        for dep_id in set(dependency_ids):
+            finished = self.dependency_graph.finished_state(dep_id)
+            if finished is not None:
+                states[dep_id] = finished
+            elif (dep_id in known_pending or dep_id in self.running_tasks
+                  or dep_id in self.queued_task_ids or self.dependency_graph.is_waiting(dep_id)):
+                states[dep_id] = None
+            else:
+                unknown.append(dep_id)
+        
+        if unknown:
+            found = {}
+            async for doc in self.tasks_collection.find(
+                {"task_id": {"$in": unknown}}, {"_id": 0, "task_id": 1, "status": 1}
+            ):
+                found[doc["task_id"]] = doc["status"]
+            for dep_id in unknown:
+                status = found.get(dep_id)
+                if status == TaskStatus.COMPLETED.value:
+                    states[dep_id] = True
+                elif status is None or status in (TaskStatus.FAILED.value, TaskStatus.CANCELLED.value):
+                    states[dep_id] = False
+                else:
+                    states[dep_id] = None
+        
+        # Completions that landed while the query was in flight
+        for dep_id, state in states.items():
+            if state is None:
+                finished = self.dependency_graph.finished_state(dep_id)
+                if finished is not None:
+                    states[dep_id] = finished
+        
+        return states
+    
+    def _reserve_local(self, task_id: str, priority: TaskPriority, user_session: Optional[str]):
+        """
+        Admit a submission in local mode or reject it up front. Check and
+        reservation happen together without yielding, so concurrent submits
+        cannot all pass; the user's count covers every accepted task not yet
+        started (queued, parked on dependencies, scheduled or retrying), and
+        the reserved queue room means enqueueing the task never waits.
+        """
+        
+        if user_session is not None and self.user_queued_limit is not None:
+            queued = self.waiting_by_user.get(user_session, 0)
+            if queued >= self.user_queued_limit:
+                self.stats["rejected_tasks"] += 1
+                raise TaskQuotaExceeded(
+                    f"User {user_session} already has {queued} queued tasks (limit {self.user_queued_limit})"
+                )
+        
+        if not self.scheduler.reserve(priority):
+            self.stats["rejected_tasks"] += 1
+            raise TaskQuotaExceeded(f"{priority.name} task queue is full")
+        self.reserved_slots.add(task_id)
+        self._hold_waiting(task_id, user_session)
+    
+    def _hold_waiting(self, task_id: str, user_session: Optional[str]):
+        """Count a local task against its user's queued quota until it starts"""
+        
+        if self.broker is None and user_session is not None and task_id not in self.waiting_users:
+            self.waiting_users[task_id] = user_session
+            self.waiting_by_user[user_session] += 1
+    
+    def _drop_waiting(self, task_id: str):
+        user_session = self.waiting_users.pop(task_id, None)
+        if user_session is not None:
+            self.waiting_by_user[user_session] -= 1
+            if not self.waiting_by_user[user_session]:
+                del self.waiting_by_user[user_session]
+    
+    async def _check_quota(self, priority: TaskPriority, user_session: Optional[str]):
+        """
+        Admit a cluster-mode submission or reject it up front. The queues
+        live in the broker, so the user's and the priority's waiting tasks
+        are counted across every node in TaskQuotaCounters, which checks and
+        increments each counter in one atomic update.
+        """
+        
+        full = await self.quota.reserve(user_session, priority.value, self.user_queued_limit,
+                                        self.scheduler.max_queued.get(priority) or None)
+        if full == "user":
+            self.stats["rejected_tasks"] += 1
+            raise TaskQuotaExceeded(
+                f"User {user_session} already has {self.user_queued_limit} queued tasks (limit {self.user_queued_limit})"
+            )
+        if full == "priority":
+            self.stats["rejected_tasks"] += 1
+            raise TaskQuotaExceeded(f"{priority.name} task queue is full")
+    
+    def _park(self, task: BackgroundTask, unmet: List[str]) -> bool:
+        """True if the task can run now; otherwise hold it until its unmet dependencies complete"""
+        
+        if self.broker is not None:
+            # Cluster mode: the task waits in Mongo and whichever node completes
+            # its last dependency publishes it (see _release_dependents)
+            return not unmet
+        return self.dependency_graph.add(task.task_id, task, unmet)
+    
+    async def _dispatch(self, task: BackgroundTask, overflow: bool = False):
+        """Queue a task whose dependencies are met; future-scheduled tasks are left to the scheduler"""
+        
+        if task.scheduled_at and task.scheduled_at > datetime.utcnow():
+            return
+        await self._enqueue(task, overflow)
+    
+    async def _enqueue(self, task: BackgroundTask, overflow: bool = False):
+        """Publish a ready task to the broker, or hand it to this node's scheduler"""
+        
+        if task.task_id in self.queued_task_ids or task.task_id in self.running_tasks:
+            return
+        if self.broker is not None:
+            await self.broker.publish(task.task_id, task.priority.value)
+            return
+        await self._enqueue_local(task, overflow)
+    
+    async def _enqueue_local(self, task: BackgroundTask, overflow: bool = False):
+        """
+        Hand a task to the scheduler unless it is already queued or running.
+        With overflow the task is queued past its priority's cap instead of
+        waiting for room, for callers that hold a worker slot themselves.
+        """
+        
+        if task.task_id in self.queued_task_ids or task.task_id in self.running_tasks:
+            return
+        self.queued_task_ids.add(task.task_id)
+        reserved = task.task_id in self.reserved_slots
+        self.reserved_slots.discard(task.task_id)
+        await self.scheduler.put(task, reserved=reserved, overflow=overflow)
+    
+    async def _release_dependents(self, task_id: str):
+        """Queue the tasks whose last unmet dependency was task_id"""
+        
+        if self.broker is None:
+            # Runs on the completing task's worker slot: waiting here for queue
+            # room that only a free worker can make would deadlock a busy pool.
+            # Dependents were admitted when submitted, so they may overflow the cap
+            for dependent in self.dependency_graph.complete(task_id):
+                await self._dispatch(dependent, overflow=True)
+            return
+        
+        # Cluster mode: dependents may have been submitted on any node
+        self.dependency_graph.complete(task_id)
+        dependents = [
+            self._task_from_doc(task_doc) async for task_doc in self.tasks_collection.find(
+                {"depends_on": task_id, "status": TaskStatus.PENDING.value}
+            )
+        ]
+        if not dependents:
+            return
+        states = await self._resolve_dependencies(dep_id for task in dependents for dep_id in task.depends_on)
+        for dependent in dependents:
+            if all(states[dep_id] for dep_id in dependent.depends_on):
+                await self._dispatch(dependent)
+    
+    async def _fail_dependents(self, task_id: str):
+        """Fail every task that transitively depends on a task that will never complete"""
+        
+        if self.broker is None:
+            blocked = self.dependency_graph.fail(task_id)
+        else:
+            # Cluster mode: walk the dependents in Mongo, one query per level
+            self.dependency_graph.fail(task_id)
+            blocked = []
+            frontier = [task_id]
+            while frontier:
+                level = [
+                    self._task_from_doc(task_doc) async for task_doc in self.tasks_collection.find(
+                        {"depends_on": {"$in": frontier}, "status": TaskStatus.PENDING.value}
+                    )
+                ]
+                blocked.extend(level)
+                frontier = [task.task_id for task in level]
+        if blocked:
+            await self._fail_blocked_tasks(blocked, task_id)
+    
+    async def _fail_blocked_tasks(self, tasks: List[BackgroundTask], dependency_id: str):
+        """Mark tasks failed because a dependency did not complete"""
         
-        return True
+        error_message = f"Dependency {dependency_id} did not complete"
+        for task in tasks:
+            self._drop_waiting(task.task_id)
+            if self.broker is not None:
+                await self.quota.add(task.user_session, task.priority.value, -1)
+        await self.tasks_collection.update_many(
+            {"task_id": {"$in": [task.task_id for task in tasks]}},
+            {"$set": {
+                "status": TaskStatus.FAILED.value,
+                "completed_at": datetime.utcnow(),
+                "error_message": error_message
+            }}
+        )
+        self.stats["failed_tasks"] += len(tasks)
+        logger.warning(f"{len(tasks)} task(s) failed: {error_message}")
+    
+    def _task_from_doc(self, task_doc: Dict[str, Any]) -> BackgroundTask:
+        """Rebuild a BackgroundTask from its background_tasks document"""
+        
+        return BackgroundTask(
+            task_id=task_doc["task_id"],
+            task_type=TaskType(task_doc["task_type"]),
+            priority=TaskPriority(task_doc["priority"]),
+            handler=task_doc["handler"],
+            parameters=task_doc["parameters"],
+            user_session=task_doc.get("user_session"),
+            depends_on=task_doc.get("depends_on", []),
+            max_retries=task_doc.get("max_retries", 3),
+            retry_count=task_doc.get("retry_count", 0),
+            timeout_seconds=task_doc.get("timeout_seconds", 300),
+            scheduled_at=task_doc.get("scheduled_at"),
+            created_at=task_doc.get("created_at"),
+            status=TaskStatus(task_doc["status"])
+        )
     
     async def _load_pending_tasks(self):
         """Load pending tasks from database on startup"""
         
         try:
-            pending_tasks = list(self.tasks_collection.find({
+            pending_tasks = await self.tasks_collection.find({
                 "status": {"$in": [TaskStatus.PENDING.value, TaskStatus.RETRYING.value]}
-            }))
+            }).to_list(None)
             
-            loaded_count = 0
+            tasks = []
             
             for task_doc in pending_tasks:
                 try:
-                    task = BackgroundTask(
-                        task_id=task_doc["task_id"],
-                        task_type=TaskType(task_doc["task_type"]),
-                        priority=TaskPriority(task_doc["priority"]),
-                        handler=task_doc["handler"],
-                        parameters=task_doc["parameters"],
-                        user_session=task_doc.get("user_session"),
-                        depends_on=task_doc.get("depends_on", []),
-                        max_retries=task_doc.get("max_retries", 3),
-                        retry_count=task_doc.get("retry_count", 0),
-                        timeout_seconds=task_doc.get("timeout_seconds", 300),
-                        scheduled_at=task_doc.get("scheduled_at"),
-                        created_at=task_doc.get("created_at"),
-                        status=TaskStatus(task_doc["status"])
-                    )
-                    
-                    if self._is_task_ready(task):
-                        await self.task_queues[task.priority].put(task)
-                        loaded_count += 1
+                    task = self._task_from_doc(task_doc)
+                    tasks.append(task)
+                    self._hold_waiting(task.task_id, task.user_session)
                 
                 except Exception as e:
                     logger.error(f"Error loading task {task_doc.get('task_id', 'unknown')}: {e}")
             
-            if loaded_count > 0:
-                logger.info(f"Loaded {loaded_count} pending tasks from database")
+            # Rebuild the dependency graph: one query for every dependency outside this set
+            pending_ids = {task.task_id for task in tasks}
+            states = await self._resolve_dependencies(
+                (dep_id for task in tasks for dep_id in task.depends_on), pending_ids
+            )
+            
+            ready = []
+            doomed = []
+            for task in tasks:
+                failed = [dep_id for dep_id in task.depends_on if states[dep_id] is False]
+                if failed:
+                    doomed.append((task, failed[0]))
+                elif self._park(task, [dep_id for dep_id in task.depends_on if states[dep_id] is None]):
+                    ready.append(task)
+            
+            # Fail only once the whole graph is built so dependents anywhere in the set are reached
+            for task, dep_id in doomed:
+                await self._fail_blocked_tasks([task], dep_id)
+                await self._fail_dependents(task.task_id)
+            
+            loaded_count = 0
+            for task in ready:
+                if self._is_task_ready(task):
+                    await self._enqueue(task)
+                    loaded_count += 1
+            waiting_count = len(self.dependency_graph)
+            
+            if loaded_count > 0 or waiting_count > 0:
+                logger.info(f"Loaded {loaded_count} pending tasks from database, {waiting_count} waiting on dependencies")
                 
         except Exception as e:
             logger.error(f"Error loading pending tasks: {e}")
     
-    async def _worker(self, priority: TaskPriority, worker_name: str):
-        """Background task worker for specific priority queue"""
+    async def _dispatcher(self):
+        """Take tasks from the scheduler as pool slots free up and run each on its own worker"""
         
-        logger.info(f"Started worker {worker_name} for {priority.name} priority tasks")
+        logger.info(f"Started task dispatcher for {self.max_workers} workers")
         
         while not self.shutdown_requested:
             try:
-                # Get task from queue with timeout
+                # Decide what runs next only once a worker is free
+                await self.worker_slots.acquire()
                 try:
-                    task = await asyncio.wait_for(
-                        self.task_queues[priority].get(), 
-                        timeout=1.0
-                    )
-                except asyncio.TimeoutError:
+                    task = await self.scheduler.get()
+                except BaseException:
+                    self.worker_slots.release()
+                    raise
+                
+                self.queued_task_ids.discard(task.task_id)
+                worker_id = self.free_worker_ids.pop()
+                execution = asyncio.create_task(self._run_worker(task, worker_id))
+                self.worker_tasks.add(execution)
+                execution.add_done_callback(self.worker_tasks.discard)
+                execution.add_done_callback(lambda _: self.capacity_available.set())
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Task dispatcher error: {e}")
+        
+        logger.info("Task dispatcher stopped")
+    
+    async def _run_worker(self, task: BackgroundTask, worker_id: int):
+        """Execute one task on a pool slot and hand the slot back"""
+        
+        try:
+            await self._execute_task(task, f"worker_{worker_id}")
+        except Exception as e:
+            logger.error(f"Worker worker_{worker_id} error: {e}")
+        finally:
+            await self.scheduler.release(task)
+            self.free_worker_ids.append(worker_id)
+            self.worker_slots.release()
+            await self._ack(task.task_id)
+    
+    async def _ack(self, task_id: str):
+        """Ack the broker delivery this node holds for a task, if any"""
+        
+        message = self.broker_messages.pop(task_id, None)
+        if message is not None:
+            try:
+                await self.broker.ack(message)
+            except Exception as e:
+                logger.warning(f"Could not ack task {task_id} with the broker: {e}")
+    
+    async def _broker_consumer(self):
+        """Claim task ids from the broker while this node has free capacity"""
+        
+        logger.info(f"Started broker consumer {self.node_id}")
+        
+        while not self.shutdown_requested:
+            try:
+                # Prefetch no more than this node can start right away
+                self.capacity_available.clear()
+                free = self.max_workers - len(self.worker_tasks) - len(self.queued_task_ids)
+                if free <= 0:
+                    await self.capacity_available.wait()
                     continue
                 
-                # Execute the task
-                await self._execute_task(task, worker_name)
+                messages = await self.broker.claim(self.node_id, free)
+                if messages:
+                    await self._accept_messages(messages)
                 
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                logger.error(f"Worker {worker_name} error: {e}")
-                await asyncio.sleep(1)  # Brief pause on error
+                logger.error(f"Broker consumer error: {e}")
+                await asyncio.sleep(1)  # broker unreachable; don't spin
         
-        logger.info(f"Worker {worker_name} stopped")
+        logger.info("Broker consumer stopped")
+    
+    async def _accept_messages(self, messages: List[BrokerMessage]):
+        """Queue claimed deliveries locally; ack the ones with nothing left to run"""
+        
+        task_docs = {}
+        async for task_doc in self.tasks_collection.find({"task_id": {"$in": [m.task_id for m in messages]}}):
+            task_docs[task_doc["task_id"]] = task_doc
+        
+        for message in messages:
+            task_doc = task_docs.get(message.task_id)
+            if (task_doc is None
+                    or task_doc["status"] not in (TaskStatus.PENDING.value, TaskStatus.RETRYING.value)
+                    or message.task_id in self.broker_messages):
+                # Finished, cancelled, running elsewhere, or a duplicate of a delivery held here
+                await self.broker.ack(message)
+                continue
+            try:
+                task = self._task_from_doc(task_doc)
+            except Exception as e:
+                logger.error(f"Error loading task {message.task_id}: {e}")
+                await self.broker.ack(message)
+                continue
+            if not self._is_task_ready(task):
+                # Due later; the scheduler publishes it again when it is
+                await self.broker.ack(message)
+                continue
+            self.broker_messages[task.task_id] = message
+            await self._enqueue_local(task)
     
     async def _execute_task(self, task: BackgroundTask, worker_name: str):
         """Execute a single background task"""
         
+        self._drop_waiting(task.task_id)
         start_time = time.time()
         task.started_at = datetime.utcnow()
-        task.status = TaskStatus.RUNNING
         
-        # Update task status in database
-        self.tasks_collection.update_one(
-            {"task_id": task.task_id},
+        # Claim the task: only one node moves it from pending/retrying to running
+        claimed = await self.tasks_collection.find_one_and_update(
+            {
+                "task_id": task.task_id,
+                "status": {"$in": [TaskStatus.PENDING.value, TaskStatus.RETRYING.value]},
+                "$or": [{"scheduled_at": None}, {"scheduled_at": {"$lte": task.started_at}}]
+            },
             {"$set": {
-                "status": task.status.value,
+                "status": TaskStatus.RUNNING.value,
                 "started_at": task.started_at,
-                "progress": 0.0
-            }}
+                "progress": 0.0,
+                "claimed_by": self.node_id,
+                "lease_expires_at": task.started_at + timedelta(seconds=self.lease_seconds)
+            }},
+            projection={"_id": 1}
         )
+        if claimed is None:
+            self.stats["claim_conflicts"] += 1
+            logger.info(f"Task {task.task_id} was already claimed, cancelled or finished; skipping")
+            return
+        task.status = TaskStatus.RUNNING
+        if self.broker is not None:
+            await self.quota.add(task.user_session, task.priority.value, -1)
         
         # Add to running tasks
         self.running_tasks[task.task_id] = {
@@ -369,7 +803,8 @@ class BackgroundTaskProcessor:
             # Get task handler
             handler = self.task_handlers.get(task.task_type, self._handle_generic_task)
             
-            # Execute with timeout
+            # Execute with timeout; a timed-out PROCESS run is stopped by recycling
+            # the process pool (see TaskExecutor), so a retry never overlaps it
             result = await asyncio.wait_for(
                 handler(task),
                 timeout=task.timeout_seconds
@@ -383,9 +818,9 @@ class BackgroundTaskProcessor:
             
             execution_time = time.time() - start_time
             
-            # Update database
-            self.tasks_collection.update_one(
-                {"task_id": task.task_id},
+            # Update database; a node whose lease was reclaimed no longer owns the task
+            await self.tasks_collection.update_one(
+                self._owned(task.task_id),
                 {"$set": {
                     "status": task.status.value,
                     "completed_at": task.completed_at,
@@ -403,14 +838,17 @@ class BackgroundTaskProcessor:
             self.completed_tasks[task.task_id] = result
             
             # Log execution
-            self._log_task_execution(task, worker_name, execution_time, True)
+            await self._log_task_execution(task, worker_name, execution_time, True)
+            
+            # Wake dependents whose last dependency this was
+            await self._release_dependents(task.task_id)
             
             logger.info(f"Task {task.task_id} completed successfully in {execution_time:.2f}s")
             
         except asyncio.TimeoutError:
             await self._handle_task_failure(task, "Task execution timeout", worker_name)
         except asyncio.CancelledError:
-            await self._handle_task_cancellation(task, worker_name)
+            await self._release_interrupted_task(task, worker_name)
         except Exception as e:
             await self._handle_task_failure(task, str(e), worker_name)
         
@@ -419,6 +857,11 @@ class BackgroundTaskProcessor:
             if task.task_id in self.running_tasks:
                 del self.running_tasks[task.task_id]
     
+    def _owned(self, task_id: str) -> Dict[str, Any]:
+        """Filter matching a task only while this node holds its claim"""
+        
+        return {"task_id": task_id, "claimed_by": self.node_id}
+    
     async def _handle_task_failure(self, task: BackgroundTask, error_message: str, worker_name: str):
         """Handle task execution failure"""
         
@@ -433,10 +876,11 @@ class BackgroundTaskProcessor:
             # Calculate retry delay (exponential backoff)
             retry_delay = min(300, 5 * (2 ** task.retry_count))  # Max 5 minutes
             task.scheduled_at = datetime.utcnow() + timedelta(seconds=retry_delay)
+            self._hold_waiting(task.task_id, task.user_session)
             
             # Update database
-            self.tasks_collection.update_one(
-                {"task_id": task.task_id},
+            retried = await self.tasks_collection.update_one(
+                self._owned(task.task_id),
                 {"$set": {
                     "status": task.status.value,
                     "retry_count": task.retry_count,
@@ -444,6 +888,8 @@ class BackgroundTaskProcessor:
                     "scheduled_at": task.scheduled_at
                 }}
             )
+            if retried.modified_count and self.broker is not None:
+                await self.quota.add(task.user_session, task.priority.value, 1)
             
             logger.warning(f"Task {task.task_id} failed, retrying in {retry_delay}s (attempt {task.retry_count}/{task.max_retries}): {error_message}")
             
@@ -453,8 +899,8 @@ class BackgroundTaskProcessor:
             task.completed_at = datetime.utcnow()
             
             # Update database
-            self.tasks_collection.update_one(
-                {"task_id": task.task_id},
+            await self.tasks_collection.update_one(
+                self._owned(task.task_id),
                 {"$set": {
                     "status": task.status.value,
                     "completed_at": task.completed_at,
@@ -466,35 +912,52 @@ class BackgroundTaskProcessor:
             self.stats["failed_tasks"] += 1
             
             logger.error(f"Task {task.task_id} failed permanently after {task.retry_count} retries: {error_message}")
+            
+            await self._fail_dependents(task.task_id)
         
         # Log execution
-        self._log_task_execution(task, worker_name, execution_time, False, error_message)
+        await self._log_task_execution(task, worker_name, execution_time, False, error_message)
     
-    async def _handle_task_cancellation(self, task: BackgroundTask, worker_name: str):
-        """Handle task cancellation"""
-        
-        task.status = TaskStatus.CANCELLED
-        task.completed_at = datetime.utcnow()
-        task.error_message = "Task was cancelled"
+    async def _release_interrupted_task(self, task: BackgroundTask, worker_name: str):
+        """
+        Give back a task whose execution was cancelled, e.g. by stop(). It
+        returns to pending (retrying if it had failed before) with its claim
+        and lease cleared, so it runs again here on restart or on another
+        node; dependents keep waiting. CANCELLED is only set by cancel_task.
+        """
+        
+        task.status = TaskStatus.RETRYING if task.retry_count else TaskStatus.PENDING
+        task.started_at = None
+        self._hold_waiting(task.task_id, task.user_session)
+        task.progress = 0.0
         
         execution_time = time.time() - self.running_tasks.get(task.task_id, {}).get("start_time", time.time())
         
-        # Update database
-        self.tasks_collection.update_one(
-            {"task_id": task.task_id},
+        released = await self.tasks_collection.update_one(
+            self._owned(task.task_id),
             {"$set": {
                 "status": task.status.value,
-                "completed_at": task.completed_at,
-                "error_message": task.error_message
+                "started_at": None,
+                "progress": 0.0,
+                "scheduled_at": None,
+                "claimed_by": None,
+                "lease_expires_at": None
             }}
         )
         
-        # Log execution
-        self._log_task_execution(task, worker_name, execution_time, False, "Cancelled")
+        # Other nodes keep consuming; hand the task straight back to them
+        if released.modified_count and self.broker is not None:
+            await self.quota.add(task.user_session, task.priority.value, 1)
+            try:
+                await self.broker.publish(task.task_id, task.priority.value)
+            except Exception as e:
+                logger.warning(f"Could not republish interrupted task {task.task_id}: {e}")
+        
+        await self._log_task_execution(task, worker_name, execution_time, False, "Interrupted")
         
-        logger.info(f"Task {task.task_id} was cancelled")
+        logger.info(f"Task {task.task_id} was interrupted and returned to the queue")
     
-    def _log_task_execution(self, task: BackgroundTask, worker_name: str, 
+    async def _log_task_execution(self, task: BackgroundTask, worker_name: str, 
                           execution_time: float, success: bool, error_message: str = None):
         """Log task execution details"""
         
@@ -515,7 +978,7 @@ class BackgroundTaskProcessor:
                 "logged_at": datetime.utcnow()
             }
             
-            self.task_logs.insert_one(log_entry)
+            await write_behind.insert("task_execution_logs", log_entry)
             
         except Exception as e:
             logger.error(f"Error logging task execution: {e}")
@@ -543,35 +1006,33 @@ class BackgroundTaskProcessor:
                 
                 current_time = datetime.utcnow()
                 
-                # Find scheduled tasks that are ready to run
-                ready_tasks = list(self.tasks_collection.find({
+                # Find scheduled and retrying tasks that are due; unscheduled tasks
+                # are queued on submit or released by the dependency graph
+                ready_tasks = await self.tasks_collection.find({
                     "status": {"$in": [TaskStatus.PENDING.value, TaskStatus.RETRYING.value]},
-                    "$or": [
-                        {"scheduled_at": {"$lte": current_time}},
-                        {"scheduled_at": {"$exists": False}}
-                    ]
-                }))
+                    "scheduled_at": {"$lte": current_time}
+                }).to_list(None)
                 
                 for task_doc in ready_tasks:
+                    if task_doc["task_id"] in self.queued_task_ids or task_doc["task_id"] in self.running_tasks:
+                        continue
                     try:
-                        task = BackgroundTask(
-                            task_id=task_doc["task_id"],
-                            task_type=TaskType(task_doc["task_type"]),
-                            priority=TaskPriority(task_doc["priority"]),
-                            handler=task_doc["handler"],
-                            parameters=task_doc["parameters"],
-                            user_session=task_doc.get("user_session"),
-                            depends_on=task_doc.get("depends_on", []),
-                            max_retries=task_doc.get("max_retries", 3),
-                            retry_count=task_doc.get("retry_count", 0),
-                            timeout_seconds=task_doc.get("timeout_seconds", 300),
-                            scheduled_at=task_doc.get("scheduled_at"),
-                            created_at=task_doc.get("created_at"),
-                            status=TaskStatus(task_doc["status"])
-                        )
+                        task = self._task_from_doc(task_doc)
+                        
+                        if not self._is_task_ready(task):
+                            continue
                         
-                        if self._is_task_ready(task):
-                            await self.task_queues[task.priority].put(task)
+                        if self.broker is not None:
+                            # Every node polls; the one that clears the schedule publishes
+                            taken = await self.tasks_collection.update_one(
+                                {"task_id": task.task_id, "status": task_doc["status"],
+                                 "scheduled_at": task_doc["scheduled_at"]},
+                                {"$set": {"scheduled_at": None}}
+                            )
+                            if not taken.modified_count:
+                                continue
+                        
+                        await self._enqueue(task)
                             
                     except Exception as e:
                         logger.error(f"Error scheduling task {task_doc.get('task_id', 'unknown')}: {e}")
@@ -583,6 +1044,28 @@ class BackgroundTaskProcessor:
         
         logger.info("Background task scheduler stopped")
     
+    async def _heartbeat(self):
+        """Renew the leases of tasks running here and the broker deliveries held here"""
+        
+        interval = max(1, self.lease_seconds // 3)
+        
+        while not self.shutdown_requested:
+            try:
+                await asyncio.sleep(interval)
+                
+                if self.running_tasks:
+                    await self.tasks_collection.update_many(
+                        {"task_id": {"$in": list(self.running_tasks)}, "claimed_by": self.node_id},
+                        {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+                    )
+                if self.broker_messages:
+                    await self.broker.extend(self.node_id, list(self.broker_messages.values()))
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Heartbeat error: {e}")
+    
     async def _task_monitor(self):
         """Background task monitor for health checks and cleanup"""
         
@@ -594,8 +1077,7 @@ class BackgroundTaskProcessor:
                 
                 # Update worker utilization
                 active_workers = len(self.running_tasks)
-                total_workers = len(self.worker_tasks)
-                self.stats["worker_utilization"] = (active_workers / total_workers * 100) if total_workers > 0 else 0
+                self.stats["worker_utilization"] = active_workers / self.max_workers * 100
                 
                 # Clean up old completed tasks
                 await self._cleanup_old_tasks()
@@ -603,15 +1085,19 @@ class BackgroundTaskProcessor:
                 # Monitor stuck tasks
                 await self._monitor_stuck_tasks()
                 
+                # Repair quota counters left off by a node that died mid-transition
+                if (self.broker is not None
+                        and time.monotonic() - self.last_quota_reconcile >= self.quota_reconcile_seconds):
+                    self.last_quota_reconcile = time.monotonic()
+                    await self.quota.reconcile(self.tasks_collection,
+                                               [TaskStatus.PENDING.value, TaskStatus.RETRYING.value])
+                
                 # Update queue sizes in stats
-                queue_sizes = {
-                    priority.name: self.task_queues[priority].qsize() 
-                    for priority in TaskPriority
-                }
+                queue_sizes = self.scheduler.queue_sizes()
                 self.stats["queue_sizes"] = queue_sizes
                 
                 # Log status
-                if self.running_tasks or any(q.qsize() > 0 for q in self.task_queues.values()):
+                if self.running_tasks or any(queue_sizes.values()):
                     logger.info(f"Task processor status: {len(self.running_tasks)} running, queues: {queue_sizes}")
                 
             except asyncio.CancelledError:
@@ -628,7 +1114,7 @@ class BackgroundTaskProcessor:
             # Remove completed tasks older than 24 hours
             cutoff_time = datetime.utcnow() - timedelta(hours=24)
             
-            result = self.tasks_collection.delete_many({
+            result = await self.tasks_collection.delete_many({
                 "status": {"$in": [TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, TaskStatus.CANCELLED.value]},
                 "completed_at": {"$lt": cutoff_time}
             })
@@ -639,7 +1125,7 @@ class BackgroundTaskProcessor:
             # Clean up task logs older than 7 days
             log_cutoff = datetime.utcnow() - timedelta(days=7)
             
-            log_result = self.task_logs.delete_many({
+            log_result = await self.task_logs.delete_many({
                 "logged_at": {"$lt": log_cutoff}
             })
             
@@ -666,9 +1152,55 @@ class BackgroundTaskProcessor:
                     # Mark as failed due to timeout
                     await self._handle_task_failure(task, "Task stuck - exceeded timeout with buffer", context["worker"])
             
+            # Tasks whose node stopped heartbeating
+            await self._reclaim_expired_leases()
+            
         except Exception as e:
             logger.error(f"Stuck task monitoring error: {e}")
     
+    async def _reclaim_expired_leases(self):
+        """Return running tasks whose lease lapsed on another node to the queue as a retry"""
+        
+        now = datetime.utcnow()
+        expired = await self.tasks_collection.find(
+            {"status": TaskStatus.RUNNING.value, "lease_expires_at": {"$lt": now},
+             "claimed_by": {"$ne": self.node_id}},
+            {"_id": 0, "task_id": 1, "claimed_by": 1}
+        ).to_list(None)
+        
+        for expired_doc in expired:
+            # Conditional on the lease still being expired, so one node reclaims each task
+            task_doc = await self.tasks_collection.find_one_and_update(
+                {"task_id": expired_doc["task_id"], "status": TaskStatus.RUNNING.value,
+                 "lease_expires_at": {"$lt": now}},
+                {"$set": {
+                    "status": TaskStatus.RETRYING.value,
+                    "scheduled_at": now,
+                    "claimed_by": None,
+                    "lease_expires_at": None,
+                    "error_message": f"Lease expired on {expired_doc.get('claimed_by')}"
+                }, "$inc": {"retry_count": 1}},
+                return_document=ReturnDocument.AFTER
+            )
+            if task_doc is None:
+                continue
+            
+            task = self._task_from_doc(task_doc)
+            self.stats["reclaimed_tasks"] += 1
+            logger.warning(f"Reclaimed task {task.task_id} from {expired_doc.get('claimed_by')} after its lease expired")
+            
+            if task.retry_count > task.max_retries:
+                await self.tasks_collection.update_one(
+                    {"task_id": task.task_id, "status": TaskStatus.RETRYING.value},
+                    {"$set": {"status": TaskStatus.FAILED.value, "completed_at": now}}
+                )
+                self.stats["failed_tasks"] += 1
+                await self._fail_dependents(task.task_id)
+            else:
+                if self.broker is not None:
+                    await self.quota.add(task.user_session, task.priority.value, 1)
+                await self._enqueue(task)
+    
     # Task Handler Methods
     
     async def _handle_ai_processing(self, task: BackgroundTask) -> Dict[str, Any]:
@@ -779,44 +1311,20 @@ class BackgroundTaskProcessor:
     async def _handle_data_analysis(self, task: BackgroundTask) -> Dict[str, Any]:
         """Handle data analysis tasks"""
         
-        params = task.parameters
-        analysis_type = params.get("type", "basic")
-        
-        await self._update_task_progress(task.task_id, 20.0, "Loading data")
-        await asyncio.sleep(1)
-        
-        await self._update_task_progress(task.task_id, 50.0, "Processing data")
-        await asyncio.sleep(2)
-        
-        await self._update_task_progress(task.task_id, 80.0, "Generating insights")
-        await asyncio.sleep(1)
+        await self._update_task_progress(task.task_id, 20.0, "Processing data")
+        result = await self._run_workload(task, task_workloads.analyze_data)
+        await self._update_task_progress(task.task_id, 90.0, "Insights generated")
         
-        return {
-            "success": True,
-            "analysis_type": analysis_type,
-            "insights": ["Data trend shows upward movement", "Anomalies detected in 3% of records"],
-            "statistics": {"mean": 45.2, "median": 43.1, "std_dev": 12.8},
-            "processed_records": params.get("record_count", 1000)
-        }
+        return result
     
     async def _handle_file_processing(self, task: BackgroundTask) -> Dict[str, Any]:
         """Handle file processing tasks"""
         
-        params = task.parameters
-        file_type = params.get("file_type", "unknown")
+        await self._update_task_progress(task.task_id, 30.0, "Processing file")
+        result = await self._run_workload(task, task_workloads.process_file)
+        await self._update_task_progress(task.task_id, 90.0, "File processed")
         
-        await self._update_task_progress(task.task_id, 30.0, "Reading file")
-        await asyncio.sleep(0.5)
-        
-        await self._update_task_progress(task.task_id, 70.0, "Processing content")
-        await asyncio.sleep(1)
-        
-        return {
-            "success": True,
-            "file_type": file_type,
-            "processed_size": params.get("file_size", "unknown"),
-            "processing_time": 1.5
-        }
+        return result
     
     async def _handle_integration_sync(self, task: BackgroundTask) -> Dict[str, Any]:
         """Handle integration synchronization tasks"""
@@ -866,28 +1374,12 @@ class BackgroundTaskProcessor:
     async def _handle_report_generation(self, task: BackgroundTask) -> Dict[str, Any]:
         """Handle report generation tasks"""
         
-        params = task.parameters
-        report_type = params.get("type", "standard")
-        
-        await self._update_task_progress(task.task_id, 15.0, "Gathering data")
-        await asyncio.sleep(1)
-        
-        await self._update_task_progress(task.task_id, 45.0, "Analyzing data")
-        await asyncio.sleep(1.5)
-        
-        await self._update_task_progress(task.task_id, 75.0, "Generating report")
-        await asyncio.sleep(1)
-        
-        await self._update_task_progress(task.task_id, 95.0, "Formatting report")
-        await asyncio.sleep(0.5)
+        await self._update_task_progress(task.task_id, 15.0, "Generating report")
+        result = await self._run_workload(task, task_workloads.generate_report,
+                                          {**task.parameters, "task_id": task.task_id})
+        await self._update_task_progress(task.task_id, 95.0, "Report written")
         
-        return {
-            "success": True,
-            "report_type": report_type,
-            "pages_generated": params.get("pages", 10),
-            "format": params.get("format", "PDF"),
-            "file_path": f"/tmp/report_{task.task_id}.pdf"
-        }
+        return result
     
     async def _handle_email_processing(self, task: BackgroundTask) -> Dict[str, Any]:
         """Handle email processing tasks"""
@@ -952,11 +1444,18 @@ class BackgroundTaskProcessor:
             "parameters": task.parameters
         }
     
+    async def _run_workload(self, task: BackgroundTask, entry_point: Callable[[Dict[str, Any]], Any],
+                            params: Dict[str, Any] = None) -> Any:
+        """Run a task_workloads entry point on the loop, a thread or a worker process per the task type's class"""
+        
+        execution_class = self.execution_classes.get(task.task_type, ExecutionClass.EVENT_LOOP)
+        return await self.executor.run(entry_point, task.parameters if params is None else params, execution_class)
+    
     async def _update_task_progress(self, task_id: str, progress: float, status_message: str):
         """Update task progress in database and running tasks"""
         
         # Update database
-        self.tasks_collection.update_one(
+        await self.tasks_collection.update_one(
             {"task_id": task_id},
             {"$set": {
                 "progress": progress,
@@ -974,7 +1473,7 @@ class BackgroundTaskProcessor:
     async def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get current task status"""
         
-        task_doc = self.tasks_collection.find_one({"task_id": task_id}, {"_id": 0})
+        task_doc = await self.tasks_collection.find_one({"task_id": task_id}, {"_id": 0})
         
         if task_doc:
             # Convert datetime objects to ISO strings
@@ -993,16 +1492,28 @@ class BackgroundTaskProcessor:
         """Cancel a pending or running task"""
         
         # Update task status to cancelled
-        result = self.tasks_collection.update_one(
+        cancelled = await self.tasks_collection.find_one_and_update(
             {"task_id": task_id, "status": {"$in": [TaskStatus.PENDING.value, TaskStatus.RETRYING.value]}},
             {"$set": {
                 "status": TaskStatus.CANCELLED.value,
                 "completed_at": datetime.utcnow(),
                 "error_message": "Task cancelled by user"
-            }}
+            }},
+            projection={"_id": 0, "user_session": 1, "priority": 1}
         )
         
-        return result.modified_count > 0
+        if cancelled is not None:
+            self._drop_waiting(task_id)
+            if self.broker is not None:
+                await self.quota.add(cancelled.get("user_session"), cancelled["priority"], -1)
+            if await self.scheduler.discard(task_id):
+                self.queued_task_ids.discard(task_id)
+                await self._ack(task_id)
+                self.capacity_available.set()
+            self.dependency_graph.discard(task_id)
+            await self._fail_dependents(task_id)
+        
+        return cancelled is not None
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get task processor statistics"""
@@ -1011,11 +1522,20 @@ class BackgroundTaskProcessor:
         stats.update({
             "is_running": self.is_running,
             "active_workers": len(self.worker_tasks),
+            "max_workers": self.max_workers,
+            "node_id": self.node_id,
+            "broker": self.broker.get_stats() if self.broker is not None else {"backend": "local"},
+            "held_deliveries": len(self.broker_messages),
             "running_tasks": len(self.running_tasks),
-            "queue_sizes": {
-                priority.name: self.task_queues[priority].qsize() 
-                for priority in TaskPriority
-            }
+            "scheduler": self.scheduler.get_stats(),
+            "dependencies": self.dependency_graph.get_stats(),
+            "execution": {
+                **self.executor.get_stats(),
+                "classes": {task_type.value: execution_class.value
+                            for task_type, execution_class in self.execution_classes.items()}
+            },
+            "user_quotas": {"queued": self.user_queued_limit, "running": self.user_running_limit},
+            "queue_sizes": self.scheduler.queue_sizes()
         })
         
         return stats
@@ -1027,18 +1547,21 @@ class BackgroundTaskProcessor:
         if user_session:
             query["user_session"] = user_session
         
-        tasks = list(self.task_logs.find(
+        tasks = await self.task_logs.find(
             query,
             {"_id": 0}
-        ).sort("logged_at", -1).limit(limit))
+        ).sort("logged_at", -1).limit(limit).to_list(limit)
         
-        # Convert datetime objects
-        for task in tasks:
-            for field in ["created_at", "started_at", "completed_at", "logged_at"]:
-                if task.get(field):
-                    task[field] = task[field].isoformat()
+        return [self._format_history_entry(task) for task in tasks]
+    
+    def _format_history_entry(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert datetime objects of a task log entry"""
+        
+        for field in ["created_at", "started_at", "completed_at", "logged_at"]:
+            if task.get(field):
+                task[field] = task[field].isoformat()
         
-        return tasks
+        return task
 
 # Global background task processor instance
 background_task_processor = None  # Will be initialized in server.py
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+AETHER Cache Microbenchmark
+Get/set throughput of AdvancedCacheSystem against task and thread concurrency
+
+Usage:
+    python cache_benchmark.py
+    python cache_benchmark.py --module /tmp/cache_system_before.py   # compare another revision
+    git show <rev>:backend/cache_system.py > /tmp/cache_system_before.py
+
+Async mode uses Redis when REDIS_URL is reachable, so the Redis round trip
+is part of every miss; thread mode always measures the memory tiers alone.
+Compare ops/sec together with the hit rate: a cache that loses entries
+answers misses faster than hits.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import random
+import threading
+import time
+from typing import List
+
+def load_cache_module(path: str = None):
+    if not path:
+        import cache_system
+        return cache_system
+    spec = importlib.util.spec_from_file_location("cache_system_under_test", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def make_value(i: int) -> dict:
+    return {"url": f"https://example.com/page/{i}", "title": f"Page {i}", "content": "x" * 512}
+
+async def run_workers(cache, workers: int, ops: int, keys: int, read_ratio: float) -> float:
+    """Run ops cache operations over `workers` concurrent tasks; returns ops/sec"""
+    per_worker = max(1, ops // workers)
+
+    async def worker(seed: int):
+        rng = random.Random(seed)
+        for _ in range(per_worker):
+            i = rng.randrange(keys)
+            if rng.random() < read_ratio:
+                await cache.get(f"key-{i}", "bench")
+            else:
+                await cache.set(f"key-{i}", make_value(i), 300, "bench")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(seed) for seed in range(workers)))
+    return per_worker * workers / (time.perf_counter() - started)
+
+def run_threads(cache, threads: int, ops: int, keys: int, read_ratio: float) -> float:
+    """Run ops cache operations over `threads` OS threads, each with its own loop"""
+    per_thread = max(1, ops // threads)
+    barrier = threading.Barrier(threads + 1)
+
+    def thread_main(seed: int):
+        async def body():
+            rng = random.Random(seed)
+            for _ in range(per_thread):
+                i = rng.randrange(keys)
+                if rng.random() < read_ratio:
+                    await cache.get(f"key-{i}", "bench")
+                else:
+                    await cache.set(f"key-{i}", make_value(i), 300, "bench")
+        barrier.wait()
+        asyncio.run(body())
+
+    pool = [threading.Thread(target=thread_main, args=(seed,)) for seed in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - started)
+
+async def main(args):
+    module = load_cache_module(args.module)
+    concurrency: List[int] = [int(c) for c in args.concurrency.split(",")]
+    threads: List[int] = [int(t) for t in args.threads.split(",")]
+
+    print(f"module: {args.module or 'cache_system'}  ops: {args.ops}  keys: {args.keys}  reads: {args.read_ratio:.0%}")
+
+    print("\nasyncio tasks (Redis if reachable)")
+    print(f"{'tasks':>8} {'ops/sec':>12} {'hit rate':>9}")
+    for workers in concurrency:
+        cache = module.AdvancedCacheSystem()
+        for i in range(args.keys):
+            await cache.set(f"key-{i}", make_value(i), 300, "bench")
+        rate = await run_workers(cache, workers, args.ops, args.keys, args.read_ratio)
+        print(f"{workers:>8} {rate:>12,.0f} {cache.get_stats()['hit_rate']:>9}   redis={cache.redis_available}")
+
+    print("\nthreads (memory tiers only)")
+    print(f"{'threads':>8} {'ops/sec':>12} {'hit rate':>9}")
+    for count in threads:
+        cache = module.AdvancedCacheSystem()
+        await cache.get("warmup", "bench")  # start background work on the main loop
+        cache.redis_client = None
+        cache.redis_available = False
+        for i in range(args.keys):
+            await cache.set(f"key-{i}", make_value(i), 300, "bench")
+        rate = await asyncio.to_thread(run_threads, cache, count, args.ops, args.keys, args.read_ratio)
+        print(f"{count:>8} {rate:>12,.0f} {cache.get_stats()['hit_rate']:>9}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AdvancedCacheSystem get/set throughput")
+    parser.add_argument("--module", help="path to an alternative cache_system.py to benchmark")
+    parser.add_argument("--ops", type=int, default=50000)
+    parser.add_argument("--keys", type=int, default=1000)
+    parser.add_argument("--read-ratio", type=float, default=0.9)
+    parser.add_argument("--concurrency", default="1,8,64,256")
+    parser.add_argument("--threads", default="1,2,4,8")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,165 @@
+"""
+AETHER Cache Codec
+One-pass value encoding for the memory tiers and Redis: msgpack (or JSON)
+with optional zstd/lz4/zlib compression above a size threshold
+"""
+
+import json
+import logging
+import os
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict
+
+# Optional fast serializers and compressors
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# First byte of every payload: serializer in the high nibble, compression in the low
+SERIALIZERS = {"msgpack": 1, "json": 2}
+COMPRESSIONS = {"none": 0, "zstd": 1, "lz4": 2, "zlib": 3}
+
+def _to_str(value: Any) -> str:
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, default=_to_str, use_bin_type=True)
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+def _json_dumps(value: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, default=_to_str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_to_str, separators=(",", ":")).encode()
+
+def _json_loads(data: bytes) -> Any:
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+@dataclass
+class CodecConfig:
+    """Serializer, compressor and the payload size from which compression is tried"""
+    serializer: str = "msgpack" if MSGPACK_AVAILABLE else "json"
+    compression: str = "zstd" if ZSTD_AVAILABLE else "lz4" if LZ4_AVAILABLE else "none"
+    compress_min_bytes: int = 1024
+    level: int = 3
+
+    @classmethod
+    def from_env(cls) -> "CodecConfig":
+        defaults = cls()
+        return cls(
+            serializer=os.getenv("CACHE_CODEC", defaults.serializer),
+            compression=os.getenv("CACHE_COMPRESSION", defaults.compression),
+            compress_min_bytes=int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024")),
+            level=int(os.getenv("CACHE_COMPRESSION_LEVEL", "3"))
+        )
+
+class CacheCodec:
+    """
+    Encodes cache values to self-describing bytes.
+
+    The header byte records how a payload was written, so any codec instance
+    can decode it whatever its own configuration, provided the libraries
+    used are installed. Compression is kept only when it shrinks the payload.
+    """
+
+    def __init__(self, config: CodecConfig = None):
+        self.config = config or CodecConfig.from_env()
+
+        if self.config.serializer == "msgpack" and not MSGPACK_AVAILABLE:
+            logger.warning("⚠️ msgpack not installed, cache codec falls back to JSON")
+            self.config.serializer = "json"
+        if self.config.serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown cache serializer: {self.config.serializer}")
+        if (self.config.compression == "zstd" and not ZSTD_AVAILABLE) or \
+                (self.config.compression == "lz4" and not LZ4_AVAILABLE):
+            logger.warning(f"⚠️ {self.config.compression} not installed, cache codec falls back to zlib")
+            self.config.compression = "zlib"
+        if self.config.compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown cache compression: {self.config.compression}")
+
+        self._dumps: Callable[[Any], bytes] = _msgpack_dumps if self.config.serializer == "msgpack" else _json_dumps
+        self._compress = self._compressor(self.config.compression, self.config.level)
+        self._serializer_id = SERIALIZERS[self.config.serializer]
+        self._compression_id = COMPRESSIONS[self.config.compression]
+        self._decompressors: Dict[int, Callable[[bytes], bytes]] = {}
+
+    @staticmethod
+    def _compressor(name: str, level: int) -> Callable[[bytes], bytes]:
+        if name == "zstd":
+            return zstandard.ZstdCompressor(level=level).compress
+        if name == "lz4":
+            return lambda data: lz4.frame.compress(data, compression_level=level)
+        if name == "zlib":
+            return lambda data: zlib.compress(data, level)
+        return lambda data: data
+
+    def _decompressor(self, compression_id: int) -> Callable[[bytes], bytes]:
+        decompress = self._decompressors.get(compression_id)
+        if decompress is None:
+            if compression_id == COMPRESSIONS["zstd"]:
+                decompress = zstandard.ZstdDecompressor().decompress
+            elif compression_id == COMPRESSIONS["lz4"]:
+                decompress = lz4.frame.decompress
+            elif compression_id == COMPRESSIONS["zlib"]:
+                decompress = zlib.decompress
+            else:
+                decompress = lambda data: data
+            self._decompressors[compression_id] = decompress
+        return decompress
+
+    def encode(self, value: Any) -> bytes:
+        body = self._dumps(value)
+        compression_id = 0
+        if self._compression_id and len(body) >= self.config.compress_min_bytes:
+            compressed = self._compress(body)
+            if len(compressed) < len(body):
+                body, compression_id = compressed, self._compression_id
+        return bytes(((self._serializer_id << 4) | compression_id,)) + body
+
+    def decode(self, payload: bytes) -> Any:
+        if not payload:
+            raise ValueError("Empty cache payload")
+        header = payload[0]
+        body = memoryview(payload)[1:]
+        compression_id = header & 0x0F
+        if compression_id:
+            body = self._decompressor(compression_id)(bytes(body))
+        if header >> 4 == SERIALIZERS["msgpack"]:
+            return _msgpack_loads(body)
+        return _json_loads(bytes(body))
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "serializer": self.config.serializer,
+            "compression": self.config.compression,
+            "compress_min_bytes": self.config.compress_min_bytes
+        }
+
+# Shared codec for both caches
+default_codec = CacheCodec()
@@ -1,20 +1,38 @@
 import redis
-import json
 import hashlib
 import asyncio
-from typing import Optional, Dict, Any, List
+import fnmatch
+import uuid
+from typing import Optional, Dict, Any, List, Callable, Awaitable, Tuple, Iterable, Iterator
 import os
 from datetime import datetime, timedelta
 import logging
 
+from cache_codec import CacheCodec, default_codec
+from single_flight import SingleFlight, wrap_fresh, unwrap_fresh
+
 logger = logging.getLogger(__name__)
 
 class CacheManager:
-    def __init__(self):
+    # Redis sets listing the keys written under a prefix or tag
+    INDEX_PREFIX = "idx"
+    # Keys fetched per SSCAN/SCAN step and removed per UNLINK
+    INVALIDATION_BATCH = 500
+    # Index sets expire this long (or the entry TTL, if longer) after their last write
+    INDEX_MIN_TTL = 3600
+
+    # Seconds a stale entry may still be served while it is refreshed
+    PAGE_STALE_TTL = 600
+    AI_STALE_TTL = 120
+
+    def __init__(self, codec: Optional[CacheCodec] = None):
+        self.codec = codec or default_codec
+        self.flight = SingleFlight()
+        self.stale_hits = 0
         try:
             self.redis_client = redis.Redis.from_url(
                 os.getenv("REDIS_URL", "redis://localhost:6379"),
-                decode_responses=True
+                decode_responses=False  # Codec payloads are bytes
             )
             # Test connection
             self.redis_client.ping()
@@ -36,23 +54,36 @@ class CacheManager:
             if self.redis_available:
                 data = self.redis_client.get(key)
                 if data:
-                    return json.loads(data)
+                    return self.codec.decode(data)
             else:
-                return self.memory_cache.get(key)
+                entry = self.memory_cache.get(key)
+                if entry and entry['expires'] > datetime.utcnow():
+                    return entry['data']
         except Exception as e:
             logger.error(f"Cache get error: {e}")
         return None
     
-    async def set(self, key: str, value: Any, ttl: int = 300) -> bool:
-        """Set item in cache with TTL"""
+    def _index_keys(self, key: str, tags: Optional[List[str]] = None) -> List[str]:
+        """Index sets of a key: its prefix ("page", "ai", "rec") and each tag"""
+        prefix = key.split(":", 1)[0]
+        return [f"{self.INDEX_PREFIX}:ns:{prefix}"] + [f"{self.INDEX_PREFIX}:tag:{tag}" for tag in tags or ()]
+
+    async def set(self, key: str, value: Any, ttl: int = 300, tags: Optional[List[str]] = None) -> bool:
+        """Set item in cache with TTL, registering it in its prefix and tag indexes"""
         try:
             if self.redis_available:
-                self.redis_client.setex(key, ttl, json.dumps(value))
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.setex(key, ttl, self.codec.encode(value))
+                for index_key in self._index_keys(key, tags):
+                    pipe.sadd(index_key, key)
+                    pipe.expire(index_key, max(ttl, self.INDEX_MIN_TTL))
+                pipe.execute()
             else:
                 # Simple memory cache with cleanup
                 self.memory_cache[key] = {
                     'data': value,
-                    'expires': datetime.utcnow() + timedelta(seconds=ttl)
+                    'expires': datetime.utcnow() + timedelta(seconds=ttl),
+                    'tags': list(tags) if tags else []
                 }
                 # Cleanup expired items (simple approach)
                 if len(self.memory_cache) > 1000:
@@ -84,16 +115,79 @@ class CacheManager:
             logger.error(f"Cache delete error: {e}")
             return False
     
+    def _unlink_index(self, index_key: str) -> Tuple[int, bool]:
+        """
+        Unlink the keys listed in an index set, then the set. The set is
+        renamed first so concurrent writes start a fresh one.
+        Returns (removed, index existed). Blocking: run it in an executor.
+        """
+        draining_key = f"{index_key}:draining:{uuid.uuid4().hex}"
+        try:
+            self.redis_client.rename(index_key, draining_key)
+        except redis.ResponseError:
+            return 0, False
+
+        removed = 0
+        for batch in self._batches(self.redis_client.sscan_iter(draining_key, count=self.INVALIDATION_BATCH)):
+            removed += self.redis_client.unlink(*batch)
+        self.redis_client.unlink(draining_key)
+        return removed, True
+
+    def _scan_unlink(self, pattern: str) -> int:
+        """Unlink keys matching pattern with incremental SCAN. Blocking: run it in an executor."""
+        removed = 0
+        for batch in self._batches(self.redis_client.scan_iter(match=pattern, count=self.INVALIDATION_BATCH)):
+            removed += self.redis_client.unlink(*batch)
+        return removed
+
+    async def _in_executor(self, func: Callable[..., Any], *args) -> Any:
+        """Run a multi-round-trip Redis walk off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _batches(self, keys: Iterable[Any]) -> Iterator[List[Any]]:
+        batch = []
+        for key in keys:
+            batch.append(key)
+            if len(batch) >= self.INVALIDATION_BATCH:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def clear_namespace(self, prefix: str) -> int:
+        """Clear every key under a prefix ("page", "ai", "rec") via its index, SCAN if unindexed"""
+        try:
+            if self.redis_available:
+                removed, indexed = await self._in_executor(self._unlink_index, f"{self.INDEX_PREFIX}:ns:{prefix}")
+                if not indexed:
+                    removed += await self.clear_pattern(f"{prefix}:*")
+                return removed
+            return await self.clear_pattern(f"{prefix}:*")
+        except Exception as e:
+            logger.error(f"Cache clear namespace error: {e}")
+        return 0
+
+    async def invalidate_tag(self, tag: str) -> int:
+        """Clear every key written with tag, e.g. one user's AI responses"""
+        try:
+            if self.redis_available:
+                removed, _ = await self._in_executor(self._unlink_index, f"{self.INDEX_PREFIX}:tag:{tag}")
+                return removed
+            tagged_keys = [k for k, v in self.memory_cache.items() if tag in v.get('tags', ())]
+            for key in tagged_keys:
+                del self.memory_cache[key]
+            return len(tagged_keys)
+        except Exception as e:
+            logger.error(f"Cache tag invalidation error: {e}")
+        return 0
+
     async def clear_pattern(self, pattern: str) -> int:
-        """Clear all keys matching pattern"""
+        """Clear all keys matching pattern, walking Redis with incremental SCAN"""
         try:
             if self.redis_available:
-                keys = self.redis_client.keys(pattern)
-                if keys:
-                    return self.redis_client.delete(*keys)
+                return await self._in_executor(self._scan_unlink, pattern)
             else:
                 # Simple pattern matching for memory cache
-                import fnmatch
                 matching_keys = [
                     k for k in self.memory_cache.keys() 
                     if fnmatch.fnmatch(k, pattern)
@@ -105,32 +199,95 @@ class CacheManager:
             logger.error(f"Cache clear pattern error: {e}")
         return 0
     
+    async def get_or_compute(self, key: str, loader: Callable[[], Awaitable[Any]],
+                             ttl: int = 300, stale_ttl: int = 0,
+                             tags: Optional[List[str]] = None) -> Optional[Any]:
+        """
+        Cached value of key, calling loader() on a miss. Concurrent misses
+        share one loader call; with stale_ttl a stale value is returned
+        immediately while one background refresh replaces it.
+        """
+        async def load():
+            value = await loader()
+            if value is not None:
+                await self._set_fresh(key, value, ttl, stale_ttl, tags)
+            return value
+
+        value, stale = unwrap_fresh(await self.get(key))
+        if value is not None:
+            if stale:
+                self.stale_hits += 1
+                self.flight.refresh(key, load)
+            return value
+        return await self.flight.do(key, load)
+
+    async def _set_fresh(self, key: str, value: Any, ttl: int, stale_ttl: int,
+                         tags: Optional[List[str]] = None) -> bool:
+        """Store value as fresh for ttl, kept stale_ttl longer for revalidation"""
+        return await self.set(key, wrap_fresh(value, ttl), ttl + stale_ttl, tags)
+
+    async def _get_fresh(self, key: str) -> Optional[Any]:
+        """Value of key only while it is still fresh"""
+        value, stale = unwrap_fresh(await self.get(key))
+        return None if stale else value
+
     # Specific cache methods for AETHER
     
     async def cache_page_content(self, url: str, content: Dict[str, Any], ttl: int = 1800) -> bool:
         """Cache webpage content (30 minutes default)"""
         key = self._generate_key("page", url)
-        return await self.set(key, content, ttl)
+        return await self._set_fresh(key, content, ttl, self.PAGE_STALE_TTL)
     
-    async def get_cached_page_content(self, url: str) -> Optional[Dict[str, Any]]:
-        """Get cached webpage content"""
+    async def get_cached_page_content(self, url: str,
+                                      loader: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None,
+                                      ttl: int = 1800) -> Optional[Dict[str, Any]]:
+        """
+        Get cached webpage content. With a loader, concurrent misses fetch
+        the page once and stale content is served while it is refetched.
+        """
         key = self._generate_key("page", url)
-        return await self.get(key)
+        if loader is None:
+            return await self._get_fresh(key)
+        return await self.get_or_compute(key, loader, ttl, self.PAGE_STALE_TTL)
     
-    async def cache_ai_response(self, query: str, context: str, response: str, provider: str, ttl: int = 300) -> bool:
-        """Cache AI response (5 minutes default)"""
-        cache_data = {
+    def _ai_entry(self, response: str, provider: str) -> Dict[str, Any]:
+        return {
             'response': response,
             'provider': provider,
             'timestamp': datetime.utcnow().isoformat()
         }
+
+    def _user_tags(self, user_id: Optional[str]) -> Optional[List[str]]:
+        return [f"ai-user:{user_id}"] if user_id else None
+
+    async def cache_ai_response(self, query: str, context: str, response: str, provider: str, ttl: int = 300,
+                                user_id: Optional[str] = None) -> bool:
+        """Cache AI response (5 minutes default), tagged with the user it was generated for"""
         key = self._generate_key("ai", f"{query}_{context}")
-        return await self.set(key, cache_data, ttl)
+        return await self._set_fresh(key, self._ai_entry(response, provider), ttl, self.AI_STALE_TTL,
+                                     self._user_tags(user_id))
     
-    async def get_cached_ai_response(self, query: str, context: str) -> Optional[Dict[str, Any]]:
-        """Get cached AI response"""
+    async def get_cached_ai_response(self, query: str, context: str,
+                                     loader: Optional[Callable[[], Awaitable[Tuple[str, str]]]] = None,
+                                     ttl: int = 300, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get cached AI response. With a loader returning (response, provider),
+        concurrent misses share one AI call and stale answers are served
+        while one refresh runs.
+        """
         key = self._generate_key("ai", f"{query}_{context}")
-        return await self.get(key)
+        if loader is None:
+            return await self._get_fresh(key)
+
+        async def load():
+            response, provider = await loader()
+            return self._ai_entry(response, provider)
+
+        return await self.get_or_compute(key, load, ttl, self.AI_STALE_TTL, self._user_tags(user_id))
+
+    async def clear_user_ai_responses(self, user_id: str) -> int:
+        """Drop every AI response cached for one user"""
+        return await self.invalidate_tag(f"ai-user:{user_id}")
     
     async def cache_recommendations(self, user_pattern: str, recommendations: List[Dict], ttl: int = 900) -> bool:
         """Cache AI recommendations (15 minutes default)"""
@@ -146,7 +303,10 @@ class CacheManager:
         """Get cache statistics"""
         stats = {
             'type': 'redis' if self.redis_available else 'memory',
-            'connected': self.redis_available
+            'connected': self.redis_available,
+            'codec': self.codec.describe(),
+            'stale_hits': self.stale_hits,
+            'single_flight': self.flight.get_stats()
         }
         
         try:
@@ -1,450 +1,997 @@
-import redis
+import redis.asyncio as aioredis
+import base64
 import json
-import pickle
 import hashlib
 import time
 import asyncio
 import logging
-from typing import Any, Optional, Dict, List
+from typing import Any, Optional, Dict, List, Tuple, Callable, Awaitable
 from datetime import datetime, timedelta
-from collections import defaultdict, OrderedDict
+from collections import defaultdict, OrderedDict, deque
+from dataclasses import dataclass
 import threading
 from functools import wraps
 import os
+import re
+import sys
+import uuid
+
+from cache_codec import CacheCodec, default_codec
+from single_flight import SingleFlight, wrap_fresh, unwrap_fresh
 
 logger = logging.getLogger(__name__)
 
+MB = 1024 * 1024
+
+# Redis sets listing the cache keys written under a namespace or tag
+INDEX_PREFIX = "aether-idx"
+
+# Keys fetched per SSCAN/SCAN step and removed per UNLINK during invalidation
+INVALIDATION_BATCH = 500
+
+@dataclass
+class CacheConfig:
+    """Shard count, tier byte budgets, Redis location and snapshot settings of the cache"""
+    shard_count: int = 16
+    l1_max_bytes: int = 8 * MB     # Most frequently accessed
+    l2_max_bytes: int = 32 * MB    # Frequently accessed
+    l3_max_bytes: int = 128 * MB   # All cached items
+    sketch_width: int = 4096       # frequency counters per sketch row, per shard
+    default_ttl: int = 3600        # 1 hour
+    redis_url: str = "redis://localhost:6379"
+    snapshot_path: str = ""        # hottest entries saved here on close; empty disables
+    snapshot_top_n: int = 200      # entries kept per namespace
+    hit_rate_window: float = 30.0  # seconds per hit-rate sample after startup
+
+    @classmethod
+    def from_env(cls) -> "CacheConfig":
+        return cls(
+            shard_count=max(1, int(os.getenv("CACHE_SHARDS", "16"))),
+            l1_max_bytes=int(float(os.getenv("CACHE_L1_MB", "8")) * MB),
+            l2_max_bytes=int(float(os.getenv("CACHE_L2_MB", "32")) * MB),
+            l3_max_bytes=int(float(os.getenv("CACHE_L3_MB", "128")) * MB),
+            sketch_width=int(os.getenv("CACHE_SKETCH_WIDTH", "4096")),
+            default_ttl=int(os.getenv("CACHE_DEFAULT_TTL", "3600")),
+            redis_url=os.getenv("REDIS_URL", "redis://localhost:6379"),
+            snapshot_path=os.getenv("CACHE_SNAPSHOT_PATH", ""),
+            snapshot_top_n=int(os.getenv("CACHE_SNAPSHOT_TOP_N", "200")),
+            hit_rate_window=float(os.getenv("CACHE_HIT_RATE_WINDOW_S", "30"))
+        )
+
+def _namespace_of(cache_key: str) -> str:
+    """Namespace part of an aether:{namespace}:{md5} key"""
+    return cache_key[len("aether:"):].rsplit(":", 1)[0]
+
+def _escape_glob(text: str) -> str:
+    """Escape Redis MATCH pattern metacharacters"""
+    return re.sub(r"([*?\[\]\\])", r"\\\1", text)
+
+def _key_hash(cache_key: str) -> int:
+    """64 bits of the key's md5 that shard selection does not use"""
+    return int(cache_key[-24:-8], 16)
+
+def _entry_size(value: Any) -> int:
+    """Approximate memory held by a serialized value"""
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value) + 64
+    return sys.getsizeof(value) + 64
+
+class FrequencySketch:
+    """
+    Count-min sketch of recent key popularity (TinyLFU).
+
+    Four rows of 4-bit saturating counters; every counter is halved once
+    the sketch has seen ten times its width in increments, so frequencies
+    reflect recent traffic and memory stays fixed regardless of key count.
+    """
+
+    DEPTH = 4
+    MAX_COUNT = 15
+    SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5)
+
+    def __init__(self, width: int):
+        self.width = 1 << max(4, (width - 1).bit_length())
+        self.mask = self.width - 1
+        self.rows = [bytearray(self.width) for _ in range(self.DEPTH)]
+        self.additions = 0
+        self.reset_after = self.width * 10
+        self.resets = 0
+
+    def _indexes(self, key_hash: int):
+        for seed in self.SEEDS:
+            mixed = ((key_hash ^ seed) * 0xFF51AFD7ED558CCD) & 0xFFFFFFFFFFFFFFFF
+            yield (mixed ^ (mixed >> 29)) & self.mask
+
+    def increment(self, key_hash: int):
+        for row, index in zip(self.rows, self._indexes(key_hash)):
+            if row[index] < self.MAX_COUNT:
+                row[index] += 1
+        self.additions += 1
+        if self.additions >= self.reset_after:
+            self._halve()
+
+    def estimate(self, key_hash: int) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key_hash)))
+
+    def _halve(self):
+        for row in self.rows:
+            for index in range(self.width):
+                row[index] >>= 1
+        self.additions //= 2
+        self.resets += 1
+
+class CacheTier:
+    """LRU map of cache_key -> (value, expiry, size) bounded by total size"""
+
+    def __init__(self, name: str, max_bytes: int):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, cache_key: str) -> Optional[Tuple[Any, float, int]]:
+        return self.entries.get(cache_key)
+
+    def touch(self, cache_key: str):
+        self.entries.move_to_end(cache_key)
+
+    def put(self, cache_key: str, entry: Tuple[Any, float, int]):
+        self.entries[cache_key] = entry
+        self.bytes += entry[2]
+
+    def pop(self, cache_key: str) -> Optional[Tuple[Any, float, int]]:
+        entry = self.entries.pop(cache_key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+        return entry
+
+    def pop_lru(self) -> Tuple[str, Tuple[Any, float, int]]:
+        cache_key, entry = self.entries.popitem(last=False)
+        self.bytes -= entry[2]
+        return cache_key, entry
+
+    def lru_key(self) -> Optional[str]:
+        return next(iter(self.entries), None)
+
+class CacheShard:
+    """
+    One hash stripe of the L1/L2/L3 memory tiers.
+
+    Tiers are budgeted in bytes and hold each key in exactly one of them.
+    New keys enter L3 only if the frequency sketch rates them at least as
+    popular as the entry they would evict, so a scan of one-off keys cannot
+    flush hot ones. Metadata is kept only for resident keys.
+
+    Every method expects the caller to hold `lock`. The lock only ever
+    covers dictionary operations, never I/O, so it is held for microseconds.
+    """
+
+    def __init__(self, l1_max_bytes: int, l2_max_bytes: int, l3_max_bytes: int,
+                 sketch_width: int = 4096):
+        self.lock = threading.Lock()
+        self.tiers = [
+            CacheTier('l1', l1_max_bytes),
+            CacheTier('l2', l2_max_bytes),
+            CacheTier('l3', l3_max_bytes)
+        ]
+        self.sketch = FrequencySketch(sketch_width)
+        self.cache_metadata: Dict[str, Dict[str, Any]] = {}
+        self.namespace_bytes: Dict[str, int] = defaultdict(int)
+        self.namespace_keys: Dict[str, int] = defaultdict(int)
+        self.evictions = defaultdict(int)
+        self.admissions = defaultdict(int)
+
+    def _take(self, cache_key: str) -> Optional[Tuple[Any, float, int]]:
+        """Remove a key from whichever tier holds it"""
+        for tier in self.tiers:
+            entry = tier.pop(cache_key)
+            if entry is not None:
+                namespace = _namespace_of(cache_key)
+                self.namespace_bytes[namespace] -= entry[2]
+                self.namespace_keys[namespace] -= 1
+                if not self.namespace_keys[namespace]:
+                    del self.namespace_bytes[namespace], self.namespace_keys[namespace]
+                return entry
+        return None
+
+    def _put(self, level: int, cache_key: str, entry: Tuple[Any, float, int]):
+        """Place an entry in a tier, demoting LRU entries that overflow its budget"""
+        tier = self.tiers[level]
+        tier.put(cache_key, entry)
+        namespace = _namespace_of(cache_key)
+        self.namespace_bytes[namespace] += entry[2]
+        self.namespace_keys[namespace] += 1
+
+        now = time.time()
+        while tier.bytes > tier.max_bytes and len(tier) > 1:
+            evicted_key = tier.lru_key()
+            evicted = self._take(evicted_key)
+            self.evictions[tier.name] += 1
+            if level + 1 < len(self.tiers) and evicted[1] > now:
+                self._put(level + 1, evicted_key, evicted)
+            else:
+                self.cache_metadata.pop(evicted_key, None)
+
+    def lookup(self, cache_key: str, now: float) -> Optional[Tuple[Any, str]]:
+        """Return (value, tier) for a live entry, promoting it one tier if it fits there"""
+        self.sketch.increment(_key_hash(cache_key))
+        for level, tier in enumerate(self.tiers):
+            entry = tier.get(cache_key)
+            if entry is None:
+                continue
+            if entry[1] <= now:
+                self._take(cache_key)
+                self.cache_metadata.pop(cache_key, None)
+                return None
+            if level == 0 or entry[2] > self.tiers[level - 1].max_bytes:
+                # Move to end (most recently used); too large for the tier above
+                tier.touch(cache_key)
+            else:
+                self._take(cache_key)
+                self._put(level - 1, cache_key, entry)
+            self.record_access(cache_key)
+            return entry[0], tier.name
+        return None
+
+    def insert(self, cache_key: str, value: Any, expiry: float, level: int = 2,
+               admit: bool = True) -> bool:
+        """
+        Store a value at a tier, falling back to lower tiers when it does
+        not fit the budget. Entries entering a full L3 must pass the TinyLFU
+        admission test unless `admit` is False. Returns whether it is resident.
+        """
+        self._take(cache_key)
+        if value is None:
+            self.cache_metadata.pop(cache_key, None)
+            return False
+
+        size = _entry_size(value)
+        while level < len(self.tiers) and size > self.tiers[level].max_bytes:
+            level += 1
+        if level == len(self.tiers):
+            self.admissions['oversize'] += 1
+            self.cache_metadata.pop(cache_key, None)
+            return False
+
+        l3 = self.tiers[-1]
+        if admit and level == len(self.tiers) - 1 and l3.bytes + size > l3.max_bytes:
+            victim = l3.lru_key()
+            if victim is not None and \
+                    self.sketch.estimate(_key_hash(cache_key)) < self.sketch.estimate(_key_hash(victim)):
+                self.admissions['rejected'] += 1
+                self.cache_metadata.pop(cache_key, None)
+                return False
+
+        self.admissions['admitted'] += 1
+        self._put(level, cache_key, (value, expiry, size))
+        if cache_key in self.cache_metadata:
+            self.cache_metadata[cache_key]['size'] = size
+        return True
+
+    def remove(self, cache_key: str) -> bool:
+        """Remove a key from every tier and its metadata"""
+        removed = self._take(cache_key) is not None
+        self.cache_metadata.pop(cache_key, None)
+        return removed
+
+    def record_access(self, cache_key: str):
+        """Update metadata of a resident key after a hit"""
+        if cache_key in self.cache_metadata:
+            self.cache_metadata[cache_key]['access_count'] += 1
+
+    def is_frequently_accessed(self, cache_key: str) -> bool:
+        """Seen at least 5 times in the sketch's recent window"""
+        return self.sketch.estimate(_key_hash(cache_key)) >= 5
+
+    def cleanup(self, now: float):
+        """Drop expired items"""
+        for tier in self.tiers:
+            expired_keys = [key for key, entry in tier.entries.items() if entry[1] <= now]
+            for key in expired_keys:
+                self._take(key)
+                self.cache_metadata.pop(key, None)
+
+class HitRateTracker:
+    """
+    Hit rate per window since startup and how long it took to level off.
+
+    A window closes once it is `window` seconds old and has seen at least
+    `min_requests` lookups. Steady state is reached when `stable_windows`
+    consecutive windows agree within `tolerance` percentage points; it is
+    reported as the time at which the first of those windows ended.
+    """
+
+    def __init__(self, window: float = 30.0, tolerance: float = 2.0, min_requests: int = 50,
+                 stable_windows: int = 3, max_windows: int = 120):
+        self.window = window
+        self.tolerance = tolerance
+        self.min_requests = min_requests
+        self.stable_windows = stable_windows
+        self.windows: deque = deque(maxlen=max_windows)  # (seconds since start, hit rate %)
+        self.start()
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.window_started_at = self.started_at
+        self.hits = 0
+        self.requests = 0
+        self.windows.clear()
+        self.steady_after: Optional[float] = None
+        self.steady_hit_rate: Optional[float] = None
+
+    def record(self, hit: bool):
+        self.requests += 1
+        if hit:
+            self.hits += 1
+        if self.requests >= self.min_requests:
+            now = time.monotonic()
+            if now - self.window_started_at >= self.window:
+                self._close_window(now)
+
+    def _close_window(self, now: float):
+        self.windows.append((now - self.started_at, self.hits / self.requests * 100))
+        self.window_started_at = now
+        self.hits = 0
+        self.requests = 0
+
+        if self.steady_after is None and len(self.windows) >= self.stable_windows:
+            recent = list(self.windows)[-self.stable_windows:]
+            rates = [rate for _, rate in recent]
+            if max(rates) - min(rates) <= self.tolerance:
+                self.steady_after = recent[0][0]
+                self.steady_hit_rate = sum(rates) / len(rates)
+                logger.info(f"📈 Cache hit rate steady at {self.steady_hit_rate:.1f}% "
+                            f"{self.steady_after:.0f}s after start")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "seconds_since_start": round(time.monotonic() - self.started_at, 1),
+            "steady_state_after_s": round(self.steady_after, 1) if self.steady_after is not None else None,
+            "steady_hit_rate": round(self.steady_hit_rate, 1) if self.steady_hit_rate is not None else None,
+            "hit_rate_windows": [(round(elapsed, 1), round(rate, 1)) for elapsed, rate in self.windows]
+        }
+
 class AdvancedCacheSystem:
     """
-    Multi-tier caching system with Redis, in-memory cache, and intelligent 
+    Multi-tier caching system with Redis, in-memory cache, and intelligent
     cache management with performance optimization.
+
+    The memory tiers are split into hash-striped shards with independent
+    locks, and Redis is reached through an asyncio client outside any lock,
+    so concurrent callers only contend when they touch the same shard.
     """
-    
-    def __init__(self):
-        # Initialize Redis connection
+
+    def __init__(self, config: Optional[CacheConfig] = None, codec: Optional[CacheCodec] = None):
+        self.config = config or CacheConfig.from_env()
+        # Values are encoded once; the same bytes live in memory and in Redis
+        self.codec = codec or default_codec
+
+        # Initialize Redis connection; availability is confirmed on first use
         try:
-            self.redis_client = redis.Redis.from_url(
-                os.getenv("REDIS_URL", "redis://localhost:6379"),
-                decode_responses=False,  # Keep binary for pickle data
+            self.redis_client = aioredis.Redis.from_url(
+                self.config.redis_url,
+                decode_responses=False,  # Codec payloads are bytes
                 socket_connect_timeout=5,
                 socket_timeout=5,
                 retry_on_timeout=True
             )
-            self.redis_client.ping()
             self.redis_available = True
-            logger.info("✅ Redis cache system initialized")
         except Exception as e:
             logger.warning(f"⚠️ Redis unavailable, using memory-only cache: {str(e)}")
             self.redis_client = None
             self.redis_available = False
-        
-        # Multi-tier in-memory cache
-        self.l1_cache = OrderedDict()  # Fastest access, smallest size
-        self.l2_cache = OrderedDict()  # Medium access, medium size
-        self.l3_cache = OrderedDict()  # Slower access, largest size
-        
-        # Cache configurations
-        self.l1_max_size = 100    # Most frequently accessed
-        self.l2_max_size = 500    # Frequently accessed
-        self.l3_max_size = 2000   # All cached items
-        
-        self.default_ttl = 3600   # 1 hour
+
+        # Multi-tier in-memory cache, striped over shards
+        shard_count = self.config.shard_count
+        self.shards = [
+            CacheShard(
+                max(1, self.config.l1_max_bytes // shard_count),
+                max(1, self.config.l2_max_bytes // shard_count),
+                max(1, self.config.l3_max_bytes // shard_count),
+                self.config.sketch_width
+            )
+            for _ in range(shard_count)
+        ]
+
+        self.default_ttl = self.config.default_ttl
         self.stats = {
             'hits': defaultdict(int),
             'misses': defaultdict(int),
             'sets': defaultdict(int),
-            'evictions': defaultdict(int),
-            'errors': defaultdict(int)
+            'errors': defaultdict(int),
+            'stale': defaultdict(int)
         }
-        
-        # Access patterns for intelligent caching
-        self.access_patterns = defaultdict(list)
-        self.cache_metadata = {}  # Store metadata about cached items
-        
-        # Lock for thread safety
-        self._lock = threading.RLock()
-        
-        # Start background cleanup task
-        asyncio.create_task(self._background_cleanup())
-    
+
+        # Coalesces concurrent loads of the same key in get_or_set
+        self.flight = SingleFlight()
+
+        # Warm start: snapshot reload and hit-rate ramp after restart
+        self.hit_rate_tracker = HitRateTracker(window=self.config.hit_rate_window)
+        self.warm_start = {"snapshot_loaded": 0, "snapshot_saved": 0}
+
+        self._started = False
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    async def _ensure_started(self):
+        """Ping Redis and start background cleanup on first use inside the event loop"""
+        if self._started:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._started:
+                return
+            if self.redis_client is not None:
+                try:
+                    await self.redis_client.ping()
+                    self.redis_available = True
+                    logger.info("✅ Redis cache system initialized")
+                except Exception as e:
+                    logger.warning(f"⚠️ Redis unavailable, using memory-only cache: {str(e)}")
+                    self.redis_available = False
+            if self.config.snapshot_path:
+                await self.load_snapshot()
+            self.hit_rate_tracker.start()
+            self._cleanup_task = asyncio.create_task(self._background_cleanup())
+            self._started = True
+
     def _generate_cache_key(self, key: str, namespace: str = "default") -> str:
         """Generate standardized cache key with namespace"""
         return f"aether:{namespace}:{hashlib.md5(key.encode()).hexdigest()}"
-    
+
+    def _shard_for(self, cache_key: str) -> CacheShard:
+        """Shard owning a cache key; the key already ends in an md5 digest"""
+        return self.shards[int(cache_key[-8:], 16) % len(self.shards)]
+
     async def get(self, key: str, namespace: str = "default") -> Optional[Any]:
         """
         Get item from cache with intelligent tier management
         """
+        await self._ensure_started()
         cache_key = self._generate_cache_key(key, namespace)
-        
+        shard = self._shard_for(cache_key)
+
         try:
-            with self._lock:
-                # Check L1 cache first (fastest)
-                if cache_key in self.l1_cache:
-                    value, expiry = self.l1_cache[cache_key]
-                    if expiry > time.time():
-                        # Move to end (most recently used)
-                        self.l1_cache.move_to_end(cache_key)
-                        self.stats['hits']['l1'] += 1
-                        self._record_access(cache_key)
-                        return self._deserialize_value(value)
-                    else:
-                        del self.l1_cache[cache_key]
-                
-                # Check L2 cache
-                if cache_key in self.l2_cache:
-                    value, expiry = self.l2_cache[cache_key]
-                    if expiry > time.time():
-                        # Promote to L1 if frequently accessed
-                        self._promote_to_l1(cache_key, value, expiry)
-                        self.stats['hits']['l2'] += 1
-                        self._record_access(cache_key)
-                        return self._deserialize_value(value)
-                    else:
-                        del self.l2_cache[cache_key]
-                
-                # Check L3 cache
-                if cache_key in self.l3_cache:
-                    value, expiry = self.l3_cache[cache_key]
-                    if expiry > time.time():
-                        # Promote to L2
-                        self._promote_to_l2(cache_key, value, expiry)
-                        self.stats['hits']['l3'] += 1
-                        self._record_access(cache_key)
-                        return self._deserialize_value(value)
-                    else:
-                        del self.l3_cache[cache_key]
-                
-                # Check Redis if available
-                if self.redis_available:
-                    try:
-                        redis_value = self.redis_client.get(cache_key)
-                        if redis_value:
-                            deserialized = pickle.loads(redis_value)
-                            value, expiry = deserialized
-                            
-                            if expiry > time.time():
-                                # Add to L3 cache
-                                self._add_to_l3(cache_key, value, expiry)
-                                self.stats['hits']['redis'] += 1
-                                self._record_access(cache_key)
-                                return self._deserialize_value(value)
-                            else:
-                                self.redis_client.delete(cache_key)
-                    except Exception as e:
-                        logger.error(f"Redis get error: {str(e)}")
-                        self.stats['errors']['redis'] += 1
-                
-                # Cache miss
-                self.stats['misses'][namespace] += 1
-                return None
-                
+            with shard.lock:
+                hit = shard.lookup(cache_key, time.time())
+            if hit is not None:
+                value, tier = hit
+                self.stats['hits'][tier] += 1
+                self.hit_rate_tracker.record(True)
+                return self.codec.decode(value)
+
+            # Check Redis if available; no lock is held during the round trip.
+            # Redis owns expiry: the remaining TTL bounds the L3 copy.
+            if self.redis_available:
+                try:
+                    pipe = self.redis_client.pipeline(transaction=False)
+                    pipe.get(cache_key)
+                    pipe.pttl(cache_key)
+                    payload, ttl_ms = await pipe.execute()
+                    if payload:
+                        now = time.time()
+                        ttl = ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else self.default_ttl
+                        # Add to L3 cache if it earns a place there
+                        with shard.lock:
+                            shard.cache_metadata[cache_key] = {
+                                'created': now,
+                                'ttl': int(ttl),
+                                'namespace': namespace,
+                                'priority': 'normal',
+                                'access_count': 1
+                            }
+                            shard.insert(cache_key, payload, now + ttl)
+                        self.stats['hits']['redis'] += 1
+                        self.hit_rate_tracker.record(True)
+                        return self.codec.decode(payload)
+                except Exception as e:
+                    logger.error(f"Redis get error: {str(e)}")
+                    self.stats['errors']['redis'] += 1
+
+            # Cache miss
+            self.stats['misses'][namespace] += 1
+            self.hit_rate_tracker.record(False)
+            return None
+
         except Exception as e:
             logger.error(f"Cache get error: {str(e)}")
             self.stats['errors']['general'] += 1
             return None
-    
-    async def set(self, key: str, value: Any, ttl: Optional[int] = None, 
-                  namespace: str = "default", priority: str = "normal") -> bool:
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None,
+                  namespace: str = "default", priority: str = "normal",
+                  tags: Optional[List[str]] = None) -> bool:
         """
-        Set item in cache with intelligent tier placement
+        Set item in cache with intelligent tier placement. The key is
+        registered in its namespace's index and in each tag's index so it
+        can be invalidated without walking the keyspace.
         """
+        await self._ensure_started()
         cache_key = self._generate_cache_key(key, namespace)
+        shard = self._shard_for(cache_key)
         ttl = ttl or self.default_ttl
-        expiry = time.time() + ttl
-        
+        now = time.time()
+        expiry = now + ttl
+
         try:
-            serialized_value = self._serialize_value(value)
-            
-            with self._lock:
+            payload = self.codec.encode(value)
+
+            with shard.lock:
                 # Store metadata
-                self.cache_metadata[cache_key] = {
-                    'created': time.time(),
+                shard.cache_metadata[cache_key] = {
+                    'created': now,
                     'ttl': ttl,
                     'namespace': namespace,
                     'priority': priority,
-                    'access_count': 0,
-                    'size': len(str(serialized_value))
+                    'tags': list(tags) if tags else [],
+                    'access_count': 0
                 }
-                
-                # Determine initial tier based on priority and access patterns
-                if priority == "high" or self._is_frequently_accessed(cache_key):
-                    self._add_to_l1(cache_key, serialized_value, expiry)
+
+                # Determine initial tier based on priority and access patterns;
+                # explicit priorities bypass admission, normal writes must earn L3
+                if priority == "high" or shard.is_frequently_accessed(cache_key):
+                    shard.insert(cache_key, payload, expiry, level=0)
                 elif priority == "medium":
-                    self._add_to_l2(cache_key, serialized_value, expiry)
+                    shard.insert(cache_key, payload, expiry, level=1)
                 else:
-                    self._add_to_l3(cache_key, serialized_value, expiry)
-                
-                # Store in Redis if available
-                if self.redis_available:
-                    try:
-                        redis_data = pickle.dumps((serialized_value, expiry))
-                        self.redis_client.setex(cache_key, ttl, redis_data)
-                    except Exception as e:
-                        logger.error(f"Redis set error: {str(e)}")
-                        self.stats['errors']['redis'] += 1
-                
-                self.stats['sets'][namespace] += 1
-                return True
-                
+                    shard.insert(cache_key, payload, expiry, level=2)
+
+            # Store in Redis if available
+            if self.redis_available:
+                try:
+                    pipe = self.redis_client.pipeline(transaction=False)
+                    pipe.setex(cache_key, ttl, payload)
+                    for index_key in self._index_keys(namespace, tags):
+                        pipe.sadd(index_key, cache_key)
+                    await pipe.execute()
+                except Exception as e:
+                    logger.error(f"Redis set error: {str(e)}")
+                    self.stats['errors']['redis'] += 1
+
+            self.stats['sets'][namespace] += 1
+            return True
+
         except Exception as e:
             logger.error(f"Cache set error: {str(e)}")
             self.stats['errors']['general'] += 1
             return False
-    
+
     async def delete(self, key: str, namespace: str = "default") -> bool:
         """Delete item from all cache tiers"""
+        await self._ensure_started()
         cache_key = self._generate_cache_key(key, namespace)
-        
+        shard = self._shard_for(cache_key)
+
         try:
-            with self._lock:
-                # Remove from all memory tiers
-                removed = False
-                for cache in [self.l1_cache, self.l2_cache, self.l3_cache]:
-                    if cache_key in cache:
-                        del cache[cache_key]
-                        removed = True
-                
-                # Remove from metadata
-                if cache_key in self.cache_metadata:
-                    del self.cache_metadata[cache_key]
-                
-                # Remove from Redis
-                if self.redis_available:
-                    try:
-                        redis_removed = self.redis_client.delete(cache_key)
-                        removed = removed or redis_removed > 0
-                    except Exception as e:
-                        logger.error(f"Redis delete error: {str(e)}")
-                        self.stats['errors']['redis'] += 1
-                
-                return removed
-                
+            # Remove from all memory tiers
+            with shard.lock:
+                removed = shard.remove(cache_key)
+
+            # Remove from Redis
+            if self.redis_available:
+                try:
+                    redis_removed = await self.redis_client.delete(cache_key)
+                    removed = removed or redis_removed > 0
+                except Exception as e:
+                    logger.error(f"Redis delete error: {str(e)}")
+                    self.stats['errors']['redis'] += 1
+
+            return removed
+
         except Exception as e:
             logger.error(f"Cache delete error: {str(e)}")
             self.stats['errors']['general'] += 1
             return False
-    
-    async def clear_namespace(self, namespace: str = "default") -> int:
-        """Clear all items in a namespace"""
+
+    def _namespace_index(self, namespace: str) -> str:
+        return f"{INDEX_PREFIX}:ns:{namespace}"
+
+    def _tag_index(self, tag: str) -> str:
+        return f"{INDEX_PREFIX}:tag:{tag}"
+
+    def _index_keys(self, namespace: str, tags: Optional[List[str]] = None) -> List[str]:
+        """Redis sets a key written under namespace and tags belongs to"""
+        return [self._namespace_index(namespace)] + [self._tag_index(tag) for tag in tags or ()]
+
+    async def _unlink_index(self, index_key: str) -> Tuple[int, bool]:
+        """
+        Unlink every key listed in an index set, then the set itself.
+        The set is renamed first so keys registered meanwhile land in a
+        fresh set instead of being lost. Drained keys are also dropped from
+        the memory tiers, whose copies may have been filled from Redis
+        without their tags. Returns (removed, index existed).
+        """
+        draining_key = f"{index_key}:draining:{uuid.uuid4().hex}"
+        try:
+            await self.redis_client.rename(index_key, draining_key)
+        except aioredis.ResponseError:
+            return 0, False  # no such index
+
+        removed = 0
+        cursor = 0
+        while True:
+            cursor, members = await self.redis_client.sscan(draining_key, cursor, count=INVALIDATION_BATCH)
+            if members:
+                removed += await self.redis_client.unlink(*members)
+                self._drop_local(members)
+            if cursor == 0:
+                break
+        await self.redis_client.unlink(draining_key)
+        return removed, True
+
+    def _drop_local(self, redis_keys: List[bytes]):
+        """Remove keys from the memory tiers of their shards"""
+        for redis_key in redis_keys:
+            cache_key = redis_key.decode() if isinstance(redis_key, bytes) else redis_key
+            shard = self._shard_for(cache_key)
+            with shard.lock:
+                shard.remove(cache_key)
+
+    async def _scan_unlink(self, pattern: str) -> int:
+        """Unlink keys matching pattern with incremental SCAN, never KEYS"""
+        removed = 0
+        batch = []
+        async for redis_key in self.redis_client.scan_iter(match=pattern, count=INVALIDATION_BATCH):
+            batch.append(redis_key)
+            if len(batch) >= INVALIDATION_BATCH:
+                removed += await self.redis_client.unlink(*batch)
+                batch = []
+        if batch:
+            removed += await self.redis_client.unlink(*batch)
+        return removed
+
+    async def _prune_indexes(self):
+        """Drop index members whose cache key has expired"""
+        async for index_key in self.redis_client.scan_iter(match=f"{INDEX_PREFIX}:*", count=INVALIDATION_BATCH):
+            if b":draining:" in index_key:
+                continue
+            cursor = 0
+            while True:
+                cursor, members = await self.redis_client.sscan(index_key, cursor, count=INVALIDATION_BATCH)
+                if members:
+                    pipe = self.redis_client.pipeline(transaction=False)
+                    for member in members:
+                        pipe.exists(member)
+                    alive = await pipe.execute()
+                    dead = [member for member, exists in zip(members, alive) if not exists]
+                    if dead:
+                        await self.redis_client.srem(index_key, *dead)
+                if cursor == 0:
+                    break
+
+    async def invalidate_tag(self, tag: str) -> int:
+        """Clear every item written with tag, in any namespace"""
+        await self._ensure_started()
         cleared_count = 0
-        
+
         try:
-            with self._lock:
-                # Find keys to remove
-                keys_to_remove = []
-                for cache_key, metadata in self.cache_metadata.items():
-                    if metadata.get('namespace') == namespace:
-                        keys_to_remove.append(cache_key)
-                
-                # Remove from memory caches
-                for cache_key in keys_to_remove:
-                    for cache in [self.l1_cache, self.l2_cache, self.l3_cache]:
-                        if cache_key in cache:
-                            del cache[cache_key]
+            for shard in self.shards:
+                with shard.lock:
+                    keys_to_remove = [
+                        cache_key for cache_key, metadata in shard.cache_metadata.items()
+                        if tag in metadata.get('tags', ())
+                    ]
+                    for cache_key in keys_to_remove:
+                        if shard.remove(cache_key):
                             cleared_count += 1
-                    
-                    if cache_key in self.cache_metadata:
-                        del self.cache_metadata[cache_key]
-                
-                # Clear from Redis (pattern-based deletion)
-                if self.redis_available:
-                    try:
-                        pattern = f"aether:{namespace}:*"
-                        redis_keys = self.redis_client.keys(pattern)
-                        if redis_keys:
-                            self.redis_client.delete(*redis_keys)
-                            cleared_count += len(redis_keys)
-                    except Exception as e:
-                        logger.error(f"Redis clear error: {str(e)}")
-                        self.stats['errors']['redis'] += 1
-                
-                return cleared_count
-                
+
+            if self.redis_available:
+                try:
+                    removed, _ = await self._unlink_index(self._tag_index(tag))
+                    cleared_count += removed
+                except Exception as e:
+                    logger.error(f"Redis tag invalidation error: {str(e)}")
+                    self.stats['errors']['redis'] += 1
+
+            return cleared_count
+
+        except Exception as e:
+            logger.error(f"Cache tag invalidation error: {str(e)}")
+            self.stats['errors']['general'] += 1
+            return 0
+
+    async def clear_namespace(self, namespace: str = "default", scan_fallback: bool = True) -> int:
+        """
+        Clear all items in a namespace through its index set. Keys written
+        before the index existed are found with incremental SCAN when the
+        namespace has no index and scan_fallback is set.
+        """
+        await self._ensure_started()
+        cleared_count = 0
+
+        try:
+            # Remove from memory caches, one shard at a time
+            for shard in self.shards:
+                with shard.lock:
+                    if namespace not in shard.namespace_keys:
+                        continue
+                    keys_to_remove = [
+                        cache_key for tier in shard.tiers for cache_key in tier.entries
+                        if _namespace_of(cache_key) == namespace
+                    ]
+                    for cache_key in keys_to_remove:
+                        if shard.remove(cache_key):
+                            cleared_count += 1
+
+            # Clear from Redis without blocking it: index set first, SCAN if there is none
+            if self.redis_available:
+                try:
+                    removed, indexed = await self._unlink_index(self._namespace_index(namespace))
+                    if not indexed and scan_fallback:
+                        removed += await self._scan_unlink(f"aether:{_escape_glob(namespace)}:*")
+                    cleared_count += removed
+                except Exception as e:
+                    logger.error(f"Redis clear error: {str(e)}")
+                    self.stats['errors']['redis'] += 1
+
+            return cleared_count
+
         except Exception as e:
             logger.error(f"Cache clear error: {str(e)}")
             self.stats['errors']['general'] += 1
             return 0
-    
-    def _promote_to_l1(self, cache_key: str, value: Any, expiry: float):
-        """Promote item to L1 cache"""
-        self._add_to_l1(cache_key, value, expiry)
-        # Remove from L2 if present
-        if cache_key in self.l2_cache:
-            del self.l2_cache[cache_key]
-    
-    def _promote_to_l2(self, cache_key: str, value: Any, expiry: float):
-        """Promote item to L2 cache"""
-        self._add_to_l2(cache_key, value, expiry)
-        # Remove from L3 if present
-        if cache_key in self.l3_cache:
-            del self.l3_cache[cache_key]
-    
-    def _add_to_l1(self, cache_key: str, value: Any, expiry: float):
-        """Add item to L1 cache with LRU eviction"""
-        self.l1_cache[cache_key] = (value, expiry)
-        self.l1_cache.move_to_end(cache_key)
-        
-        # Evict if over limit
-        while len(self.l1_cache) > self.l1_max_size:
-            evicted_key, _ = self.l1_cache.popitem(last=False)
-            self.stats['evictions']['l1'] += 1
-            # Demote to L2
-            if evicted_key not in self.l2_cache:
-                self._add_to_l2(evicted_key, *self.l1_cache.get(evicted_key, (None, 0)))
-    
-    def _add_to_l2(self, cache_key: str, value: Any, expiry: float):
-        """Add item to L2 cache with LRU eviction"""
-        if value is None:
-            return
-            
-        self.l2_cache[cache_key] = (value, expiry)
-        self.l2_cache.move_to_end(cache_key)
-        
-        # Evict if over limit
-        while len(self.l2_cache) > self.l2_max_size:
-            evicted_key, evicted_data = self.l2_cache.popitem(last=False)
-            self.stats['evictions']['l2'] += 1
-            # Demote to L3
-            if evicted_key not in self.l3_cache and evicted_data[1] > time.time():
-                self._add_to_l3(evicted_key, *evicted_data)
-    
-    def _add_to_l3(self, cache_key: str, value: Any, expiry: float):
-        """Add item to L3 cache with LRU eviction"""
-        if value is None:
-            return
-            
-        self.l3_cache[cache_key] = (value, expiry)
-        self.l3_cache.move_to_end(cache_key)
-        
-        # Evict if over limit
-        while len(self.l3_cache) > self.l3_max_size:
-            evicted_key, _ = self.l3_cache.popitem(last=False)
-            self.stats['evictions']['l3'] += 1
-    
-    def _record_access(self, cache_key: str):
-        """Record access pattern for intelligent caching"""
-        current_time = time.time()
-        self.access_patterns[cache_key].append(current_time)
-        
-        # Keep only recent accesses (last hour)
-        hour_ago = current_time - 3600
-        self.access_patterns[cache_key] = [
-            t for t in self.access_patterns[cache_key] if t > hour_ago
-        ]
-        
-        # Update metadata
-        if cache_key in self.cache_metadata:
-            self.cache_metadata[cache_key]['access_count'] += 1
-    
-    def _is_frequently_accessed(self, cache_key: str) -> bool:
-        """Determine if a key is frequently accessed"""
-        if cache_key not in self.access_patterns:
-            return False
-        
-        recent_accesses = len(self.access_patterns[cache_key])
-        return recent_accesses >= 5  # 5 accesses in the last hour
-    
-    def _serialize_value(self, value: Any) -> Any:
-        """Serialize value for storage"""
-        if isinstance(value, (dict, list, tuple)):
-            return json.dumps(value, default=str)
-        return value
-    
-    def _deserialize_value(self, value: Any) -> Any:
-        """Deserialize value from storage"""
-        if isinstance(value, str):
-            try:
-                return json.loads(value)
-            except (json.JSONDecodeError, TypeError):
-                return value
-        return value
-    
+
+    async def get_or_set(self, key: str, loader: Callable[[], Awaitable[Any]],
+                         ttl: Optional[int] = None, namespace: str = "default",
+                         priority: str = "normal", stale_ttl: int = 0,
+                         tags: Optional[List[str]] = None) -> Any:
+        """
+        Cached value of key, calling loader() on a miss. Concurrent misses
+        for the same key share one loader call. With stale_ttl, a value is
+        still served for stale_ttl seconds after it goes stale while a
+        single background refresh replaces it. Values stored this way are
+        enveloped, so read them back through get_or_set rather than get.
+        """
+        ttl = ttl or self.default_ttl
+        cache_key = self._generate_cache_key(key, namespace)
+
+        async def load():
+            value = await loader()
+            if value is not None:
+                stored = wrap_fresh(value, ttl) if stale_ttl else value
+                await self.set(key, stored, ttl + stale_ttl, namespace, priority, tags)
+            return value
+
+        cached_value = await self.get(key, namespace)
+        if cached_value is not None:
+            value, stale = unwrap_fresh(cached_value)
+            if stale:
+                self.stats['stale'][namespace] += 1
+                self.flight.refresh(cache_key, load)
+            return value
+
+        return await self.flight.do(cache_key, load)
+
+    async def warm_up(self) -> int:
+        """Start the cache now, reloading the snapshot before the first request; entries loaded"""
+        await self._ensure_started()
+        return self.warm_start["snapshot_loaded"]
+
+    def _collect_snapshot(self) -> List[Dict[str, Any]]:
+        """Top snapshot_top_n live entries per namespace by access_count"""
+        now = time.time()
+        candidates = defaultdict(list)
+        for shard in self.shards:
+            with shard.lock:
+                for tier in shard.tiers:
+                    for cache_key, (payload, expiry, _) in tier.entries.items():
+                        if expiry <= now:
+                            continue
+                        metadata = shard.cache_metadata.get(cache_key, {})
+                        candidates[_namespace_of(cache_key)].append({
+                            "key": cache_key,
+                            "payload": base64.b64encode(payload).decode(),
+                            "expiry": expiry,
+                            "priority": metadata.get("priority", "normal"),
+                            "tags": metadata.get("tags", []),
+                            "access_count": metadata.get("access_count", 0)
+                        })
+        records = []
+        for entries in candidates.values():
+            entries.sort(key=lambda record: record["access_count"], reverse=True)
+            records.extend(entries[:self.config.snapshot_top_n])
+        return records
+
+    @staticmethod
+    def _write_snapshot(path: str, records: List[Dict[str, Any]]):
+        """JSON Lines, written to a temporary file and renamed into place"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _read_snapshot(path: str) -> List[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    async def save_snapshot(self) -> int:
+        """Write the hottest entries per namespace to snapshot_path"""
+        if not self.config.snapshot_path:
+            return 0
+        try:
+            records = self._collect_snapshot()
+            await asyncio.to_thread(self._write_snapshot, self.config.snapshot_path, records)
+            self.warm_start["snapshot_saved"] = len(records)
+            logger.info(f"💾 Cache snapshot saved: {len(records)} entries")
+            return len(records)
+        except Exception as e:
+            logger.error(f"❌ Cache snapshot save failed: {e}")
+            return 0
+
+    async def load_snapshot(self) -> int:
+        """Reload unexpired snapshot entries into the memory tiers"""
+        try:
+            records = await asyncio.to_thread(self._read_snapshot, self.config.snapshot_path)
+        except Exception as e:
+            logger.error(f"❌ Cache snapshot load failed: {e}")
+            return 0
+
+        now = time.time()
+        loaded = 0
+        for record in records:
+            if record["expiry"] <= now:
+                continue
+            cache_key = record["key"]
+            shard = self._shard_for(cache_key)
+            access_count = record.get("access_count", 0)
+            with shard.lock:
+                shard.cache_metadata[cache_key] = {
+                    'created': now,
+                    'ttl': int(record["expiry"] - now),
+                    'namespace': _namespace_of(cache_key),
+                    'priority': record.get("priority", "normal"),
+                    'tags': record.get("tags", []),
+                    'access_count': access_count
+                }
+                # Seed the sketch so restored hot keys keep winning admission
+                key_hash = _key_hash(cache_key)
+                for _ in range(min(access_count, FrequencySketch.MAX_COUNT)):
+                    shard.sketch.increment(key_hash)
+                level = 0 if record.get("priority") == "high" else 2
+                if shard.insert(cache_key, base64.b64decode(record["payload"]), record["expiry"],
+                                level=level, admit=False):
+                    loaded += 1
+        self.warm_start["snapshot_loaded"] = loaded
+        if records:
+            logger.info(f"💾 Cache snapshot loaded: {loaded} of {len(records)} entries")
+        return loaded
+
     async def _background_cleanup(self):
         """Background task to clean expired items"""
         while True:
             try:
                 await asyncio.sleep(300)  # Run every 5 minutes
                 current_time = time.time()
-                
-                with self._lock:
-                    # Clean expired items from all tiers
-                    for cache in [self.l1_cache, self.l2_cache, self.l3_cache]:
-                        expired_keys = []
-                        for key, (value, expiry) in cache.items():
-                            if expiry <= current_time:
-                                expired_keys.append(key)
-                        
-                        for key in expired_keys:
-                            del cache[key]
-                            if key in self.cache_metadata:
-                                del self.cache_metadata[key]
-                    
-                    # Clean access patterns older than 1 hour
-                    hour_ago = current_time - 3600
-                    for key in list(self.access_patterns.keys()):
-                        self.access_patterns[key] = [
-                            t for t in self.access_patterns[key] if t > hour_ago
-                        ]
-                        if not self.access_patterns[key]:
-                            del self.access_patterns[key]
-                
+
+                # One shard at a time so callers on other shards are never blocked
+                for shard in self.shards:
+                    with shard.lock:
+                        shard.cleanup(current_time)
+
+                if self.redis_available:
+                    await self._prune_indexes()
+
                 logger.debug("Cache cleanup completed")
-                
+
+            except asyncio.CancelledError:
+                break
             except Exception as e:
                 logger.error(f"Background cleanup error: {str(e)}")
-    
+
     def get_stats(self) -> Dict[str, Any]:
         """Get comprehensive cache statistics"""
-        with self._lock:
-            total_hits = sum(self.stats['hits'].values())
-            total_misses = sum(self.stats['misses'].values())
-            total_requests = total_hits + total_misses
-            hit_rate = (total_hits / total_requests * 100) if total_requests > 0 else 0
-            
-            return {
-                "hit_rate": f"{hit_rate:.1f}%",
-                "total_requests": total_requests,
-                "hits_by_tier": dict(self.stats['hits']),
-                "misses_by_namespace": dict(self.stats['misses']),
-                "sets_by_namespace": dict(self.stats['sets']),
-                "evictions_by_tier": dict(self.stats['evictions']),
-                "errors": dict(self.stats['errors']),
-                "cache_sizes": {
-                    "l1": len(self.l1_cache),
-                    "l2": len(self.l2_cache),
-                    "l3": len(self.l3_cache)
-                },
-                "memory_usage": {
-                    "total_keys": len(self.cache_metadata),
-                    "average_item_size": sum(
-                        meta.get('size', 0) for meta in self.cache_metadata.values()
-                    ) / max(len(self.cache_metadata), 1)
+        total_hits = sum(self.stats['hits'].values())
+        total_misses = sum(self.stats['misses'].values())
+        total_requests = total_hits + total_misses
+        hit_rate = (total_hits / total_requests * 100) if total_requests > 0 else 0
+
+        sizes = {"l1": 0, "l2": 0, "l3": 0}
+        tier_bytes = {"l1": 0, "l2": 0, "l3": 0}
+        namespace_bytes = defaultdict(int)
+        namespace_keys = defaultdict(int)
+        evictions = defaultdict(int)
+        admissions = defaultdict(int)
+        for shard in self.shards:
+            with shard.lock:
+                for tier in shard.tiers:
+                    sizes[tier.name] += len(tier)
+                    tier_bytes[tier.name] += tier.bytes
+                for namespace, used in shard.namespace_bytes.items():
+                    namespace_bytes[namespace] += used
+                    namespace_keys[namespace] += shard.namespace_keys[namespace]
+                for tier, count in shard.evictions.items():
+                    evictions[tier] += count
+                for outcome, count in shard.admissions.items():
+                    admissions[outcome] += count
+        total_keys = sum(sizes.values())
+        total_size = sum(tier_bytes.values())
+
+        return {
+            "hit_rate": f"{hit_rate:.1f}%",
+            "total_requests": total_requests,
+            "hits_by_tier": dict(self.stats['hits']),
+            "misses_by_namespace": dict(self.stats['misses']),
+            "sets_by_namespace": dict(self.stats['sets']),
+            "evictions_by_tier": dict(evictions),
+            "admissions": dict(admissions),
+            "errors": dict(self.stats['errors']),
+            "stale_by_namespace": dict(self.stats['stale']),
+            "single_flight": self.flight.get_stats(),
+            "cache_sizes": sizes,
+            "shards": len(self.shards),
+            "memory_usage": {
+                "total_keys": total_keys,
+                "total_bytes": total_size,
+                "average_item_size": total_size / max(total_keys, 1),
+                "bytes_by_tier": tier_bytes,
+                "budget_bytes": {
+                    "l1": self.config.l1_max_bytes,
+                    "l2": self.config.l2_max_bytes,
+                    "l3": self.config.l3_max_bytes
                 },
-                "redis_available": self.redis_available
-            }
-    
-    def cache_decorator(self, ttl: int = None, namespace: str = "default", 
-                       priority: str = "normal"):
-        """Decorator for automatic function result caching"""
+                "bytes_by_namespace": dict(namespace_bytes),
+                "keys_by_namespace": dict(namespace_keys)
+            },
+            "codec": self.codec.describe(),
+            "warm_start": {**self.warm_start, **self.hit_rate_tracker.get_stats()},
+            "redis_available": self.redis_available
+        }
+
+    async def close(self):
+        """Save the snapshot, stop background cleanup and close the Redis connection"""
+        if self._started:
+            await self.save_snapshot()
+        if self._cleanup_task and not self._cleanup_task.done():
+            self._cleanup_task.cancel()
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.close()
+            except Exception as e:
+                logger.debug(f"Redis close failed: {e}")
+
+    def cache_decorator(self, ttl: int = None, namespace: str = "default",
+                       priority: str = "normal", stale_ttl: int = 0,
+                       single_flight: bool = True):
+        """
+        Decorator for automatic function result caching. Concurrent calls
+        with the same arguments share one execution unless single_flight is
+        False; stale_ttl enables stale-while-revalidate.
+        """
         def decorator(func):
             @wraps(func)
             async def wrapper(*args, **kwargs):
                 # Create cache key from function name and arguments
                 key_parts = [func.__name__, str(args), str(sorted(kwargs.items()))]
                 cache_key = hashlib.md5(str(key_parts).encode()).hexdigest()
-                
+
+                if single_flight or stale_ttl:
+                    return await self.get_or_set(
+                        cache_key, lambda: func(*args, **kwargs),
+                        ttl, namespace, priority, stale_ttl
+                    )
+
                 # Try to get from cache
                 cached_result = await self.get(cache_key, namespace)
                 if cached_result is not None:
                     return cached_result
-                
+
                 # Execute function and cache result
                 result = await func(*args, **kwargs)
                 await self.set(cache_key, result, ttl, namespace, priority)
-                
+
                 return result
-            
+
             return wrapper
         return decorator
 
@@ -456,15 +1003,28 @@ async def get_cached(key: str, namespace: str = "default") -> Optional[Any]:
     """Convenience function to get from cache"""
     return await cache_system.get(key, namespace)
 
-async def set_cached(key: str, value: Any, ttl: Optional[int] = None, 
-                    namespace: str = "default", priority: str = "normal") -> bool:
+async def set_cached(key: str, value: Any, ttl: Optional[int] = None,
+                    namespace: str = "default", priority: str = "normal",
+                    tags: Optional[List[str]] = None) -> bool:
     """Convenience function to set in cache"""
-    return await cache_system.set(key, value, ttl, namespace, priority)
+    return await cache_system.set(key, value, ttl, namespace, priority, tags)
 
 async def delete_cached(key: str, namespace: str = "default") -> bool:
     """Convenience function to delete from cache"""
     return await cache_system.delete(key, namespace)
 
-def cached(ttl: int = None, namespace: str = "default", priority: str = "normal"):
+async def get_or_set_cached(key: str, loader: Callable[[], Awaitable[Any]],
+                            ttl: Optional[int] = None, namespace: str = "default",
+                            priority: str = "normal", stale_ttl: int = 0,
+                            tags: Optional[List[str]] = None) -> Any:
+    """Convenience function for a coalesced, optionally stale-while-revalidate load"""
+    return await cache_system.get_or_set(key, loader, ttl, namespace, priority, stale_ttl, tags)
+
+async def invalidate_cached_tag(tag: str) -> int:
+    """Convenience function to clear every item written with a tag"""
+    return await cache_system.invalidate_tag(tag)
+
+def cached(ttl: int = None, namespace: str = "default", priority: str = "normal",
+           stale_ttl: int = 0, single_flight: bool = True):
     """Decorator for caching function results"""
-    return cache_system.cache_decorator(ttl, namespace, priority)
\ No newline at end of file
+    return cache_system.cache_decorator(ttl, namespace, priority, stale_ttl, single_flight)
@@ -0,0 +1,115 @@
+"""
+AETHER Cache Codec Benchmark
+Encode/decode time and payload size of the cache codecs on page-content
+and AI-response shaped values
+
+Usage:
+    python codec_benchmark.py
+    python codec_benchmark.py --iterations 5000 --page-words 8000
+
+"legacy" is the previous Redis path: json.dumps of the value, then pickle
+of (json_string, expiry). Codec rows only list serializers and compressors
+installed here; msgpack, zstandard and lz4 are optional.
+"""
+
+import argparse
+import json
+import pickle
+import random
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+import cache_codec
+from cache_codec import CacheCodec, CodecConfig
+
+WORDS = (
+    "browser agent session page search results account settings privacy update "
+    "download article news product price review cart checkout login profile "
+    "the a of and to in for on with by from about more help contact learn"
+).split()
+
+def make_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def page_content(rng: random.Random, words: int) -> Dict[str, Any]:
+    """Shape of a cached extract_page_data result plus page text"""
+    return {
+        "url": "https://example.com/articles/browser-automation",
+        "title": make_text(rng, 8),
+        "content": make_text(rng, words),
+        "headings": [{"tag": rng.choice(["h1", "h2", "h3"]), "text": make_text(rng, 6)} for _ in range(25)],
+        "links": [{"text": make_text(rng, 4), "href": f"https://example.com/link/{i}"} for i in range(20)],
+        "images": [{"alt": make_text(rng, 5), "src": f"https://cdn.example.com/img/{i}.png"} for i in range(10)],
+        "extracted_at": datetime.utcnow().isoformat()
+    }
+
+def ai_response(rng: random.Random, words: int) -> Dict[str, Any]:
+    """Shape of a CacheManager AI response entry"""
+    return {
+        "response": make_text(rng, words),
+        "provider": "groq",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+def legacy_codec() -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    def encode(value: Any) -> bytes:
+        return pickle.dumps((json.dumps(value, default=str), time.time() + 300))
+
+    def decode(payload: bytes) -> Any:
+        serialized, _ = pickle.loads(payload)
+        return json.loads(serialized)
+
+    return encode, decode
+
+def codecs() -> List[Tuple[str, Callable[[Any], bytes], Callable[[bytes], Any]]]:
+    candidates = [("legacy", *legacy_codec())]
+    serializers = ["msgpack"] if cache_codec.MSGPACK_AVAILABLE else []
+    serializers.append("json")
+    compressions = ["none", "zlib"]
+    if cache_codec.LZ4_AVAILABLE:
+        compressions.append("lz4")
+    if cache_codec.ZSTD_AVAILABLE:
+        compressions.append("zstd")
+    for serializer in serializers:
+        for compression in compressions:
+            codec = CacheCodec(CodecConfig(serializer=serializer, compression=compression))
+            candidates.append((f"{serializer}+{compression}", codec.encode, codec.decode))
+    return candidates
+
+def measure(encode: Callable[[Any], bytes], decode: Callable[[bytes], Any],
+            value: Any, iterations: int) -> Tuple[float, float, int]:
+    """(encode µs, decode µs, payload bytes)"""
+    payload = encode(value)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        encode(value)
+    encode_us = (time.perf_counter() - started) / iterations * 1e6
+    started = time.perf_counter()
+    for _ in range(iterations):
+        decode(payload)
+    decode_us = (time.perf_counter() - started) / iterations * 1e6
+    return encode_us, decode_us, len(payload)
+
+def main(args):
+    rng = random.Random(42)
+    shapes = {
+        "page content": page_content(rng, args.page_words),
+        "ai response": ai_response(rng, args.ai_words)
+    }
+    print(f"msgpack={cache_codec.MSGPACK_AVAILABLE} orjson={cache_codec.ORJSON_AVAILABLE} "
+          f"zstd={cache_codec.ZSTD_AVAILABLE} lz4={cache_codec.LZ4_AVAILABLE}  iterations: {args.iterations}")
+
+    for shape, value in shapes.items():
+        print(f"\n{shape}")
+        print(f"{'codec':>14} {'encode µs':>10} {'decode µs':>10} {'bytes':>9}")
+        for name, encode, decode in codecs():
+            encode_us, decode_us, size = measure(encode, decode, value, args.iterations)
+            print(f"{name:>14} {encode_us:>10.1f} {decode_us:>10.1f} {size:>9,}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cache codec encode/decode cost and payload size")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--page-words", type=int, default=5000)
+    parser.add_argument("--ai-words", type=int, default=300)
+    main(parser.parse_args())
@@ -10,11 +10,27 @@ import json
 import hashlib
 import logging
 from enum import Enum
-from pymongo import MongoClient
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+from database import async_collections, register_indexes
 import aiohttp
 
 logger = logging.getLogger(__name__)
 
+register_indexes("sync_rules", IndexModel([("rule_id", ASCENDING)]))
+register_indexes(
+    "sync_operations",
+    IndexModel([("operation_id", ASCENDING)]),
+    IndexModel([("rule_id", ASCENDING), ("started_at", DESCENDING)])
+)
+register_indexes(
+    "sync_conflicts",
+    IndexModel([("conflict_id", ASCENDING)]),
+    IndexModel([("operation_id", ASCENDING)]),
+    IndexModel([("resolved", ASCENDING)])
+)
+register_indexes("platform_connections", IndexModel([("platform_id", ASCENDING)]))
+
 class SyncStatus(Enum):
     """Synchronization status"""
     PENDING = "pending"
@@ -99,8 +115,8 @@ class DataConflict:
 class CrossPlatformSyncEngine:
     """Real-time multi-platform synchronization engine"""
     
-    def __init__(self, db_client: MongoClient):
-        self.db = db_client.aether_browser
+    def __init__(self):
+        self.db = async_collections.db
         self.sync_rules = self.db.sync_rules
         self.sync_operations = self.db.sync_operations
         self.sync_conflicts = self.db.sync_conflicts
@@ -228,7 +244,7 @@ class CrossPlatformSyncEngine:
             rule_doc["created_at"] = datetime.utcnow()
             rule_doc["conflict_resolution"] = sync_rule.conflict_resolution.value
             
-            self.sync_rules.insert_one(rule_doc)
+            await self.sync_rules.insert_one(rule_doc)
             
             # Start real-time sync if configured
             if sync_rule.sync_frequency == "real_time":
@@ -253,7 +269,7 @@ class CrossPlatformSyncEngine:
         """Execute synchronization for a specific rule"""
         try:
             # Get sync rule
-            rule_doc = self.sync_rules.find_one({"rule_id": rule_id})
+            rule_doc = await self.sync_rules.find_one({"rule_id": rule_id})
             if not rule_doc:
                 return {"success": False, "error": "Sync rule not found"}
             
@@ -320,7 +336,7 @@ class CrossPlatformSyncEngine:
     async def setup_realtime_sync(self, rule_id: str) -> Dict[str, Any]:
         """Setup real-time synchronization for a rule"""
         try:
-            rule_doc = self.sync_rules.find_one({"rule_id": rule_id})
+            rule_doc = await self.sync_rules.find_one({"rule_id": rule_id})
             if not rule_doc:
                 return {"success": False, "error": "Sync rule not found"}
             
@@ -356,7 +372,7 @@ class CrossPlatformSyncEngine:
         """Resolve synchronization conflicts"""
         try:
             # Get conflict
-            conflict_doc = self.sync_conflicts.find_one({"operation_id": operation_id})
+            conflict_doc = await self.sync_conflicts.find_one({"operation_id": operation_id})
             if not conflict_doc:
                 return {"success": False, "error": "Conflict not found"}
             
@@ -372,7 +388,7 @@ class CrossPlatformSyncEngine:
             
             if resolved_data["success"]:
                 # Update conflict as resolved
-                self.sync_conflicts.update_one(
+                await self.sync_conflicts.update_one(
                     {"conflict_id": conflict.conflict_id},
                     {
                         "$set": {
@@ -408,16 +424,16 @@ class CrossPlatformSyncEngine:
         """Get synchronization status for a rule"""
         try:
             # Get recent operations
-            operations = list(self.sync_operations.find(
+            operations = await self.sync_operations.find(
                 {"rule_id": rule_id},
                 {"_id": 0}
-            ).sort("started_at", -1).limit(10))
+            ).sort("started_at", -1).limit(10).to_list(10)
             
             # Get pending conflicts
-            conflicts = list(self.sync_conflicts.find(
+            conflicts = await self.sync_conflicts.find(
                 {"resolved": False},
                 {"_id": 0}
-            ))
+            ).to_list(None)
             
             # Calculate statistics
             total_operations = len(operations)
@@ -457,7 +473,7 @@ class CrossPlatformSyncEngine:
             adapter = self.adapters[platform_id]
             
             # Get platform connection
-            connection = self.platform_connections.find_one({"platform_id": platform_id})
+            connection = await self.platform_connections.find_one({"platform_id": platform_id})
             if not connection:
                 return {"success": False, "error": f"Platform {platform_id} not connected"}
             
@@ -538,7 +554,7 @@ class CrossPlatformSyncEngine:
             operation_doc["status"] = operation.status.value
             operation_doc["started_at"] = operation.started_at
             
-            self.sync_operations.insert_one(operation_doc)
+            await self.sync_operations.insert_one(operation_doc)
             
             # Transform data for target platform
             transformed_data = await self.transformer.transform_data(
@@ -585,7 +601,7 @@ class CrossPlatformSyncEngine:
             # Update operation
             operation.completed_at = datetime.utcnow()
             
-            self.sync_operations.update_one(
+            await self.sync_operations.update_one(
                 {"operation_id": operation_id},
                 {
                     "$set": {
@@ -653,7 +669,7 @@ class CrossPlatformSyncEngine:
             conflict_id = str(uuid.uuid4())
             
             # Get operation details
-            operation = self.sync_operations.find_one({"operation_id": operation_id})
+            operation = await self.sync_operations.find_one({"operation_id": operation_id})
             
             conflict = DataConflict(
                 conflict_id=conflict_id,
@@ -672,7 +688,7 @@ class CrossPlatformSyncEngine:
             conflict_doc["created_at"] = datetime.utcnow()
             conflict_doc["resolution_strategy"] = conflict.resolution_strategy.value
             
-            self.sync_conflicts.insert_one(conflict_doc)
+            await self.sync_conflicts.insert_one(conflict_doc)
             
         except Exception as e:
             logger.error(f"Conflict record creation error: {e}")
@@ -703,7 +719,7 @@ class CrossPlatformSyncEngine:
         """Apply conflict-resolved data"""
         try:
             # Get operation
-            operation = self.sync_operations.find_one({"operation_id": operation_id})
+            operation = await self.sync_operations.find_one({"operation_id": operation_id})
             if not operation:
                 return {"success": False, "error": "Operation not found"}
             
@@ -716,7 +732,7 @@ class CrossPlatformSyncEngine:
             
             if result["success"]:
                 # Update operation status
-                self.sync_operations.update_one(
+                await self.sync_operations.update_one(
                     {"operation_id": operation_id},
                     {
                         "$set": {
@@ -891,9 +907,9 @@ class SyncChannel:
 
 
 # Initialize functions for integration
-def initialize_cross_platform_sync_engine(db_client: MongoClient) -> CrossPlatformSyncEngine:
+def initialize_cross_platform_sync_engine() -> CrossPlatformSyncEngine:
     """Initialize and return cross-platform sync engine"""
-    return CrossPlatformSyncEngine(db_client)
+    return CrossPlatformSyncEngine()
 
 def get_cross_platform_sync_engine() -> Optional[CrossPlatformSyncEngine]:
     """Get the global cross-platform sync engine instance"""
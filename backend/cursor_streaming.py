@@ -0,0 +1,125 @@
+"""
+AETHER Cursor Streaming
+Batched cursor iteration, keyset pagination and JSON Lines / CSV chunk encoding
+"""
+
+import base64
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any, List, AsyncIterator, Iterable, Callable, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+# Documents fetched per cursor round trip
+STREAM_BATCH_SIZE = 500
+
+# Rows encoded per yielded chunk
+ROWS_PER_CHUNK = 200
+
+def encode_cursor(timestamp: datetime, doc_id: ObjectId) -> str:
+    """Opaque page token for the last document of a page"""
+    raw = f"{timestamp.isoformat()}|{doc_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(token: str) -> Tuple[datetime, ObjectId]:
+    """Inverse of encode_cursor; raises ValueError on a malformed token"""
+    try:
+        timestamp, doc_id = base64.urlsafe_b64decode(token.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(timestamp), ObjectId(doc_id)
+    except Exception as e:
+        raise ValueError(f"Invalid page cursor: {e}")
+
+def keyset_filter(query: Dict[str, Any], time_field: str, cursor: Optional[str],
+                  descending: bool = True) -> Dict[str, Any]:
+    """Restrict a query to documents after the cursor in (time_field, _id) order"""
+    if not cursor:
+        return query
+    timestamp, doc_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    after = {"$or": [
+        {time_field: {op: timestamp}},
+        {time_field: timestamp, "_id": {op: doc_id}}
+    ]}
+    return {"$and": [query, after]} if query else after
+
+async def iter_documents(collection: AsyncIOMotorCollection, query: Dict[str, Any],
+                         projection: Optional[Dict[str, Any]] = None,
+                         time_field: str = "timestamp", descending: bool = False,
+                         batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+    """Yield every matching document in (time_field, _id) order, batch_size per round trip"""
+    direction = DESCENDING if descending else ASCENDING
+    cursor = collection.find(query, projection).sort(
+        [(time_field, direction), ("_id", direction)]
+    ).batch_size(batch_size)
+    async for document in cursor:
+        yield document
+
+async def fetch_page(collection: AsyncIOMotorCollection, query: Dict[str, Any],
+                     projection: Optional[Dict[str, Any]] = None,
+                     time_field: str = "timestamp", limit: int = 50,
+                     cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Newest-first page after the cursor plus the token for the next page
+
+    The projection must keep time_field; _id is stripped from the returned
+    documents after it has been used for the token.
+    """
+    direction = DESCENDING
+    documents = await collection.find(keyset_filter(query, time_field, cursor), projection).sort(
+        [(time_field, direction), ("_id", direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        next_cursor = encode_cursor(last[time_field], last["_id"])
+    for document in documents:
+        document.pop("_id", None)
+    return documents, next_cursor
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+async def stream_jsonl(documents: AsyncIterator[Dict[str, Any]],
+                       transform: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+                       rows_per_chunk: int = ROWS_PER_CHUNK) -> AsyncIterator[str]:
+    """JSON Lines chunks, one document per line"""
+    lines = []
+    async for document in documents:
+        document.pop("_id", None)
+        if transform:
+            document = transform(document)
+        lines.append(json.dumps(document, default=_json_default))
+        if len(lines) >= rows_per_chunk:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+async def stream_csv(rows: AsyncIterator[Iterable[Any]], header: Iterable[str],
+                     rows_per_chunk: int = ROWS_PER_CHUNK) -> AsyncIterator[str]:
+    """CSV chunks starting with the header row"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    writer.writerow(header)
+    count = 0
+    async for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count >= rows_per_chunk:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            count = 0
+    remainder = buffer.getvalue()
+    if remainder:
+        yield remainder
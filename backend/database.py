@@ -3,8 +3,12 @@ Database module for AETHER Browser
 Provides database connection and utilities
 """
 
+import importlib
 import os
-from pymongo import MongoClient
+from typing import Dict, Any, List
+from pymongo import MongoClient, IndexModel
+from pymongo.errors import PyMongoError
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from dotenv import load_dotenv
 import logging
 
@@ -17,6 +21,37 @@ logger = logging.getLogger(__name__)
 _client = None
 _db = None
 
+# Global async (Motor) client for use inside async handlers
+_async_client = None
+_async_db = None
+
+# Indexes declared by the modules that query each collection, see register_indexes()
+INDEX_REGISTRY: Dict[str, List[IndexModel]] = {}
+
+# Modules that call register_indexes() at import; ensure_indexes() imports them
+# so their indexes exist whether or not the entry point has loaded them yet
+INDEXED_MODULES = (
+    "native_chromium_engine",
+    "timeline_manager",
+    "enhanced_timeline_manager",
+    "timeline_navigation_system",
+    "background_task_processor",
+    "realtime_analytics_dashboard",
+    "agent_marketplace",
+    "split_view_engine",
+    "cross_platform_sync_engine",
+)
+
+def get_client_options() -> Dict[str, Any]:
+    """Connection pool settings shared by the sync and async clients"""
+    return {
+        'maxPoolSize': int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+        'minPoolSize': int(os.getenv("MONGO_MIN_POOL_SIZE", "10")),
+        'maxIdleTimeMS': int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")),
+        'waitQueueTimeoutMS': int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000")),
+        'serverSelectionTimeoutMS': int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    }
+
 def get_database():
     """Get MongoDB database instance"""
     global _client, _db
@@ -27,7 +62,7 @@ def get_database():
             if not mongo_url:
                 raise Exception("MONGO_URL environment variable not set")
             
-            _client = MongoClient(mongo_url, maxPoolSize=50, minPoolSize=10)
+            _client = MongoClient(mongo_url, **get_client_options())
             _db = _client.aether_browser
             
             # Test connection
@@ -49,22 +84,95 @@ def get_client():
     
     return _client
 
+def get_async_database() -> AsyncIOMotorDatabase:
+    """Get Motor database instance; operations must be awaited"""
+    global _async_client, _async_db
+    
+    if _async_db is None:
+        mongo_url = os.getenv("MONGO_URL")
+        if not mongo_url:
+            raise Exception("MONGO_URL environment variable not set")
+        
+        # Motor connects lazily on the first awaited operation
+        _async_client = AsyncIOMotorClient(mongo_url, **get_client_options())
+        _async_db = _async_client.aether_browser
+        logger.info("Async database client created")
+    
+    return _async_db
+
+def get_async_client() -> AsyncIOMotorClient:
+    """Get Motor client instance"""
+    if _async_client is None:
+        get_async_database()
+    
+    return _async_client
+
+def register_indexes(collection: str, *indexes: IndexModel):
+    """Declare indexes a module relies on; ensure_indexes() creates them at startup"""
+    registered = INDEX_REGISTRY.setdefault(collection, [])
+    names = {index.document['name'] for index in registered}
+    for index in indexes:
+        if index.document['name'] not in names:
+            registered.append(index)
+            names.add(index.document['name'])
+
+async def ensure_indexes() -> Dict[str, Any]:
+    """Create every registered index
+    
+    create_indexes is a no-op for indexes that already exist with the same
+    spec, so this is safe to run on every startup. A conflicting definition
+    only fails its own collection.
+    """
+    for module in INDEXED_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            logger.warning(f"Skipping indexes of {module}: {e}")
+    
+    db = get_async_database()
+    created = 0
+    errors = {}
+    
+    for collection, indexes in INDEX_REGISTRY.items():
+        try:
+            await db[collection].create_indexes(indexes)
+            created += len(indexes)
+        except PyMongoError as e:
+            errors[collection] = str(e)
+            logger.error(f"Index creation failed for {collection}: {e}")
+    
+    logger.info(f"Ensured {created} indexes on {len(INDEX_REGISTRY) - len(errors)} collections")
+    return {"indexes": created, "collections": len(INDEX_REGISTRY), "errors": errors}
+
 def close_database():
-    """Close database connection"""
-    global _client, _db
+    """Close database connections"""
+    global _client, _db, _async_client, _async_db
     
     if _client:
         _client.close()
         _client = None
         _db = None
         logger.info("Database connection closed")
+    
+    if _async_client:
+        _async_client.close()
+        _async_client = None
+        _async_db = None
+        logger.info("Async database connection closed")
 
 # Collections helper
 class Collections:
     """Database collections accessor"""
     
-    def __init__(self):
-        self.db = get_database()
+    def __init__(self, db=None):
+        self._db = db
+    
+    @property
+    def db(self):
+        # Resolved on first use so importing this module does not connect
+        if self._db is None:
+            self._db = get_database()
+        return self._db
     
     @property
     def chat_sessions(self):
@@ -121,6 +229,60 @@ class Collections:
     @property
     def keyboard_shortcuts(self):
         return self.db.keyboard_shortcuts
+    
+    @property
+    def native_sessions(self):
+        return self.db.native_sessions
+    
+    @property
+    def background_tasks(self):
+        return self.db.background_tasks
+    
+    @property
+    def task_execution_logs(self):
+        return self.db.task_execution_logs
+    
+    @property
+    def task_quota_counters(self):
+        return self.db.task_quota_counters
+    
+    @property
+    def timeline_entries(self):
+        return self.db.timeline_entries
+    
+    @property
+    def timeline_bookmarks(self):
+        return self.db.timeline_bookmarks
+    
+    @property
+    def timeline_events(self):
+        return self.db.timeline_events
+    
+    @property
+    def timeline_sessions(self):
+        return self.db.timeline_sessions
+    
+    @property
+    def timeline_analytics(self):
+        return self.db.timeline_analytics
+    
+    @property
+    def realtime_metrics(self):
+        return self.db.realtime_metrics
+
+class AsyncCollections(Collections):
+    """Collections accessor backed by Motor, for async handlers
+    
+    Same collection names as Collections, but every operation is a coroutine
+    so a slow query no longer blocks the event loop.
+    """
+    
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        if self._db is None:
+            self._db = get_async_database()
+        return self._db
 
-# Global collections instance
-collections = Collections()
\ No newline at end of file
+# Global collections instances
+collections = Collections()
+async_collections = AsyncCollections()
\ No newline at end of file
@@ -240,7 +240,7 @@ class WorkstreamManager:
         # Workstream C: Automation
         if WORKSTREAM_C_AVAILABLE:
             self.workstreams['C'] = {
-                'agent_marketplace': AgentMarketplace(db),
+                'agent_marketplace': AgentMarketplace(),
                 'cross_platform_sync': CrossPlatformSyncEngine(),
                 'automation_engine': EnhancedAutomationEngine(),
                 'status': 'operational'
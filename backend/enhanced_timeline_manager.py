@@ -5,11 +5,29 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from enum import Enum
 from dataclasses import dataclass, asdict
-from pymongo import MongoClient
+from pymongo import IndexModel, ASCENDING, DESCENDING
 import logging
 
+from database import async_collections, register_indexes
+from write_behind import write_behind
+
 logger = logging.getLogger(__name__)
 
+register_indexes(
+    "timeline_events",
+    IndexModel([("user_session", ASCENDING), ("timestamp", DESCENDING)]),
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("timestamp", DESCENDING)])
+)
+register_indexes(
+    "timeline_sessions",
+    IndexModel([("user_session", ASCENDING), ("updated_at", DESCENDING)])
+)
+register_indexes(
+    "timeline_analytics",
+    IndexModel([("user_session", ASCENDING)])
+)
+
 class TimelineEventType(Enum):
     BROWSING = "browsing"
     CHAT = "chat"
@@ -56,8 +74,8 @@ class TimelineEvent:
 class EnhancedTimelineManager:
     """Advanced timeline management for tracking and visualizing user activities"""
     
-    def __init__(self, db_client: MongoClient):
-        self.db = db_client.aether_browser
+    def __init__(self):
+        self.db = async_collections.db
         
         # Collections
         self.timeline_events = self.db.timeline_events
@@ -105,7 +123,7 @@ class EnhancedTimelineManager:
         event_doc['event_type'] = event.event_type.value
         event_doc['priority'] = event.priority.value
         
-        self.timeline_events.insert_one(event_doc)
+        await write_behind.insert("timeline_events", event_doc)
         
         # Add to buffer for real-time updates
         self.event_buffer.append(event_doc)
@@ -135,9 +153,9 @@ class EnhancedTimelineManager:
             query["event_type"] = {"$in": event_types}
         
         # Get events
-        events = list(self.timeline_events.find(
+        events = await self.timeline_events.find(
             query, {"_id": 0}
-        ).sort("timestamp", -1).limit(limit))
+        ).sort("timestamp", -1).limit(limit).to_list(limit)
         
         # Convert timestamps to ISO format
         for event in events:
@@ -253,9 +271,9 @@ class EnhancedTimelineManager:
         final_query = {"$and": search_conditions}
         
         # Execute search
-        results = list(self.timeline_events.find(
+        results = await self.timeline_events.find(
             final_query, {"_id": 0}
-        ).sort("timestamp", -1).limit(100))
+        ).sort("timestamp", -1).limit(100).to_list(100)
         
         # Convert timestamps
         for result in results:
@@ -268,7 +286,7 @@ class EnhancedTimelineManager:
         """Get events related to a specific event"""
         
         # Get the target event
-        target_event = self.timeline_events.find_one({"id": event_id, "user_session": user_session})
+        target_event = await self.timeline_events.find_one({"id": event_id, "user_session": user_session})
         if not target_event:
             return []
         
@@ -276,34 +294,34 @@ class EnhancedTimelineManager:
         
         # Find explicitly related events
         if target_event.get("related_events"):
-            explicit_related = list(self.timeline_events.find(
+            explicit_related = await self.timeline_events.find(
                 {"id": {"$in": target_event["related_events"]}, "user_session": user_session},
                 {"_id": 0}
-            ))
+            ).to_list(None)
             related_events.extend(explicit_related)
         
         # Find events with same URL
         if target_event.get("url"):
-            url_related = list(self.timeline_events.find(
+            url_related = await self.timeline_events.find(
                 {
                     "url": target_event["url"],
                     "user_session": user_session,
                     "id": {"$ne": event_id}
                 },
                 {"_id": 0}
-            ).limit(5))
+            ).limit(5).to_list(5)
             related_events.extend(url_related)
         
         # Find events with similar tags
         if target_event.get("tags"):
-            tag_related = list(self.timeline_events.find(
+            tag_related = await self.timeline_events.find(
                 {
                     "tags": {"$in": target_event["tags"]},
                     "user_session": user_session,
                     "id": {"$ne": event_id}
                 },
                 {"_id": 0}
-            ).limit(5))
+            ).limit(5).to_list(5)
             related_events.extend(tag_related)
         
         # Remove duplicates and convert timestamps
@@ -336,7 +354,7 @@ class EnhancedTimelineManager:
             "metadata": {}
         }
         
-        self.timeline_sessions.insert_one(session_doc)
+        await self.timeline_sessions.insert_one(session_doc)
         
         logger.info(f"Created timeline session {session_id}: {session_name}")
         return session_id
@@ -344,10 +362,10 @@ class EnhancedTimelineManager:
     async def get_timeline_sessions(self, user_session: str) -> List[Dict[str, Any]]:
         """Get all timeline sessions for a user"""
         
-        sessions = list(self.timeline_sessions.find(
+        sessions = await self.timeline_sessions.find(
             {"user_session": user_session},
             {"_id": 0}
-        ).sort("updated_at", -1))
+        ).sort("updated_at", -1).to_list(None)
         
         # Convert timestamps
         for session in sessions:
@@ -418,7 +436,7 @@ class EnhancedTimelineManager:
             {"$group": {"_id": "$user_session", "event_count": {"$sum": 1}}}
         ]
         
-        active_users = list(self.timeline_events.aggregate(pipeline))
+        active_users = await self.timeline_events.aggregate(pipeline).to_list(None)
         
         for user_data in active_users:
             user_session = user_data["_id"]
@@ -433,7 +451,7 @@ class EnhancedTimelineManager:
             }
             
             # Store analytics
-            self.timeline_analytics.replace_one(
+            await self.timeline_analytics.replace_one(
                 {"user_session": user_session},
                 analytics,
                 upsert=True
@@ -489,7 +507,7 @@ class EnhancedTimelineManager:
         
         cutoff_date = datetime.utcnow() - timedelta(days=90)
         
-        result = self.timeline_events.delete_many({"timestamp": {"$lt": cutoff_date}})
+        result = await self.timeline_events.delete_many({"timestamp": {"$lt": cutoff_date}})
         
         if result.deleted_count > 0:
             logger.info(f"Cleaned up {result.deleted_count} old timeline events")
@@ -0,0 +1,269 @@
+"""
+AETHER Native Browser Shards
+Spreads native sessions over several Chromium processes with respawn on crash
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Set, Callable, Awaitable, Tuple
+
+import psutil
+from playwright.async_api import Browser, Page
+
+from native_context_pool import BrowserContextPool, ContextPoolConfig, PooledContext
+
+logger = logging.getLogger(__name__)
+
+def default_shard_count() -> int:
+    """NATIVE_BROWSER_SHARDS, or half the available cores"""
+    configured = os.getenv("NATIVE_BROWSER_SHARDS")
+    if configured:
+        return max(1, int(configured))
+    return max(1, (os.cpu_count() or 2) // 2)
+
+@dataclass
+class BrowserShard:
+    """One Chromium process and the contexts placed on it"""
+    shard_id: int
+    browser: Browser
+    context_pool: BrowserContextPool
+    session_ids: Set[str] = field(default_factory=set)
+    cpu_percent: float = 0.0
+    alive: bool = True
+    restarts: int = 0
+    launched_at: float = field(default_factory=time.time)
+
+    def load_score(self, cpu_weight: float) -> float:
+        """Context count plus recent CPU, cpu_weight percent counting as one context"""
+        return len(self.session_ids) + self.cpu_percent / cpu_weight
+
+class BrowserShardManager:
+    """Launches N browsers, places sessions on the least-loaded one, respawns dead ones"""
+
+    def __init__(self, playwright, launch_options: Dict[str, Any],
+                 setup_page: Callable[[Page, PooledContext], Awaitable[None]],
+                 pool_config: Optional[ContextPoolConfig] = None,
+                 shard_count: Optional[int] = None,
+                 on_sessions_orphaned: Optional[Callable[[Set[str]], Awaitable[None]]] = None,
+                 cpu_weight: float = 25.0,
+                 monitor_interval: float = 5.0):
+        self.playwright = playwright
+        self.launch_options = launch_options
+        self.setup_page = setup_page
+        self.pool_config = pool_config or ContextPoolConfig()
+        self.shard_count = shard_count or default_shard_count()
+        self.on_sessions_orphaned = on_sessions_orphaned
+        self.cpu_weight = cpu_weight
+        self.monitor_interval = monitor_interval
+        self.shards: Dict[int, BrowserShard] = {}
+        self.respawns = 0
+        self.migrated_sessions = 0
+
+        # Unique switch on each browser command line so its process tree can be found for CPU sampling
+        self._tag = uuid.uuid4().hex[:8]
+        self._processes: Dict[int, psutil.Process] = {}
+        # cpu_percent(None) measures since the previous call on the same object, so children are kept by pid
+        self._children: Dict[int, Dict[int, psutil.Process]] = {}
+        self._monitor_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def start(self):
+        """Launch every shard and begin CPU monitoring"""
+        shards = await asyncio.gather(*(self._launch_shard(i) for i in range(self.shard_count)))
+        for shard in shards:
+            self.shards[shard.shard_id] = shard
+        self._monitor_task = asyncio.create_task(self._monitor_loop())
+        logger.info(f"🔥 {len(self.shards)} browser shards launched")
+
+    @property
+    def primary_browser(self) -> Optional[Browser]:
+        shard = self.shards.get(0)
+        return shard.browser if shard else None
+
+    async def _launch_shard(self, shard_id: int, restarts: int = 0) -> BrowserShard:
+        options = dict(self.launch_options)
+        options['args'] = list(options.get('args', [])) + [f'--aether-shard={self._tag}-{shard_id}']
+        browser = await self.playwright.chromium.launch(**options)
+
+        pool = BrowserContextPool(browser, self.setup_page, self.pool_config)
+        shard = BrowserShard(shard_id=shard_id, browser=browser, context_pool=pool, restarts=restarts)
+        browser.on("disconnected", lambda *_: self._on_disconnected(shard))
+        await pool.start()
+        return shard
+
+    def pick_shard(self) -> BrowserShard:
+        """Least-loaded live shard by context count and recent CPU"""
+        live = [shard for shard in self.shards.values() if shard.alive]
+        if not live:
+            raise RuntimeError("No live browser shards available")
+        return min(live, key=lambda shard: shard.load_score(self.cpu_weight))
+
+    async def checkout(self, session_id: str, context_options: Optional[Dict[str, Any]] = None) -> Tuple[BrowserShard, PooledContext]:
+        """Place a session on a shard and take a context from its pool"""
+        shard = self.pick_shard()
+        shard.session_ids.add(session_id)
+        try:
+            pooled = await shard.context_pool.checkout(session_id, context_options)
+        except Exception:
+            shard.session_ids.discard(session_id)
+            raise
+        return shard, pooled
+
+    async def release(self, shard_id: int, session_id: str, pooled: PooledContext):
+        """Give a session's context back to the shard it lives on
+
+        After a respawn the shard id maps to a new browser; a context left
+        over from the dead one is closed rather than handed to the new pool.
+        """
+        shard = self.shards.get(shard_id)
+        if shard and pooled.context.browser is shard.browser:
+            shard.session_ids.discard(session_id)
+            if shard.alive:
+                await shard.context_pool.release(pooled)
+            return
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            logger.debug(f"Stale context close failed: {e}")
+
+    def _on_disconnected(self, shard: BrowserShard):
+        if self._closing or not shard.alive or self.shards.get(shard.shard_id) is not shard:
+            return
+        shard.alive = False
+        logger.error(f"❌ Browser shard {shard.shard_id} died with {len(shard.session_ids)} sessions")
+        asyncio.create_task(self._respawn(shard))
+
+    async def _respawn(self, dead: BrowserShard):
+        """Relaunch a dead shard, then hand its sessions back for migration"""
+        orphaned = set(dead.session_ids)
+        dead.session_ids.clear()
+        dead.context_pool.idle.clear()  # contexts died with the process
+        await dead.context_pool.close()
+        self._processes.pop(dead.shard_id, None)
+        self._children.pop(dead.shard_id, None)
+
+        delay = 1.0
+        while not self._closing:
+            try:
+                shard = await self._launch_shard(dead.shard_id, restarts=dead.restarts + 1)
+                self.shards[shard.shard_id] = shard
+                self.respawns += 1
+                logger.info(f"✅ Browser shard {shard.shard_id} respawned")
+                break
+            except Exception as e:
+                logger.error(f"❌ Browser shard {dead.shard_id} respawn failed: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+        if orphaned and self.on_sessions_orphaned and not self._closing:
+            self.migrated_sessions += len(orphaned)
+            await self.on_sessions_orphaned(orphaned)
+
+    def _find_process(self, shard_id: int) -> Optional[psutil.Process]:
+        process = self._processes.get(shard_id)
+        if process and process.is_running():
+            return process
+
+        marker = f'--aether-shard={self._tag}-{shard_id}'
+        for candidate in psutil.process_iter(['cmdline']):
+            cmdline = candidate.info.get('cmdline') or []
+            if marker in cmdline:
+                self._processes[shard_id] = candidate
+                return candidate
+        return None
+
+    def _sample_cpu(self, shard: BrowserShard):
+        """CPU of the browser process and its renderers since the last sample"""
+        process = self._find_process(shard.shard_id)
+        if not process:
+            return
+        try:
+            total = process.cpu_percent(None)
+            known = self._children.get(shard.shard_id, {})
+            current: Dict[int, psutil.Process] = {}
+            for child in process.children(recursive=True):
+                # Process equality includes create time, so a reused pid gets a fresh object
+                cached = known.get(child.pid)
+                current[child.pid] = cached if cached is not None and cached == child else child
+            for child in current.values():
+                try:
+                    total += child.cpu_percent(None)
+                except psutil.Error:
+                    continue
+            # Exited renderers drop out here
+            self._children[shard.shard_id] = current
+            shard.cpu_percent = total
+        except psutil.Error:
+            self._processes.pop(shard.shard_id, None)
+            self._children.pop(shard.shard_id, None)
+
+    async def _monitor_loop(self):
+        while not self._closing:
+            try:
+                for shard in list(self.shards.values()):
+                    if shard.alive:
+                        await asyncio.to_thread(self._sample_cpu, shard)
+                await asyncio.sleep(self.monitor_interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Browser shard monitor error: {e}")
+                await asyncio.sleep(self.monitor_interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-shard load and pool statistics"""
+        return {
+            'shard_count': len(self.shards),
+            'respawns': self.respawns,
+            'migrated_sessions': self.migrated_sessions,
+            'shards': [
+                {
+                    'shard_id': shard.shard_id,
+                    'alive': shard.alive,
+                    'sessions': len(shard.session_ids),
+                    'cpu_percent': round(shard.cpu_percent, 1),
+                    'restarts': shard.restarts,
+                    'context_pool': shard.context_pool.get_stats()
+                }
+                for shard in sorted(self.shards.values(), key=lambda s: s.shard_id)
+            ]
+        }
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Context pool statistics aggregated over all shards"""
+        stats = [shard.context_pool.get_stats() for shard in self.shards.values()]
+        hits = sum(s['hits'] for s in stats)
+        misses = sum(s['misses'] for s in stats)
+        latencies: List[float] = []
+        for shard in self.shards.values():
+            latencies.extend(shard.context_pool.checkout_latencies)
+        latencies.sort()
+        return {
+            'idle': sum(s['idle'] for s in stats),
+            'in_use': sum(s['in_use'] for s in stats),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'discarded': sum(s['discarded'] for s in stats),
+            'checkout_latency_ms': {
+                'avg': sum(latencies) / len(latencies) if latencies else 0.0,
+                'p95': latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+                'max': latencies[-1] if latencies else 0.0
+            }
+        }
+
+    async def close(self):
+        """Close every shard's pool and browser"""
+        self._closing = True
+        if self._monitor_task and not self._monitor_task.done():
+            self._monitor_task.cancel()
+        for shard in self.shards.values():
+            await shard.context_pool.close()
+            try:
+                await shard.browser.close()
+            except Exception as e:
+                logger.debug(f"Browser shard {shard.shard_id} close failed: {e}")
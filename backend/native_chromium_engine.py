@@ -10,20 +10,136 @@ import time
 import uuid
 import base64
 import os
+import struct
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 import websockets
 from dataclasses import dataclass, asdict
 import traceback
+from collections import OrderedDict
 
 # Playwright imports for native Chromium control
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
-from pymongo import MongoClient
+from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING
+
+from database import async_collections, register_indexes
+from native_context_pool import ContextPoolConfig, PooledContext, DEFAULT_CONTEXT_OPTIONS
+from native_browser_shards import BrowserShardManager
+from native_wait_strategy import AdaptiveWaitPolicy, WAIT_STRATEGIES
+from native_request_routing import RoutingPolicy, SessionRequestRouter
+from native_screencast import Screencast, ScreencastOptions
+from native_screenshot_cache import ScreenshotCache, MUTATION_COUNTER_SCRIPT, FINGERPRINT_SCRIPT
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+register_indexes(
+    "native_sessions",
+    IndexModel([("session_id", ASCENDING)]),
+    IndexModel([("user_session", ASCENDING), ("created_at", DESCENDING)])
+)
+
+# Chromium switches shared by every launch profile
+CHROMIUM_BASE_ARGS = [
+    '--disable-web-security',
+    '--disable-features=VizDisplayCompositor',
+    '--disable-extensions-except',
+    '--disable-extensions',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    '--disable-field-trial-config',
+    '--disable-back-forward-cache',
+    '--disable-ipc-flooding-protection',
+    '--enable-features=NetworkService,NetworkServiceInProcess',
+    '--force-color-profile=srgb',
+    '--metrics-recording-only',
+    '--use-mock-keychain'
+]
+
+@dataclass
+class LaunchProfile:
+    """Named set of browser launch flags; sessions pick one at creation"""
+    name: str
+    headless: bool
+    slow_mo: int = 0
+    extra_args: List[str] = None
+    shard_count: Optional[int] = None  # None uses the engine default
+    
+    def launch_options(self) -> Dict[str, Any]:
+        return {
+            'headless': self.headless,
+            'args': CHROMIUM_BASE_ARGS + (self.extra_args or []),
+            'slow_mo': self.slow_mo,
+            'timeout': 30000
+        }
+
+LAUNCH_PROFILES: Dict[str, LaunchProfile] = {
+    # Visible browser with slight delay for stability - the original behavior
+    'interactive': LaunchProfile(name='interactive', headless=False, slow_mo=50),
+    # Headless, no action delay, for API-driven automation
+    'automation-fast': LaunchProfile(name='automation-fast', headless=True),
+    # Headless content extraction without image decoding or audio
+    'scrape': LaunchProfile(
+        name='scrape',
+        headless=True,
+        extra_args=['--blink-settings=imagesEnabled=false', '--mute-audio']
+    )
+}
+
+DEFAULT_LAUNCH_PROFILE = os.getenv("NATIVE_DEFAULT_LAUNCH_PROFILE", "interactive")
+
+# Steps accepted by run_batch
+BATCH_ACTIONS = ('navigate', 'wait', 'click', 'type', 'extract', 'execute_js', 'smart_click', 'screenshot', 'get_content')
+MAX_BATCH_ACTIONS = 100
+
+def pack_binary_frame(header: Dict[str, Any], payload: bytes) -> bytes:
+    """Binary WebSocket frame: 4-byte big-endian header length, JSON header, raw payload"""
+    header_bytes = json.dumps(header, default=str).encode('utf-8')
+    return struct.pack('>I', len(header_bytes)) + header_bytes + payload
+
+@dataclass
+class SessionLifecycleConfig:
+    """Idle reaping, session cap and hibernation settings"""
+    idle_ttl: float = 1800.0  # seconds without activity before a session is reaped
+    max_sessions: int = 200  # live sessions; least recently used are evicted beyond this
+    hibernate: bool = False  # persist storage state to disk instead of closing
+    hibernate_dir: str = "/tmp/aether_hibernated_sessions"
+    hibernate_ttl: float = 86400.0  # seconds a hibernated session is kept on disk
+    reap_interval: float = 30.0
+    
+    @classmethod
+    def from_env(cls) -> "SessionLifecycleConfig":
+        """Build config from NATIVE_SESSION_* environment variables"""
+        max_sessions = int(os.getenv("NATIVE_SESSION_MAX", cls.max_sessions))
+        if max_sessions < 1:
+            raise ValueError(f"NATIVE_SESSION_MAX must be at least 1, got {max_sessions}")
+        return cls(
+            idle_ttl=float(os.getenv("NATIVE_SESSION_IDLE_TTL", cls.idle_ttl)),
+            max_sessions=max_sessions,
+            hibernate=os.getenv("NATIVE_SESSION_HIBERNATE", "false").lower() == "true",
+            hibernate_dir=os.getenv("NATIVE_SESSION_HIBERNATE_DIR", cls.hibernate_dir),
+            hibernate_ttl=float(os.getenv("NATIVE_SESSION_HIBERNATE_TTL", cls.hibernate_ttl))
+        )
+
+@dataclass
+class HibernatedSession:
+    """On-disk record of a session whose browser context was released"""
+    session_id: str
+    user_session: str
+    launch_profile: str
+    state_path: str
+    url: Optional[str] = None
+    context_options: Optional[Dict[str, Any]] = None
+    created_at: datetime = None
+    hibernated_at: datetime = None
+    performance_metrics: Dict[str, Any] = None
+    routing_policy: Optional[RoutingPolicy] = None
+
 @dataclass
 class NativeBrowserSession:
     """Native browser session data"""
@@ -37,6 +153,11 @@ class NativeBrowserSession:
     created_at: datetime = None
     last_activity: datetime = None
     performance_metrics: Dict[str, Any] = None
+    pooled_context: Optional[PooledContext] = None
+    shard_id: Optional[int] = None
+    launch_profile: str = DEFAULT_LAUNCH_PROFILE
+    routing_policy: Optional[RoutingPolicy] = None
+    screenshot_cache: Optional[ScreenshotCache] = None
     
     def __post_init__(self):
         if self.capabilities is None:
@@ -57,16 +178,30 @@ class NativeBrowserSession:
             self.last_activity = datetime.utcnow()
         if self.performance_metrics is None:
             self.performance_metrics = {}
+        if self.screenshot_cache is None:
+            self.screenshot_cache = ScreenshotCache()
 
 class NativeChromiumEngine:
     """Complete Native Chromium Engine with Computer Use API"""
     
-    def __init__(self, mongodb_client: MongoClient):
+    def __init__(self, mongodb_client: Optional[MongoClient] = None, pool_config: Optional[ContextPoolConfig] = None,
+                 shard_count: Optional[int] = None, lifecycle_config: Optional[SessionLifecycleConfig] = None):
         self.playwright = None
-        self.browser = None
-        self.sessions: Dict[str, NativeBrowserSession] = {}
+        self.shard_managers: Dict[str, BrowserShardManager] = {}
+        self._profile_locks: Dict[str, asyncio.Lock] = {}
+        self.pool_config = pool_config or ContextPoolConfig.from_env()
+        self.shard_count = shard_count
+        self.sessions: Dict[str, NativeBrowserSession] = OrderedDict()  # least recently used first
+        self.hibernated_sessions: Dict[str, HibernatedSession] = {}
+        self.lifecycle_config = lifecycle_config or SessionLifecycleConfig.from_env()
+        self.lifecycle_stats = {'reaped': 0, 'evicted': 0, 'hibernated': 0, 'restored': 0}
+        self._restore_locks: Dict[str, asyncio.Lock] = {}
+        self._reaper_task: Optional[asyncio.Task] = None
         self.websocket_connections: Dict[str, Any] = {}
-        self.db = mongodb_client.aether_browser
+        self.frame_formats: Dict[str, str] = {}  # session_id -> 'binary' | 'base64'
+        self.screencasts: Dict[str, Screencast] = {}
+        self.mongodb_client = mongodb_client
+        self.db = async_collections
         self.is_initialized = False
         
         # Performance monitoring
@@ -75,6 +210,49 @@ class NativeChromiumEngine:
         # Computer Use API
         self.computer_use_api = ComputerUseAPI()
         
+        # Per-domain navigation wait strategy learning
+        self.wait_policy = AdaptiveWaitPolicy()
+    
+    @property
+    def shard_manager(self) -> Optional[BrowserShardManager]:
+        """Shard manager of the default launch profile"""
+        return self.shard_managers.get(DEFAULT_LAUNCH_PROFILE)
+    
+    @property
+    def browser(self) -> Optional[Browser]:
+        """First shard's browser, for callers that expect a single browser"""
+        return self.shard_manager.primary_browser if self.shard_manager else None
+    
+    async def _get_shard_manager(self, profile_name: str) -> BrowserShardManager:
+        """Shard manager for a launch profile, launching its browsers on first use"""
+        manager = self.shard_managers.get(profile_name)
+        if manager:
+            return manager
+        
+        profile = LAUNCH_PROFILES.get(profile_name)
+        if not profile:
+            raise ValueError(f"Unknown launch profile: {profile_name}")
+        
+        lock = self._profile_locks.setdefault(profile_name, asyncio.Lock())
+        async with lock:
+            manager = self.shard_managers.get(profile_name)
+            if manager:
+                return manager
+            
+            # Each shard pre-warms its own context pool
+            manager = BrowserShardManager(
+                self.playwright,
+                profile.launch_options(),
+                self._setup_page_handlers,
+                pool_config=self.pool_config,
+                shard_count=profile.shard_count or self.shard_count,
+                on_sessions_orphaned=self._migrate_sessions
+            )
+            await manager.start()
+            self.shard_managers[profile_name] = manager
+            logger.info(f"🔥 Launch profile ready: {profile_name}")
+            return manager
+        
     async def initialize(self):
         """Initialize Playwright and Chromium browser"""
         try:
@@ -83,31 +261,11 @@ class NativeChromiumEngine:
             # Initialize Playwright
             self.playwright = await async_playwright().start()
             
-            # Launch Chromium with enhanced capabilities
-            self.browser = await self.playwright.chromium.launch(
-                headless=False,  # Show browser for native experience
-                args=[
-                    '--disable-web-security',
-                    '--disable-features=VizDisplayCompositor',
-                    '--disable-extensions-except',
-                    '--disable-extensions',
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-background-timer-throttling',
-                    '--disable-backgrounding-occluded-windows',
-                    '--disable-renderer-backgrounding',
-                    '--disable-field-trial-config',
-                    '--disable-back-forward-cache',
-                    '--disable-ipc-flooding-protection',
-                    '--enable-features=NetworkService,NetworkServiceInProcess',
-                    '--force-color-profile=srgb',
-                    '--metrics-recording-only',
-                    '--use-mock-keychain'
-                ],
-                slow_mo=50,  # Add slight delay for stability
-                timeout=30000
-            )
+            # Launch the default profile's Chromium shards; other profiles start on first use
+            await self._get_shard_manager(DEFAULT_LAUNCH_PROFILE)
+            
+            # Reap idle sessions in the background
+            self._reaper_task = asyncio.create_task(self._reaper_loop())
             
             self.is_initialized = True
             logger.info("✅ Native Chromium Engine initialized successfully")
@@ -118,40 +276,42 @@ class NativeChromiumEngine:
             logger.error(traceback.format_exc())
             return False
 
-    async def create_native_session(self, user_session: str, user_agent: str = None) -> Dict[str, Any]:
+    async def create_native_session(self, user_session: str, user_agent: str = None,
+                                    launch_profile: str = None,
+                                    routing_policy: Optional[RoutingPolicy] = None) -> Dict[str, Any]:
         """Create new native browser session"""
         try:
             if not self.is_initialized:
                 await self.initialize()
             
             session_id = f"native_{uuid.uuid4().hex[:12]}"
+            launch_profile = launch_profile or DEFAULT_LAUNCH_PROFILE
+            shard_manager = await self._get_shard_manager(launch_profile)
             
-            # Create browser context with enhanced capabilities
-            context_options = {
-                'viewport': {'width': 1920, 'height': 1080},
-                'user_agent': user_agent or 'AETHER-Native-Browser/6.0.0',
-                'java_script_enabled': True,
-                'accept_downloads': True,
-                'bypass_csp': True,  # Bypass CSP for enhanced access
-                'ignore_https_errors': True
-            }
-            
-            context = await self.browser.new_context(**context_options)
+            # Make room under the live-session cap
+            await self._enforce_session_cap()
             
-            # Create new page
-            page = await context.new_page()
+            # Browser context with enhanced capabilities; a custom user agent
+            # needs its own context, everything else comes warm from the pool
+            context_options = dict(DEFAULT_CONTEXT_OPTIONS)
+            if user_agent:
+                context_options['user_agent'] = user_agent
             
-            # Setup page event handlers
-            await self._setup_page_handlers(page, session_id)
+            shard, pooled = await shard_manager.checkout(session_id, context_options)
             
             # Create session object
             session = NativeBrowserSession(
                 session_id=session_id,
                 user_session=user_session,
-                browser=self.browser,
-                context=context,
-                page=page
+                browser=shard.browser,
+                context=pooled.context,
+                page=pooled.page,
+                pooled_context=pooled,
+                shard_id=shard.shard_id,
+                launch_profile=launch_profile,
+                routing_policy=routing_policy
             )
+            await self._install_request_routing(session)
             
             # Store session
             self.sessions[session_id] = session
@@ -165,6 +325,8 @@ class NativeChromiumEngine:
                 "success": True,
                 "session_id": session_id,
                 "capabilities": session.capabilities,
+                "launch_profile": launch_profile,
+                "request_blocking": routing_policy.to_dict() if routing_policy else None,
                 "viewport": context_options['viewport'],
                 "user_agent": context_options['user_agent']
             }
@@ -177,41 +339,77 @@ class NativeChromiumEngine:
                 "error": str(e)
             }
 
-    async def _setup_page_handlers(self, page: Page, session_id: str):
-        """Setup event handlers for page events"""
+    async def _install_request_routing(self, session: NativeBrowserSession):
+        """Route the session's context through its blocking policy, if it has one"""
+        if not session.routing_policy or not session.pooled_context:
+            return
+        router = SessionRequestRouter(session.routing_policy, session.performance_metrics)
+        await session.context.route("**/*", router.handle)
+        session.pooled_context.route_handler = router.handle
+
+    async def _setup_page_handlers(self, page: Page, lease: PooledContext):
+        """Setup event handlers for page events
+        
+        Handlers resolve the session through the lease at event time, so a
+        pre-warmed page can be instrumented before it belongs to a session.
+        """
         
         # Navigation handlers
-        page.on("load", lambda: self._handle_page_load(session_id))
-        page.on("domcontentloaded", lambda: self._handle_dom_ready(session_id))
+        page.on("load", lambda: self._handle_page_load(lease.session_id))
+        page.on("domcontentloaded", lambda: self._handle_dom_ready(lease.session_id))
         
         # Error handlers
-        page.on("pageerror", lambda error: self._handle_page_error(session_id, error))
-        page.on("crash", lambda: self._handle_page_crash(session_id))
+        page.on("pageerror", lambda error: self._handle_page_error(lease.session_id, error))
+        page.on("crash", lambda: self._handle_page_crash(lease.session_id))
         
         # Request/Response monitoring
-        page.on("request", lambda request: self._handle_request(session_id, request))
-        page.on("response", lambda response: self._handle_response(session_id, response))
+        page.on("request", lambda request: self._handle_request(lease.session_id, request))
+        page.on("response", lambda response: self._handle_response(lease.session_id, response))
         
         # Console monitoring
-        page.on("console", lambda msg: self._handle_console(session_id, msg))
+        page.on("console", lambda msg: self._handle_console(lease.session_id, msg))
+        
+        # DOM mutation counter for screenshot-cache fingerprints
+        await page.add_init_script(MUTATION_COUNTER_SCRIPT)
 
-    async def navigate_to_url(self, session_id: str, url: str, timeout: int = 30000) -> Dict[str, Any]:
-        """Navigate to URL using native browser"""
+    async def navigate_to_url(self, session_id: str, url: str, timeout: int = 30000,
+                              wait_until: str = None, wait_selector: str = None) -> Dict[str, Any]:
+        """Navigate to URL using native browser
+        
+        wait_until is one of WAIT_STRATEGIES; 'selector' waits for wait_selector
+        to become visible. Without either, the adaptive per-domain default is used.
+        """
+        wait_strategy = None
+        adaptive = False
         try:
-            session = self.sessions.get(session_id)
+            session = await self.get_session(session_id)
             if not session:
                 return {"success": False, "error": "Session not found"}
             
+            if wait_selector and not wait_until:
+                wait_until = 'selector'
+            if wait_until and wait_until not in WAIT_STRATEGIES:
+                return {"success": False, "error": f"Unknown wait strategy: {wait_until}"}
+            if wait_until == 'selector' and not wait_selector:
+                return {"success": False, "error": "wait_selector is required for the selector wait strategy"}
+            
+            adaptive = wait_until is None
+            wait_strategy = wait_until or self.wait_policy.choose(url)
+            
             start_time = time.time()
             
             # Navigate to URL
             response = await session.page.goto(
                 url, 
-                wait_until='networkidle',
+                wait_until='commit' if wait_strategy == 'selector' else wait_strategy,
                 timeout=timeout
             )
+            if wait_strategy == 'selector':
+                remaining = max(0, timeout - int((time.time() - start_time) * 1000))
+                await session.page.wait_for_selector(wait_selector, state='visible', timeout=remaining)
             
             load_time = time.time() - start_time
+            self.wait_policy.record_navigation(url, wait_strategy, load_time, True)
             
             # Get page info
             title = await session.page.title()
@@ -220,10 +418,16 @@ class NativeChromiumEngine:
             # Update performance metrics
             session.performance_metrics['last_navigation'] = {
                 'url': actual_url,
+                'requested_url': url,
                 'load_time': load_time,
+                'wait_strategy': wait_strategy,
+                'adaptive_wait': adaptive,
+                'time_to_ready': load_time,
                 'timestamp': datetime.utcnow().isoformat(),
                 'status_code': response.status if response else None
             }
+            strategy_counts = session.performance_metrics.setdefault('wait_strategy_counts', {})
+            strategy_counts[wait_strategy] = strategy_counts.get(wait_strategy, 0) + 1
             
             # Update last activity
             session.last_activity = datetime.utcnow()
@@ -240,27 +444,63 @@ class NativeChromiumEngine:
                 }
             })
             
-            logger.info(f"🔥 Native navigation successful: {actual_url} ({load_time:.2f}s)")
+            logger.info(f"🔥 Native navigation successful: {actual_url} ({load_time:.2f}s, {wait_strategy})")
             
             return {
                 "success": True,
                 "url": actual_url,
                 "title": title,
                 "load_time": load_time,
+                "wait_strategy": wait_strategy,
                 "status_code": response.status if response else None
             }
             
         except Exception as e:
+            if wait_strategy:
+                self.wait_policy.record_navigation(url, wait_strategy, None, False)
             logger.error(f"❌ Navigation failed: {e}")
             return {"success": False, "error": str(e)}
 
-    async def capture_screenshot(self, session_id: str, full_page: bool = False, quality: int = 80) -> Dict[str, Any]:
-        """Capture screenshot of current page"""
+    def _record_followup(self, session: Optional[NativeBrowserSession], success: bool):
+        """Feed the first action after a navigation back into the wait policy"""
+        if not session:
+            return
+        navigation = session.performance_metrics.get('last_navigation')
+        if not navigation or navigation.get('followup_recorded'):
+            return
+        navigation['followup_recorded'] = True
+        if not success:
+            self.wait_policy.record_followup_failure(navigation['requested_url'], navigation['wait_strategy'])
+
+    async def capture_screenshot(self, session_id: str, full_page: bool = False, quality: int = 80,
+                                 encoding: str = 'base64', reuse_if_unchanged: bool = False) -> Dict[str, Any]:
+        """Capture screenshot of current page
+        
+        encoding='binary' returns the raw JPEG under 'image' instead of a base64
+        'screenshot' string; base64 is kept for existing JSON clients.
+        reuse_if_unchanged returns the previous image when the page-state
+        fingerprint (URL, DOM mutations, input, image/font loads, viewport,
+        scroll) has not moved. Canvas drawing, video frames and CSS
+        background images that finish loading change none of these, so
+        pages built on them can be served a stale image; leave it off there.
+        """
         try:
-            session = self.sessions.get(session_id)
+            session = await self.get_session(session_id)
             if not session:
                 return {"success": False, "error": "Session not found"}
             
+            fingerprint = None
+            if reuse_if_unchanged:
+                cache = session.screenshot_cache
+                page_state = await session.page.evaluate(FINGERPRINT_SCRIPT)
+                fingerprint = ScreenshotCache.make_fingerprint(page_state, full_page, quality)
+                if cache.lookup(fingerprint):
+                    if encoding == 'binary':
+                        return {"success": True, "image": cache.image, "metadata": cache.metadata, "cached": True}
+                    if cache.image_b64 is None:
+                        cache.image_b64 = base64.b64encode(cache.image).decode('utf-8')
+                    return {"success": True, "screenshot": cache.image_b64, "metadata": cache.metadata, "cached": True}
+            
             # Capture screenshot
             screenshot_bytes = await session.page.screenshot(
                 full_page=full_page,
@@ -268,9 +508,6 @@ class NativeChromiumEngine:
                 type='jpeg'
             )
             
-            # Convert to base64
-            screenshot_b64 = base64.b64encode(screenshot_bytes).decode('utf-8')
-            
             # Store metadata
             screenshot_data = {
                 'session_id': session_id,
@@ -281,18 +518,25 @@ class NativeChromiumEngine:
             }
             
             # Notify WebSocket clients
-            await self._broadcast_to_websocket(session_id, {
-                'type': 'screenshot_captured',
-                'success': True,
-                'screenshot': screenshot_b64,
-                'metadata': screenshot_data
-            })
+            screenshot_b64 = await self._broadcast_frame(
+                session_id, 'screenshot_captured', screenshot_bytes, screenshot_data
+            )
             
             logger.info(f"📷 Screenshot captured: {len(screenshot_bytes)} bytes")
             
+            if reuse_if_unchanged:
+                session.screenshot_cache.store(fingerprint, screenshot_bytes, screenshot_data, screenshot_b64)
+            
+            if encoding == 'binary':
+                return {
+                    "success": True,
+                    "image": screenshot_bytes,
+                    "metadata": screenshot_data
+                }
+            
             return {
                 "success": True,
-                "screenshot": screenshot_b64,
+                "screenshot": screenshot_b64 or base64.b64encode(screenshot_bytes).decode('utf-8'),
                 "metadata": screenshot_data
             }
             
@@ -303,7 +547,7 @@ class NativeChromiumEngine:
     async def execute_javascript(self, session_id: str, script: str, args: List[Any] = None) -> Dict[str, Any]:
         """Execute JavaScript in native browser"""
         try:
-            session = self.sessions.get(session_id)
+            session = await self.get_session(session_id)
             if not session:
                 return {"success": False, "error": "Session not found"}
             
@@ -326,27 +570,32 @@ class NativeChromiumEngine:
 
     async def click_element(self, session_id: str, selector: str, timeout: int = 5000) -> Dict[str, Any]:
         """Click element using CSS selector"""
+        session = None
         try:
-            session = self.sessions.get(session_id)
+            session = await self.get_session(session_id)
             if not session:
                 return {"success": False, "error": "Session not found"}
             
             # Wait for element and click
             await session.page.wait_for_selector(selector, timeout=timeout)
             await session.page.click(selector)
+            session.screenshot_cache.invalidate()
+            self._record_followup(session, True)
             
             logger.info(f"👆 Element clicked: {selector}")
             
             return {"success": True, "selector": selector}
             
         except Exception as e:
+            self._record_followup(session, False)
             logger.error(f"❌ Click failed: {e}")
             return {"success": False, "error": str(e)}
 
     async def type_text(self, session_id: str, selector: str, text: str, clear: bool = True) -> Dict[str, Any]:
         """Type text into element"""
+        session = None
         try:
-            session = self.sessions.get(session_id)
+            session = await self.get_session(session_id)
             if not session:
                 return {"success": False, "error": "Session not found"}
             
@@ -359,19 +608,21 @@ class NativeChromiumEngine:
             
             # Type text
             await session.page.type(selector, text)
+            self._record_followup(session, True)
             
             logger.info(f"⌨️ Text typed: {selector}")
             
             return {"success": True, "selector": selector, "text": text}
             
         except Exception as e:
+            self._record_followup(session, False)
             logger.error(f"❌ Type failed: {e}")
             return {"success": False, "error": str(e)}
 
     async def get_page_content(self, session_id: str, include_html: bool = False) -> Dict[str, Any]:
         """Get page content and metadata"""
         try:
-            session = self.sessions.get(session_id)
+            session = await self.get_session(session_id)
             if not session:
                 return {"success": False, "error": "Session not found"}
             
@@ -402,20 +653,26 @@ class NativeChromiumEngine:
     async def smart_click(self, session_id: str, description: str) -> Dict[str, Any]:
         """AI-powered smart click using Computer Use API"""
         try:
-            session = self.sessions.get(session_id)
+            session = await self.get_session(session_id)
             if not session:
                 return {"success": False, "error": "Session not found"}
             
-            # Capture screenshot for AI analysis
-            screenshot_result = await self.capture_screenshot(session_id)
+            # Capture screenshot for AI analysis, reusing it if the page is unchanged
+            screenshot_result = await self.capture_screenshot(session_id, reuse_if_unchanged=True)
             if not screenshot_result["success"]:
                 return screenshot_result
             
-            # Use Computer Use API to find element
-            click_result = await self.computer_use_api.smart_click(
-                screenshot_result["screenshot"], 
-                description
-            )
+            # Use Computer Use API to find element, unless this image was already analysed
+            cache = session.screenshot_cache
+            analysis_key = f"smart_click:{description}"
+            click_result = cache.get_analysis(analysis_key)
+            if click_result is None:
+                click_result = await self.computer_use_api.smart_click(
+                    screenshot_result["screenshot"], 
+                    description
+                )
+                if click_result["success"]:
+                    cache.store_analysis(analysis_key, click_result)
             
             if click_result["success"]:
                 # Execute the click at coordinates
@@ -423,9 +680,15 @@ class NativeChromiumEngine:
                     click_result["coordinates"]["x"],
                     click_result["coordinates"]["y"]
                 )
+                cache.invalidate()
                 
                 logger.info(f"🎯 Smart click successful: {description}")
-                return {"success": True, "description": description, "coordinates": click_result["coordinates"]}
+                return {
+                    "success": True,
+                    "description": description,
+                    "coordinates": click_result["coordinates"],
+                    "screenshot_cached": screenshot_result.get("cached", False)
+                }
             else:
                 return click_result
                 
@@ -436,7 +699,7 @@ class NativeChromiumEngine:
     async def extract_page_data(self, session_id: str, data_type: str = 'general') -> Dict[str, Any]:
         """Extract structured data from page"""
         try:
-            session = self.sessions.get(session_id)
+            session = await self.get_session(session_id)
             if not session:
                 return {"success": False, "error": "Session not found"}
             
@@ -506,10 +769,91 @@ class NativeChromiumEngine:
             logger.error(f"❌ Data extraction failed: {e}")
             return {"success": False, "error": str(e)}
 
+    async def run_batch(self, session_id: str, actions: List[Dict[str, Any]],
+                        stop_on_error: bool = True) -> Dict[str, Any]:
+        """Run an ordered list of actions against one session in a single call
+        
+        Each step is {"action": ..., **params} with action one of BATCH_ACTIONS.
+        With stop_on_error the batch ends at the first failing step.
+        """
+        session = await self.get_session(session_id)
+        if not session:
+            return {"success": False, "error": "Session not found"}
+        if len(actions) > MAX_BATCH_ACTIONS:
+            return {"success": False, "error": f"Batch exceeds {MAX_BATCH_ACTIONS} actions"}
+        
+        steps = []
+        batch_start = time.perf_counter()
+        
+        for index, step in enumerate(actions):
+            action = step.get('action')
+            step_start = time.perf_counter()
+            try:
+                if action == 'navigate':
+                    result = await self.navigate_to_url(
+                        session_id, step['url'], step.get('timeout', 30000),
+                        step.get('wait_until'), step.get('wait_selector')
+                    )
+                elif action == 'wait':
+                    if step.get('selector'):
+                        await session.page.wait_for_selector(
+                            step['selector'], state=step.get('state', 'visible'), timeout=step.get('timeout', 5000)
+                        )
+                    else:
+                        await asyncio.sleep(min(step.get('ms', 0), 30000) / 1000)
+                    result = {"success": True}
+                elif action == 'click':
+                    result = await self.click_element(session_id, step['selector'], step.get('timeout', 5000))
+                elif action == 'type':
+                    result = await self.type_text(session_id, step['selector'], step['text'], step.get('clear', True))
+                elif action == 'extract':
+                    result = await self.extract_page_data(session_id, step.get('data_type', 'general'))
+                elif action == 'execute_js':
+                    result = await self.execute_javascript(session_id, step['script'], step.get('args', []))
+                elif action == 'smart_click':
+                    result = await self.smart_click(session_id, step['description'])
+                elif action == 'screenshot':
+                    result = await self.capture_screenshot(
+                        session_id, step.get('full_page', False), step.get('quality', 80),
+                        reuse_if_unchanged=step.get('reuse_if_unchanged', False)
+                    )
+                elif action == 'get_content':
+                    result = await self.get_page_content(session_id, step.get('include_html', False))
+                else:
+                    result = {"success": False, "error": f"Unknown batch action: {action}"}
+            except KeyError as e:
+                result = {"success": False, "error": f"Missing parameter {e} for {action}"}
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            
+            steps.append({
+                "index": index,
+                "action": action,
+                "success": result.get("success", False),
+                "duration_ms": round((time.perf_counter() - step_start) * 1000, 2),
+                "result": result
+            })
+            
+            if not result.get("success") and stop_on_error:
+                break
+        
+        completed = sum(1 for step in steps if step["success"])
+        logger.info(f"📦 Batch finished: {completed}/{len(actions)} steps succeeded")
+        
+        return {
+            "success": completed == len(actions),
+            "session_id": session_id,
+            "steps": steps,
+            "completed": completed,
+            "total": len(actions),
+            "stopped_at": steps[-1]["index"] if steps and not steps[-1]["success"] and stop_on_error else None,
+            "total_ms": round((time.perf_counter() - batch_start) * 1000, 2)
+        }
+
     async def get_performance_metrics(self, session_id: str) -> Dict[str, Any]:
         """Get performance metrics for session"""
         try:
-            session = self.sessions.get(session_id)
+            session = await self.get_session(session_id)
             if not session:
                 return {"success": False, "error": "Session not found"}
             
@@ -536,6 +880,7 @@ class NativeChromiumEngine:
             metrics = {
                 **performance_data,
                 **session.performance_metrics,
+                "screenshot_cache": session.screenshot_cache.get_stats(),
                 "session_duration": (datetime.utcnow() - session.created_at).total_seconds(),
                 "last_activity": session.last_activity.isoformat()
             }
@@ -546,21 +891,223 @@ class NativeChromiumEngine:
             logger.error(f"❌ Performance metrics failed: {e}")
             return {"success": False, "error": str(e)}
 
-    async def close_session(self, session_id: str) -> Dict[str, Any]:
-        """Close native browser session"""
+    async def get_session(self, session_id: str) -> Optional[NativeBrowserSession]:
+        """Look up a live session, restoring it first if it was hibernated"""
+        session = self.sessions.get(session_id)
+        if not session and session_id in self.hibernated_sessions:
+            session = await self._restore_session(session_id)
+        if session:
+            session.last_activity = datetime.utcnow()
+            self.sessions.move_to_end(session_id)
+        return session
+
+    def _private_hibernate_dir(self) -> str:
+        """Hibernation directory, created 0700 and refused if another user owns it"""
+        hibernate_dir = self.lifecycle_config.hibernate_dir
+        os.makedirs(hibernate_dir, mode=0o700, exist_ok=True)
+        if os.stat(hibernate_dir).st_uid != os.getuid():
+            raise PermissionError(f"Hibernation directory {hibernate_dir} is owned by another user")
+        os.chmod(hibernate_dir, 0o700)
+        return hibernate_dir
+
+    @staticmethod
+    def _write_private_file(path: str, content: str):
+        """Write content to a file readable only by this user"""
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as handle:
+            os.fchmod(handle.fileno(), 0o600)  # O_CREAT's mode does not apply to an existing file
+            handle.write(content)
+
+    async def _hibernate_session(self, session_id: str) -> bool:
+        """Save a session's storage state to disk and release its context"""
+        session = self.sessions.get(session_id)
+        if not session:
+            return False
+        
+        # Storage state holds auth cookies and localStorage: owner-only directory and file
+        state_path = os.path.join(self._private_hibernate_dir(), f"{session_id}.json")
+        state = await session.context.storage_state()
+        await asyncio.to_thread(self._write_private_file, state_path, json.dumps(state))
+        
+        self.hibernated_sessions[session_id] = HibernatedSession(
+            session_id=session_id,
+            user_session=session.user_session,
+            launch_profile=session.launch_profile,
+            state_path=state_path,
+            url=session.page.url if session.page else None,
+            context_options=session.pooled_context.context_options if session.pooled_context else None,
+            created_at=session.created_at,
+            hibernated_at=datetime.utcnow(),
+            performance_metrics=session.performance_metrics,
+            routing_policy=session.routing_policy
+        )
+        
+        # Keep the websocket mapping; the client reattaches on next use
+        await self._release_session_context(session)
+        del self.sessions[session_id]
+        self.lifecycle_stats['hibernated'] += 1
+        logger.info(f"💤 Native session hibernated: {session_id}")
+        return True
+
+    async def _restore_session(self, session_id: str) -> Optional[NativeBrowserSession]:
+        """Recreate a hibernated session from its saved storage state"""
+        lock = self._restore_locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            if session_id in self.sessions:
+                return self.sessions[session_id]
+            record = self.hibernated_sessions.get(session_id)
+            if not record:
+                return None
+            
+            shard_manager = shard = pooled = session = None
+            try:
+                await self._enforce_session_cap()
+                
+                context_options = dict(record.context_options or DEFAULT_CONTEXT_OPTIONS)
+                shard_manager = await self._get_shard_manager(record.launch_profile)
+                shard, pooled = await shard_manager.checkout(
+                    session_id, {**context_options, 'storage_state': record.state_path}
+                )
+                pooled.context_options = context_options  # the state file is removed below
+                
+                session = NativeBrowserSession(
+                    session_id=session_id,
+                    user_session=record.user_session,
+                    browser=shard.browser,
+                    context=pooled.context,
+                    page=pooled.page,
+                    created_at=record.created_at,
+                    performance_metrics=record.performance_metrics,
+                    pooled_context=pooled,
+                    shard_id=shard.shard_id,
+                    launch_profile=record.launch_profile,
+                    routing_policy=record.routing_policy
+                )
+                self.sessions[session_id] = session
+                await self._install_request_routing(session)
+                
+                if record.url and record.url != 'about:blank':
+                    await session.page.goto(record.url, wait_until='domcontentloaded')
+                
+                del self.hibernated_sessions[session_id]
+                self._remove_state_file(record.state_path)
+                self.lifecycle_stats['restored'] += 1
+                logger.info(f"⏰ Native session restored: {session_id}")
+                return session
+                
+            except Exception as e:
+                logger.error(f"❌ Session restore failed for {session_id}: {e}")
+                # Give back whatever was acquired and forget the session entirely
+                self.sessions.pop(session_id, None)
+                self.hibernated_sessions.pop(session_id, None)
+                self._remove_state_file(record.state_path)
+                try:
+                    if session:
+                        await self._release_session_context(session)
+                    elif pooled:
+                        await shard_manager.release(shard.shard_id, session_id, pooled)
+                except Exception as release_error:
+                    logger.error(f"❌ Context release failed for {session_id}: {release_error}")
+                return None
+            finally:
+                self._restore_locks.pop(session_id, None)
+
+    def _remove_state_file(self, state_path: str):
         try:
-            session = self.sessions.get(session_id)
-            if not session:
-                return {"success": False, "error": "Session not found"}
-            
-            # Close page and context
+            os.remove(state_path)
+        except OSError:
+            pass
+
+    async def _retire_session(self, session_id: str) -> bool:
+        """Hibernate if enabled, otherwise close"""
+        if self.lifecycle_config.hibernate:
+            try:
+                return await self._hibernate_session(session_id)
+            except Exception as e:
+                logger.error(f"❌ Hibernate failed for {session_id}, closing instead: {e}")
+        result = await self.close_session(session_id)
+        return result["success"]
+
+    async def _enforce_session_cap(self):
+        """Evict least recently used sessions until there is room for one more"""
+        while len(self.sessions) >= self.lifecycle_config.max_sessions:
+            lru_session_id = next(iter(self.sessions))
+            if not await self._retire_session(lru_session_id):
+                session = self.sessions.pop(lru_session_id, None)
+                self.websocket_connections.pop(lru_session_id, None)
+                if session:
+                    try:
+                        await self._release_session_context(session)
+                    except Exception as e:
+                        logger.error(f"❌ Context release failed for evicted {lru_session_id}: {e}")
+            self.lifecycle_stats['evicted'] += 1
+
+    async def _reaper_loop(self):
+        """Retire sessions idle past the TTL and expire old hibernated ones"""
+        while True:
+            try:
+                await asyncio.sleep(self.lifecycle_config.reap_interval)
+                now = datetime.utcnow()
+                
+                for session_id, session in list(self.sessions.items()):
+                    if session_id in self.websocket_connections:
+                        continue  # a viewer is attached
+                    idle = (now - session.last_activity).total_seconds()
+                    if idle > self.lifecycle_config.idle_ttl:
+                        if await self._retire_session(session_id):
+                            self.lifecycle_stats['reaped'] += 1
+                
+                for session_id, record in list(self.hibernated_sessions.items()):
+                    if (now - record.hibernated_at).total_seconds() > self.lifecycle_config.hibernate_ttl:
+                        del self.hibernated_sessions[session_id]
+                        self._remove_state_file(record.state_path)
+                        self.lifecycle_stats['reaped'] += 1
+                        
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Session reaper error: {e}")
+
+    def get_lifecycle_stats(self) -> Dict[str, Any]:
+        """Live/hibernated session counts and reaper totals"""
+        return {
+            'live_sessions': len(self.sessions),
+            'hibernated_sessions': len(self.hibernated_sessions),
+            'max_sessions': self.lifecycle_config.max_sessions,
+            'idle_ttl': self.lifecycle_config.idle_ttl,
+            'hibernate_enabled': self.lifecycle_config.hibernate,
+            **self.lifecycle_stats
+        }
+
+    async def _release_session_context(self, session: NativeBrowserSession):
+        """Return pooled context (reset) or close page and context"""
+        await self.stop_screencast(session.session_id)
+        shard_manager = self.shard_managers.get(session.launch_profile)
+        if session.pooled_context and shard_manager:
+            await shard_manager.release(session.shard_id, session.session_id, session.pooled_context)
+        else:
             if session.page:
                 await session.page.close()
             if session.context:
                 await session.context.close()
+
+    async def close_session(self, session_id: str) -> Dict[str, Any]:
+        """Close native browser session"""
+        try:
+            record = self.hibernated_sessions.pop(session_id, None)
+            if record:
+                self._remove_state_file(record.state_path)
+            
+            # A record may coexist with a live session mid-restore; release that too
+            session = self.sessions.pop(session_id, None)
+            if not session:
+                if record:
+                    self.websocket_connections.pop(session_id, None)
+                    logger.info(f"🧹 Hibernated native session closed: {session_id}")
+                    return {"success": True, "session_id": session_id}
+                return {"success": False, "error": "Session not found"}
             
-            # Remove from sessions
-            del self.sessions[session_id]
+            await self._release_session_context(session)
             
             # Close WebSocket connection
             if session_id in self.websocket_connections:
@@ -584,6 +1131,7 @@ class NativeChromiumEngine:
             await websocket.send(json.dumps({
                 'type': 'connection_established',
                 'session_id': session_id,
+                'frame_formats': ['base64', 'binary'],
                 'timestamp': datetime.utcnow().isoformat()
             }))
             
@@ -613,6 +1161,10 @@ class NativeChromiumEngine:
             # Cleanup
             if session_id in self.websocket_connections:
                 del self.websocket_connections[session_id]
+            self.frame_formats.pop(session_id, None)
+            
+            # Nobody left to watch
+            await self.stop_screencast(session_id)
 
     async def _handle_websocket_message(self, session_id: str, data: Dict[str, Any]):
         """Handle incoming WebSocket message"""
@@ -624,17 +1176,60 @@ class NativeChromiumEngine:
         
         try:
             if action == 'navigate':
-                result = await self.navigate_to_url(session_id, data.get('url'))
+                result = await self.navigate_to_url(
+                    session_id,
+                    data.get('url'),
+                    timeout=data.get('timeout', 30000),
+                    wait_until=data.get('wait_until'),
+                    wait_selector=data.get('wait_selector')
+                )
                 await websocket.send(json.dumps({
                     'type': 'navigation_result',
                     'result': result
                 }))
                 
+            elif action == 'set_frame_format':
+                frame_format = data.get('format', 'base64')
+                if frame_format not in ('base64', 'binary'):
+                    raise ValueError(f"Unknown frame format: {frame_format}")
+                self.frame_formats[session_id] = frame_format
+                await websocket.send(json.dumps({
+                    'type': 'frame_format_set',
+                    'format': frame_format
+                }))
+                
+            elif action == 'start_screencast':
+                if data.get('binary'):
+                    self.frame_formats[session_id] = 'binary'
+                result = await self.start_screencast(
+                    session_id,
+                    max_fps=data.get('max_fps', 10.0),
+                    max_width=data.get('max_width', 1280),
+                    max_height=data.get('max_height', 720),
+                    quality=data.get('quality', 60)
+                )
+                await websocket.send(json.dumps({
+                    'type': 'screencast_result',
+                    'messageId': data.get('messageId'),
+                    'result': result
+                }, default=str))
+                
+            elif action == 'stop_screencast':
+                result = await self.stop_screencast(session_id)
+                await websocket.send(json.dumps({
+                    'type': 'screencast_result',
+                    'messageId': data.get('messageId'),
+                    'result': result
+                }, default=str))
+                
             elif action == 'screenshot':
+                if data.get('binary'):
+                    self.frame_formats[session_id] = 'binary'
                 result = await self.capture_screenshot(
                     session_id,
                     full_page=data.get('full_page', False),
-                    quality=data.get('quality', 80)
+                    quality=data.get('quality', 80),
+                    encoding='binary'
                 )
                 # Screenshot is sent via broadcast
                 
@@ -658,9 +1253,10 @@ class NativeChromiumEngine:
                 }))
                 
             elif action == 'click_coordinates':
-                session = self.sessions.get(session_id)
+                session = await self.get_session(session_id)
                 if session:
                     await session.page.mouse.click(data.get('x'), data.get('y'))
+                    session.screenshot_cache.invalidate()
                     await websocket.send(json.dumps({
                         'type': 'click_result',
                         'result': {'success': True}
@@ -677,6 +1273,18 @@ class NativeChromiumEngine:
                     'result': result
                 }))
                 
+            elif action == 'batch':
+                result = await self.run_batch(
+                    session_id,
+                    data.get('actions', []),
+                    stop_on_error=data.get('stop_on_error', True)
+                )
+                await websocket.send(json.dumps({
+                    'type': 'batch_result',
+                    'messageId': data.get('messageId'),
+                    'result': result
+                }, default=str))
+                
             elif action == 'get_status':
                 session = self.sessions.get(session_id)
                 status = {
@@ -696,6 +1304,98 @@ class NativeChromiumEngine:
                 'message': str(e)
             }))
 
+    async def _broadcast_frame(self, session_id: str, frame_type: str, image: bytes,
+                               metadata: Dict[str, Any]) -> Optional[str]:
+        """Send an image to the session's viewer in its negotiated frame format
+        
+        Returns the base64 string when one had to be produced, so callers can reuse it.
+        """
+        if self.frame_formats.get(session_id) == 'binary':
+            websocket = self.websocket_connections.get(session_id)
+            if websocket:
+                try:
+                    await self._send_bytes(websocket, pack_binary_frame({
+                        'type': frame_type,
+                        'format': 'jpeg',
+                        'metadata': metadata
+                    }, image))
+                except Exception as e:
+                    logger.error(f"❌ WebSocket binary frame failed: {e}")
+            return None
+        
+        if session_id not in self.websocket_connections:
+            return None
+        
+        image_b64 = base64.b64encode(image).decode('utf-8')
+        await self._broadcast_to_websocket(session_id, {
+            'type': frame_type,
+            'success': True,
+            'screenshot': image_b64,
+            'metadata': metadata
+        })
+        return image_b64
+
+    async def start_screencast(self, session_id: str, max_fps: float = 10.0, max_width: int = 1280,
+                               max_height: int = 720, quality: int = 60) -> Dict[str, Any]:
+        """Stream the session's page to its WebSocket viewer from the DevTools screencast"""
+        try:
+            session = await self.get_session(session_id)
+            if not session:
+                return {"success": False, "error": "Session not found"}
+            if session_id not in self.websocket_connections:
+                return {"success": False, "error": "No WebSocket viewer attached"}
+            
+            await self.stop_screencast(session_id)
+            
+            options = ScreencastOptions(max_fps=max_fps, max_width=max_width, max_height=max_height, quality=quality)
+            screencast = Screencast(session_id, session.context, session.page, options, self._send_screencast_frame)
+            self.screencasts[session_id] = screencast
+            await screencast.start()
+            
+            return {"success": True, "session_id": session_id, "screencast": screencast.get_stats()}
+            
+        except Exception as e:
+            self.screencasts.pop(session_id, None)
+            logger.error(f"❌ Screencast start failed: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def stop_screencast(self, session_id: str) -> Dict[str, Any]:
+        """Stop a session's screencast if one is running"""
+        screencast = self.screencasts.pop(session_id, None)
+        if not screencast:
+            return {"success": False, "error": "No screencast running"}
+        await screencast.stop()
+        return {"success": True, "session_id": session_id, "screencast": screencast.get_stats()}
+
+    async def _send_screencast_frame(self, session_id: str, frame_b64: str, metadata: Dict[str, Any]) -> bool:
+        """Deliver one screencast frame; False when the viewer has gone away"""
+        websocket = self.websocket_connections.get(session_id)
+        if not websocket:
+            self.screencasts.pop(session_id, None)
+            return False
+        
+        # CDP hands frames over as base64 already
+        if self.frame_formats.get(session_id) == 'binary':
+            await self._send_bytes(websocket, pack_binary_frame({
+                'type': 'screencast_frame',
+                'format': 'jpeg',
+                'metadata': metadata
+            }, base64.b64decode(frame_b64)))
+        else:
+            await websocket.send(json.dumps({
+                'type': 'screencast_frame',
+                'screenshot': frame_b64,
+                'metadata': metadata
+            }))
+        return True
+
+    async def _send_bytes(self, websocket, data: bytes):
+        """Send a binary frame on either a FastAPI or a websockets connection"""
+        if hasattr(websocket, 'send_bytes'):
+            await websocket.send_bytes(data)
+        else:
+            await websocket.send(data)
+
     async def _broadcast_to_websocket(self, session_id: str, message: Dict[str, Any]):
         """Broadcast message to WebSocket client"""
         websocket = self.websocket_connections.get(session_id)
@@ -705,6 +1405,51 @@ class NativeChromiumEngine:
             except Exception as e:
                 logger.error(f"❌ WebSocket broadcast failed: {e}")
 
+    async def _migrate_sessions(self, session_ids):
+        """Move sessions off a dead browser shard onto live ones
+        
+        Cookies and storage died with the browser process; the session keeps
+        its id and is re-opened at the URL it was last on.
+        """
+        for session_id in session_ids:
+            session = self.sessions.get(session_id)
+            if not session:
+                continue
+            
+            last_url = session.page.url if session.page else None
+            context_options = session.pooled_context.context_options if session.pooled_context else None
+            await self.stop_screencast(session_id)
+            
+            try:
+                shard_manager = self.shard_managers[session.launch_profile]
+                if session.pooled_context:
+                    # The old context died with its browser; never return it to a pool
+                    await shard_manager.release(session.shard_id, session_id, session.pooled_context)
+                    session.pooled_context = None
+                shard, pooled = await shard_manager.checkout(session_id, context_options)
+                session.browser = shard.browser
+                session.context = pooled.context
+                session.page = pooled.page
+                session.pooled_context = pooled
+                session.shard_id = shard.shard_id
+                session.screenshot_cache.invalidate()
+                await self._install_request_routing(session)
+                
+                if last_url and last_url != 'about:blank':
+                    await session.page.goto(last_url, wait_until='domcontentloaded')
+                
+                await self._broadcast_to_websocket(session_id, {
+                    'type': 'session_migrated',
+                    'session_id': session_id,
+                    'shard_id': shard.shard_id,
+                    'url': last_url,
+                    'timestamp': datetime.utcnow().isoformat()
+                })
+                logger.info(f"🔁 Session {session_id} migrated to shard {shard.shard_id}")
+                
+            except Exception as e:
+                logger.error(f"❌ Session migration failed for {session_id}: {e}")
+    
     async def _store_session_in_db(self, session: NativeBrowserSession):
         """Store session data in database"""
         try:
@@ -717,7 +1462,7 @@ class NativeChromiumEngine:
                 'performance_metrics': session.performance_metrics
             }
             
-            self.db.native_sessions.insert_one(session_data)
+            await self.db.native_sessions.insert_one(session_data)
         except Exception as e:
             logger.error(f"❌ Database store failed: {e}")
 
@@ -769,13 +1514,16 @@ class NativeChromiumEngine:
     async def cleanup(self):
         """Cleanup all sessions and close browser"""
         try:
+            if self._reaper_task and not self._reaper_task.done():
+                self._reaper_task.cancel()
+            
             # Close all sessions
             for session_id in list(self.sessions.keys()):
                 await self.close_session(session_id)
             
-            # Close browser
-            if self.browser:
-                await self.browser.close()
+            # Close warm contexts and browser shards of every profile
+            for shard_manager in self.shard_managers.values():
+                await shard_manager.close()
             
             # Stop Playwright
             if self.playwright:
@@ -850,7 +1598,7 @@ class ComputerUseAPI:
 
 
 # Initialize function for backend integration
-async def initialize_native_chromium_engine(mongodb_client: MongoClient) -> NativeChromiumEngine:
+async def initialize_native_chromium_engine(mongodb_client: Optional[MongoClient] = None) -> NativeChromiumEngine:
     """Initialize the native Chromium engine"""
     engine = NativeChromiumEngine(mongodb_client)
     success = await engine.initialize()
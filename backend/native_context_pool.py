@@ -0,0 +1,268 @@
+"""
+AETHER Native Context Pool
+Pre-warmed, pre-instrumented Playwright browser contexts for fast session checkout
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Callable, Awaitable, Set
+from urllib.parse import urlsplit
+
+from playwright.async_api import Browser, BrowserContext, Page
+
+logger = logging.getLogger(__name__)
+
+# Context options every pooled context is created with
+DEFAULT_CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'AETHER-Native-Browser/6.0.0',
+    'java_script_enabled': True,
+    'accept_downloads': True,
+    'bypass_csp': True,  # Bypass CSP for enhanced access
+    'ignore_https_errors': True
+}
+
+@dataclass
+class ContextPoolConfig:
+    """Sizing and lifecycle settings for the context pool"""
+    min_size: int = 2
+    max_size: int = 10
+    idle_ttl: float = 300.0  # seconds an idle context above min_size is kept
+    reset_on_release: bool = True
+    maintenance_interval: float = 15.0
+    max_tracked_origins: int = 256  # contexts touching more origins are discarded, not reset
+
+    @classmethod
+    def from_env(cls) -> "ContextPoolConfig":
+        """Build config from NATIVE_CONTEXT_POOL_* environment variables"""
+        return cls(
+            min_size=int(os.getenv("NATIVE_CONTEXT_POOL_MIN", cls.min_size)),
+            max_size=int(os.getenv("NATIVE_CONTEXT_POOL_MAX", cls.max_size)),
+            idle_ttl=float(os.getenv("NATIVE_CONTEXT_POOL_IDLE_TTL", cls.idle_ttl)),
+            reset_on_release=os.getenv("NATIVE_CONTEXT_POOL_RESET", "true").lower() != "false"
+        )
+
+@dataclass
+class PooledContext:
+    """A browser context + page pair, bound to a session while checked out"""
+    context: BrowserContext
+    page: Page
+    session_id: Optional[str] = None
+    pooled: bool = True  # False for contexts created with non-default options
+    context_options: Optional[Dict[str, Any]] = None  # set for non-default contexts
+    route_handler: Optional[Callable] = None  # session request routing, removed on release
+    origins: Set[str] = field(default_factory=set)
+    idle_since: float = field(default_factory=time.monotonic)
+
+    def track_url(self, url: str):
+        """Remember origins that may hold storage needing reset"""
+        parts = urlsplit(url)
+        if parts.scheme in ('http', 'https') and parts.netloc:
+            self.origins.add(f"{parts.scheme}://{parts.netloc}")
+
+class BrowserContextPool:
+    """Pool of warm contexts so session creation is an O(1) checkout"""
+
+    def __init__(self, browser: Browser, setup_page: Callable[[Page, PooledContext], Awaitable[None]],
+                 config: Optional[ContextPoolConfig] = None):
+        self.browser = browser
+        self.setup_page = setup_page
+        self.config = config or ContextPoolConfig()
+        self.idle: deque = deque()
+        self.in_use = 0
+        self._creating = 0
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._replenish_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.checkout_latencies = deque(maxlen=500)  # milliseconds
+
+    async def start(self):
+        """Warm up to min_size and start background maintenance"""
+        await self._replenish()
+        self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+        logger.info(f"🔥 Context pool warmed: {len(self.idle)} contexts ready")
+
+    async def checkout(self, session_id: str, context_options: Optional[Dict[str, Any]] = None) -> PooledContext:
+        """Take a warm context for a session, creating one cold on miss"""
+        start = time.perf_counter()
+
+        custom = bool(context_options) and context_options != DEFAULT_CONTEXT_OPTIONS
+        if self.idle and not custom:
+            entry = self.idle.popleft()
+            self.hits += 1
+        else:
+            entry = await self._create_context(context_options if custom else None)
+            self.misses += 1
+
+        entry.session_id = session_id
+        self.in_use += 1
+        self.checkout_latencies.append((time.perf_counter() - start) * 1000)
+
+        self._schedule_replenish()
+        return entry
+
+    async def release(self, entry: PooledContext):
+        """Return a context to the pool, resetting its state, or close it"""
+        self.in_use = max(0, self.in_use - 1)
+        entry.session_id = None
+
+        if self._closed or not entry.pooled or len(self.idle) >= self.config.max_size:
+            await self._discard(entry)
+            return
+
+        # The next session installs its own routing; never inherit this one's
+        if not await self._unroute(entry):
+            await self._discard(entry)
+            self._schedule_replenish()
+            return
+
+        if self.config.reset_on_release:
+            if not await self._reset(entry):
+                await self._discard(entry)
+                self._schedule_replenish()
+                return
+
+        entry.idle_since = time.monotonic()
+        self.idle.append(entry)
+
+    async def discard(self, entry: PooledContext):
+        """Close a checked-out context without returning it (e.g. after a crash)"""
+        self.in_use = max(0, self.in_use - 1)
+        entry.session_id = None
+        await self._discard(entry)
+        self._schedule_replenish()
+
+    async def _create_context(self, context_options: Optional[Dict[str, Any]] = None) -> PooledContext:
+        """Cold path: new context, new page, handler wiring"""
+        context = await self.browser.new_context(**(context_options or DEFAULT_CONTEXT_OPTIONS))
+        page = await context.new_page()
+        entry = PooledContext(context=context, page=page, pooled=context_options is None,
+                              context_options=context_options)
+        context.on("request", lambda request: entry.track_url(request.url))
+        await self.setup_page(page, entry)
+        return entry
+
+    async def _unroute(self, entry: PooledContext) -> bool:
+        """Remove the released session's request routing from the context"""
+        if not entry.route_handler:
+            return True
+        try:
+            await entry.context.unroute("**/*", entry.route_handler)
+            entry.route_handler = None
+            return True
+        except Exception as e:
+            logger.warning(f"Context unroute failed, discarding: {e}")
+            return False
+
+    async def _reset(self, entry: PooledContext) -> bool:
+        """Clear cookies, storage and extra pages so the next user starts clean"""
+        try:
+            if entry.page.is_closed() or len(entry.origins) > self.config.max_tracked_origins:
+                return False
+
+            for page in entry.context.pages:
+                if page is not entry.page:
+                    await page.close()
+
+            await entry.page.goto('about:blank')
+            await entry.context.clear_cookies()
+            await entry.context.clear_permissions()
+            await entry.page.set_viewport_size(DEFAULT_CONTEXT_OPTIONS['viewport'])
+
+            if entry.origins:
+                cdp = await entry.context.new_cdp_session(entry.page)
+                try:
+                    for origin in entry.origins:
+                        await cdp.send('Storage.clearDataForOrigin', {
+                            'origin': origin,
+                            'storageTypes': 'all'
+                        })
+                finally:
+                    await cdp.detach()
+            entry.origins.clear()
+            return True
+
+        except Exception as e:
+            logger.warning(f"Context reset failed, discarding: {e}")
+            return False
+
+    async def _discard(self, entry: PooledContext):
+        self.discarded += 1
+        try:
+            await entry.context.close()
+        except Exception as e:
+            logger.debug(f"Context close failed: {e}")
+
+    def _schedule_replenish(self):
+        if self._closed:
+            return
+        if self._replenish_task is None or self._replenish_task.done():
+            self._replenish_task = asyncio.create_task(self._replenish())
+
+    async def _replenish(self):
+        """Top the idle set back up to min_size"""
+        while not self._closed and len(self.idle) + self._creating < self.config.min_size:
+            self._creating += 1
+            try:
+                entry = await self._create_context()
+                entry.idle_since = time.monotonic()
+                self.idle.append(entry)
+            except Exception as e:
+                logger.error(f"❌ Context pool warm-up failed: {e}")
+                return
+            finally:
+                self._creating -= 1
+
+    async def _maintenance_loop(self):
+        """Trim contexts idle past the TTL and keep the pool warm"""
+        while not self._closed:
+            try:
+                await asyncio.sleep(self.config.maintenance_interval)
+                now = time.monotonic()
+                while len(self.idle) > self.config.min_size and \
+                        now - self.idle[0].idle_since > self.config.idle_ttl:
+                    await self._discard(self.idle.popleft())
+                await self._replenish()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Context pool maintenance error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool hit/miss and checkout latency statistics"""
+        total = self.hits + self.misses
+        latencies = sorted(self.checkout_latencies)
+        return {
+            'idle': len(self.idle),
+            'in_use': self.in_use,
+            'min_size': self.config.min_size,
+            'max_size': self.config.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'discarded': self.discarded,
+            'checkout_latency_ms': {
+                'avg': sum(latencies) / len(latencies) if latencies else 0.0,
+                'p50': latencies[len(latencies) // 2] if latencies else 0.0,
+                'p95': latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+                'max': latencies[-1] if latencies else 0.0
+            }
+        }
+
+    async def close(self):
+        """Stop maintenance and close every idle context"""
+        self._closed = True
+        for task in (self._maintenance_task, self._replenish_task):
+            if task and not task.done():
+                task.cancel()
+        while self.idle:
+            await self._discard(self.idle.popleft())
@@ -0,0 +1,146 @@
+"""
+AETHER Native Screencast
+Live session view from the DevTools screencast feed, latest-frame-wins delivery
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, Awaitable, List
+
+from playwright.async_api import BrowserContext, Page
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ScreencastOptions:
+    """Frame rate, size and JPEG quality of a screencast"""
+    max_fps: float = 10.0
+    max_width: int = 1280
+    max_height: int = 720
+    quality: int = 60
+
+    def __post_init__(self):
+        self.max_fps = min(max(self.max_fps, 0.5), 30.0)
+        self.quality = min(max(self.quality, 1), 100)
+
+class Screencast:
+    """One session's screencast: CDP frames in, at most max_fps frames out
+
+    Only the newest undelivered frame is kept. Frames are acked only after
+    they have been sent and paced, so Chrome stops producing while the viewer
+    is behind; any frames still in flight replace each other instead of queueing.
+    """
+
+    def __init__(self, session_id: str, context: BrowserContext, page: Page, options: ScreencastOptions,
+                 send_frame: Callable[[str, str, Dict[str, Any]], Awaitable[bool]]):
+        self.session_id = session_id
+        self.context = context
+        self.page = page
+        self.options = options
+        self.send_frame = send_frame  # returns False once nobody is watching
+        self.cdp = None
+        self._latest: Optional[Dict[str, Any]] = None
+        self._unacked: List[int] = []  # CDP frame ids held back until the viewer has caught up
+        self._frame_ready = asyncio.Event()
+        self._sender_task: Optional[asyncio.Task] = None
+        self.running = False
+
+        # Stats
+        self.frames_received = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.started_at = time.time()
+
+    async def start(self):
+        self.cdp = await self.context.new_cdp_session(self.page)
+        self.cdp.on('Page.screencastFrame', self._on_frame)
+        await self.cdp.send('Page.startScreencast', {
+            'format': 'jpeg',
+            'quality': self.options.quality,
+            'maxWidth': self.options.max_width,
+            'maxHeight': self.options.max_height,
+            'everyNthFrame': 1
+        })
+        self.running = True
+        self._sender_task = asyncio.create_task(self._sender_loop())
+        logger.info(f"🎥 Screencast started: {self.session_id} ({self.options.max_fps} fps)")
+
+    def _on_frame(self, params: Dict[str, Any]):
+        self.frames_received += 1
+        if self._latest is not None:
+            self.frames_dropped += 1
+        self._latest = params
+        self._unacked.append(params['sessionId'])
+        self._frame_ready.set()
+
+    async def _ack_delivered(self):
+        """Ack every frame received so far; Chrome holds the next frame until then"""
+        frame_session_ids, self._unacked = self._unacked, []
+        for frame_session_id in frame_session_ids:
+            try:
+                await self.cdp.send('Page.screencastFrameAck', {'sessionId': frame_session_id})
+            except Exception as e:
+                logger.debug(f"Screencast ack failed: {e}")
+
+    async def _sender_loop(self):
+        interval = 1.0 / self.options.max_fps
+        try:
+            while self.running:
+                await self._frame_ready.wait()
+                self._frame_ready.clear()
+                frame, self._latest = self._latest, None
+                if frame is None:
+                    continue
+
+                sent_at = time.monotonic()
+                metadata = {
+                    'session_id': self.session_id,
+                    'timestamp': frame.get('metadata', {}).get('timestamp'),
+                    'device_width': frame.get('metadata', {}).get('deviceWidth'),
+                    'device_height': frame.get('metadata', {}).get('deviceHeight'),
+                    'frames_dropped': self.frames_dropped
+                }
+                if not await self.send_frame(self.session_id, frame['data'], metadata):
+                    logger.info(f"🎥 No viewer attached, stopping screencast: {self.session_id}")
+                    asyncio.create_task(self.stop())
+                    return
+                self.frames_sent += 1
+
+                # Hold the rate at max_fps, then ack so the page's frame rate follows the viewer's
+                remaining = interval - (time.monotonic() - sent_at)
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                await self._ack_delivered()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"❌ Screencast sender error: {e}")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self._frame_ready.set()
+        if self._sender_task and not self._sender_task.done() and self._sender_task is not asyncio.current_task():
+            self._sender_task.cancel()
+        try:
+            await self.cdp.send('Page.stopScreencast')
+            await self.cdp.detach()
+        except Exception as e:
+            logger.debug(f"Screencast stop failed: {e}")
+        logger.info(f"🎥 Screencast stopped: {self.session_id}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'max_fps': self.options.max_fps,
+            'max_width': self.options.max_width,
+            'max_height': self.options.max_height,
+            'quality': self.options.quality,
+            'frames_received': self.frames_received,
+            'frames_sent': self.frames_sent,
+            'frames_dropped': self.frames_dropped,
+            'duration': time.time() - self.started_at
+        }
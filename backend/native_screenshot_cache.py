@@ -0,0 +1,103 @@
+"""
+AETHER Native Screenshot Cache
+Reuses the last screenshot and its vision analysis while the page has not changed
+"""
+
+import logging
+from typing import Optional, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Installed as an init script: counts DOM mutations, user input and finished
+# resource loads (load/error do not bubble, so they are caught in the capture
+# phase) so the page-state fingerprint changes whenever what is rendered may
+# have changed. Canvas, video and CSS background-image repaints fire nothing
+MUTATION_COUNTER_SCRIPT = """
+(() => {
+    if (window.__aetherMutations !== undefined) return;
+    window.__aetherMutations = 0;
+    window.__aetherDocumentId = Math.random().toString(36).slice(2);
+    const bump = () => { window.__aetherMutations += 1; };
+    new MutationObserver(records => { window.__aetherMutations += records.length; })
+        .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    for (const type of ['input', 'change', 'focusin', 'transitionend', 'animationend', 'load', 'error']) {
+        document.addEventListener(type, bump, true);
+    }
+    if (document.fonts) document.fonts.addEventListener('loadingdone', bump);
+})();
+"""
+
+# One evaluate round trip: URL, mutation counter, document id, viewport and scroll position
+FINGERPRINT_SCRIPT = """
+[location.href, window.__aetherMutations === undefined ? null : window.__aetherMutations,
+ window.__aetherDocumentId, innerWidth, innerHeight, scrollX, scrollY]
+"""
+
+class ScreenshotCache:
+    """Last screenshot of a session keyed by page-state fingerprint"""
+
+    def __init__(self):
+        self.fingerprint: Optional[Tuple] = None
+        self.image: Optional[bytes] = None
+        self.image_b64: Optional[str] = None
+        self.metadata: Optional[Dict[str, Any]] = None
+        self.analyses: Dict[str, Any] = {}  # vision results for the cached image
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.analysis_hits = 0
+        self.analysis_misses = 0
+
+    @staticmethod
+    def make_fingerprint(page_state: Any, full_page: bool, quality: int) -> Optional[Tuple]:
+        """Fingerprint from FINGERPRINT_SCRIPT output; None when the counter is not installed"""
+        if not page_state or page_state[1] is None:
+            return None
+        return tuple(page_state) + (full_page, quality)
+
+    def lookup(self, fingerprint: Optional[Tuple]) -> bool:
+        if fingerprint is not None and fingerprint == self.fingerprint and self.image is not None:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def store(self, fingerprint: Optional[Tuple], image: bytes, metadata: Dict[str, Any],
+              image_b64: Optional[str] = None):
+        self.fingerprint = fingerprint
+        self.image = image
+        self.image_b64 = image_b64
+        self.metadata = metadata
+        self.analyses = {}
+
+    def invalidate(self):
+        """Drop the cached image, e.g. after the engine itself changed the page"""
+        self.fingerprint = None
+        self.image = None
+        self.image_b64 = None
+        self.analyses = {}
+
+    def get_analysis(self, key: str) -> Optional[Any]:
+        result = self.analyses.get(key)
+        if result is None:
+            self.analysis_misses += 1
+        else:
+            self.analysis_hits += 1
+        return result
+
+    def store_analysis(self, key: str, result: Any):
+        if self.image is not None:
+            self.analyses[key] = result
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        analyses = self.analysis_hits + self.analysis_misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'analysis_hits': self.analysis_hits,
+            'analysis_misses': self.analysis_misses,
+            'analysis_hit_rate': self.analysis_hits / analyses if analyses else 0.0
+        }
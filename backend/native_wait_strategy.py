@@ -0,0 +1,99 @@
+"""
+AETHER Native Wait Strategy
+Per-domain learning of which navigation wait condition is fastest without breaking later actions
+"""
+
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Playwright wait_until values plus waiting for a visible selector
+WAIT_STRATEGIES = ('commit', 'domcontentloaded', 'load', 'networkidle', 'selector')
+
+# Strategies the adaptive policy chooses between, lightest first
+ADAPTIVE_CANDIDATES = ('domcontentloaded', 'load', 'networkidle')
+
+@dataclass
+class StrategyStats:
+    """Outcome history of one strategy on one domain"""
+    samples: int = 0
+    avg_time: float = 0.0  # exponentially weighted seconds to ready
+    failures: int = 0  # navigation timeouts plus failed follow-up actions
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / self.samples if self.samples else 0.0
+
+class AdaptiveWaitPolicy:
+    """Picks a default wait strategy per domain from observed time-to-ready and failures"""
+
+    def __init__(self, default_strategy: str = 'load', max_domains: int = 1000,
+                 failure_threshold: float = 0.2, explore_after: int = 5, smoothing: float = 0.3):
+        self.default_strategy = default_strategy
+        self.max_domains = max_domains
+        self.failure_threshold = failure_threshold
+        self.explore_after = explore_after
+        self.smoothing = smoothing
+        self.domains: Dict[str, Dict[str, StrategyStats]] = OrderedDict()
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def _stats(self, domain: str) -> Dict[str, StrategyStats]:
+        stats = self.domains.get(domain)
+        if stats is None:
+            stats = {name: StrategyStats() for name in ADAPTIVE_CANDIDATES}
+            self.domains[domain] = stats
+            while len(self.domains) > self.max_domains:
+                self.domains.popitem(last=False)
+        else:
+            self.domains.move_to_end(domain)
+        return stats
+
+    def choose(self, url: str) -> str:
+        """Fastest reliable strategy for the domain, probing a lighter one once the best is proven"""
+        stats = self._stats(self.domain_of(url))
+        reliable = [
+            name for name in ADAPTIVE_CANDIDATES
+            if stats[name].samples and stats[name].failure_rate <= self.failure_threshold
+        ]
+        if not reliable:
+            return self.default_strategy
+
+        best = min(reliable, key=lambda name: stats[name].avg_time)
+        if stats[best].samples >= self.explore_after:
+            lighter = ADAPTIVE_CANDIDATES[:ADAPTIVE_CANDIDATES.index(best)]
+            for name in reversed(lighter):
+                if not stats[name].samples:
+                    return name
+        return best
+
+    def record_navigation(self, url: str, strategy: str, time_to_ready: Optional[float], success: bool):
+        """Record the outcome of a navigation that used the given strategy"""
+        if strategy not in ADAPTIVE_CANDIDATES:
+            return
+        stats = self._stats(self.domain_of(url))[strategy]
+        stats.samples += 1
+        if not success:
+            stats.failures += 1
+            return
+        if stats.avg_time == 0.0:
+            stats.avg_time = time_to_ready
+        else:
+            stats.avg_time += self.smoothing * (time_to_ready - stats.avg_time)
+
+    def record_followup_failure(self, url: str, strategy: str):
+        """An action right after navigation failed: the page was probably not ready"""
+        if strategy in ADAPTIVE_CANDIDATES:
+            self._stats(self.domain_of(url))[strategy].failures += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'domains_tracked': len(self.domains),
+            'default_strategy': self.default_strategy
+        }
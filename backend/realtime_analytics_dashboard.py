@@ -15,11 +15,20 @@ import time
 import psutil
 import numpy as np
 from collections import deque, defaultdict
-import threading
 from statistics import mean, median, mode
 
+from pymongo import IndexModel, ASCENDING
+
+from database import async_collections, register_indexes
+from cursor_streaming import iter_documents
+
 logger = logging.getLogger(__name__)
 
+register_indexes(
+    "realtime_metrics",
+    IndexModel([("metric_name", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)])
+)
+
 @dataclass
 class MetricPoint:
     """Single metric data point"""
@@ -43,24 +52,34 @@ class MetricsCollector:
     
     def __init__(self, mongo_client: MongoClient):
         self.client = mongo_client
-        self.db = mongo_client.aether_browser
-        self.metrics = self.db.realtime_metrics
+        self.db = async_collections.db
+        self.metrics = async_collections.realtime_metrics
         self.alerts = self.db.alert_history
         
         # In-memory storage for real-time data (last 1000 points per metric)
         self.live_data = defaultdict(lambda: deque(maxlen=1000))
         self.alert_rules = {}
         self.collection_active = True
+        self.collection_task: Optional[asyncio.Task] = None
         
-        # Start background collection
-        self.collection_thread = threading.Thread(target=self._start_collection_loop, daemon=True)
-        self.collection_thread.start()
+        # Start background collection once an event loop is running
+        self.start_collection()
     
-    def _start_collection_loop(self):
-        """Start async collection loop in thread"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(self._collection_loop())
+    def start_collection(self):
+        """Run the collection loop as a task on the running event loop
+        
+        It shares the server's loop (and its Motor client) rather than a
+        thread of its own; without a running loop this is a no-op and the
+        dashboard starts it on first use.
+        """
+        if self.collection_task is not None and not self.collection_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.collection_active = True
+        self.collection_task = loop.create_task(self._collection_loop())
     
     async def _collection_loop(self):
         """Main metrics collection loop"""
@@ -107,29 +126,29 @@ class MetricsCollector:
             now = datetime.utcnow()
             
             # Database metrics
-            db_stats = self.db.command("dbStats")
+            db_stats = await self.db.command("dbStats")
             await self._store_metric("app.db.collections", db_stats.get("collections", 0), now)
             await self._store_metric("app.db.data_size_mb", db_stats.get("dataSize", 0) / (1024**2), now)
             
             # API metrics (from collections)
-            recent_chats = self.db.chat_sessions.count_documents({
+            recent_chats = await self.db.chat_sessions.count_documents({
                 "timestamp": {"$gte": now - timedelta(minutes=5)}
             })
             await self._store_metric("app.api.chat_requests_5min", recent_chats, now)
             
-            recent_browse = self.db.recent_tabs.count_documents({
+            recent_browse = await self.db.recent_tabs.count_documents({
                 "timestamp": {"$gte": now - timedelta(minutes=5)}
             })
             await self._store_metric("app.api.browse_requests_5min", recent_browse, now)
             
             # Automation metrics
-            active_automations = self.db.workflow_executions.count_documents({
+            active_automations = await self.db.workflow_executions.count_documents({
                 "status": "running"
             })
             await self._store_metric("app.automation.active_workflows", active_automations, now)
             
             # Integration metrics
-            recent_integrations = self.db.integration_logs.count_documents({
+            recent_integrations = await self.db.integration_logs.count_documents({
                 "timestamp": {"$gte": now - timedelta(minutes=5)}
             })
             await self._store_metric("app.integrations.requests_5min", recent_integrations, now)
@@ -143,19 +162,19 @@ class MetricsCollector:
             now = datetime.utcnow()
             
             # Active users (last 5 minutes)
-            active_users = len(self.db.chat_sessions.distinct("session_id", {
+            active_users = len(await self.db.chat_sessions.distinct("session_id", {
                 "timestamp": {"$gte": now - timedelta(minutes=5)}
             }))
             await self._store_metric("app.users.active_5min", active_users, now)
             
             # Active users (last hour)
-            active_users_hour = len(self.db.chat_sessions.distinct("session_id", {
+            active_users_hour = len(await self.db.chat_sessions.distinct("session_id", {
                 "timestamp": {"$gte": now - timedelta(hours=1)}
             }))
             await self._store_metric("app.users.active_1hour", active_users_hour, now)
             
             # Total sessions today
-            today_sessions = self.db.chat_sessions.count_documents({
+            today_sessions = await self.db.chat_sessions.count_documents({
                 "timestamp": {"$gte": now.replace(hour=0, minute=0, second=0, microsecond=0)}
             })
             await self._store_metric("app.users.sessions_today", today_sessions, now)
@@ -182,7 +201,7 @@ class MetricsCollector:
             
             # Only store every minute to reduce database size
             if timestamp.second < 5:  # Store at beginning of collection cycle
-                self.metrics.insert_one(metric_doc)
+                await self.metrics.insert_one(metric_doc)
             
             # Check alert rules
             await self._check_alert_rules(metric_name, value, timestamp)
@@ -225,7 +244,7 @@ class MetricsCollector:
                 "acknowledged": False
             }
             
-            self.alerts.insert_one(alert_doc)
+            await self.alerts.insert_one(alert_doc)
             logger.warning(f"Alert triggered: {rule.metric_name} {rule.condition} {rule.threshold}, actual: {value}")
             
         except Exception as e:
@@ -270,14 +289,16 @@ class MetricsCollector:
     def stop_collection(self):
         """Stop metrics collection"""
         self.collection_active = False
+        if self.collection_task is not None and not self.collection_task.done():
+            self.collection_task.cancel()
 
 class AnalyticsAggregator:
     """Analytics data aggregation and processing"""
     
     def __init__(self, mongo_client: MongoClient):
         self.client = mongo_client
-        self.db = mongo_client.aether_browser
-        self.metrics = self.db.realtime_metrics
+        self.db = async_collections.db
+        self.metrics = async_collections.realtime_metrics
     
     async def get_metric_summary(self, metric_name: str, hours: int = 24) -> Dict[str, Any]:
         """Get metric summary statistics"""
@@ -304,7 +325,7 @@ class AnalyticsAggregator:
                 }
             ]
             
-            result = list(self.metrics.aggregate(pipeline))
+            result = await self.metrics.aggregate(pipeline).to_list(1)
             
             if result:
                 stats = result[0]
@@ -354,7 +375,7 @@ class AnalyticsAggregator:
                 }
             ]
             
-            hourly_data = list(self.metrics.aggregate(pipeline))
+            hourly_data = await self.metrics.aggregate(pipeline).to_list(None)
             
             if len(hourly_data) < 2:
                 return {"error": "Insufficient data for trend analysis"}
@@ -394,29 +415,26 @@ class AnalyticsAggregator:
             start_time = datetime.utcnow() - timedelta(hours=hours)
             correlations = {}
             
-            # Get data for all metrics
+            # Get values for all metrics; only the floats are kept, not the documents
             metric_data = {}
             for metric_name in metric_names:
-                data = list(self.metrics.find(
-                    {
-                        "metric_name": metric_name,
-                        "timestamp": {"$gte": start_time}
-                    },
+                values = []
+                async for point in iter_documents(
+                    self.metrics,
+                    {"metric_name": metric_name, "timestamp": {"$gte": start_time}},
                     {"value": 1, "timestamp": 1}
-                ).sort("timestamp", 1))
+                ):
+                    values.append(point["value"])
                 
-                metric_data[metric_name] = data
+                metric_data[metric_name] = values
             
             # Calculate pairwise correlations
             for i, metric1 in enumerate(metric_names):
                 for metric2 in metric_names[i+1:]:
                     if metric1 in metric_data and metric2 in metric_data:
-                        data1 = metric_data[metric1]
-                        data2 = metric_data[metric2]
-                        
                         # Align data by timestamp (simplified)
-                        values1 = [point["value"] for point in data1]
-                        values2 = [point["value"] for point in data2]
+                        values1 = metric_data[metric1]
+                        values2 = metric_data[metric2]
                         
                         if len(values1) > 1 and len(values2) > 1:
                             # Simple correlation calculation
@@ -441,7 +459,7 @@ class DashboardManager:
     
     def __init__(self, mongo_client: MongoClient):
         self.client = mongo_client
-        self.db = mongo_client.aether_browser
+        self.db = async_collections.db
         self.dashboards = self.db.user_dashboards
         
         # Initialize metrics collector
@@ -466,6 +484,8 @@ class DashboardManager:
     async def get_dashboard_data(self, user_session: str, dashboard_type: str = "overview") -> Dict[str, Any]:
         """Get complete dashboard data"""
         try:
+            self.metrics_collector.start_collection()
+            
             if dashboard_type == "overview":
                 return await self._get_overview_dashboard()
             elif dashboard_type == "system":
@@ -507,10 +527,10 @@ class DashboardManager:
                 health_status = "critical"
             
             # Get recent alerts
-            recent_alerts = list(self.db.alert_history.find(
+            recent_alerts = await self.db.alert_history.find(
                 {"timestamp": {"$gte": datetime.utcnow() - timedelta(hours=24)}},
                 {"_id": 0}
-            ).sort("timestamp", -1).limit(5))
+            ).sort("timestamp", -1).limit(5).to_list(5)
             
             return {
                 "dashboard_type": "overview",
@@ -642,13 +662,13 @@ class DashboardManager:
         try:
             start_time = datetime.utcnow() - timedelta(hours=hours)
             
-            data = list(self.db.realtime_metrics.find(
+            data = await self.db.realtime_metrics.find(
                 {
                     "metric_name": metric_name,
                     "timestamp": {"$gte": start_time}
                 },
                 {"_id": 0, "value": 1, "timestamp": 1}
-            ).sort("timestamp", 1))
+            ).sort("timestamp", 1).to_list(None)
             
             return [
                 {
@@ -683,7 +703,7 @@ class DashboardManager:
             rule_doc["user_session"] = user_session
             rule_doc["created_at"] = datetime.utcnow()
             
-            self.db.alert_rules.insert_one(rule_doc)
+            await self.db.alert_rules.insert_one(rule_doc)
             
             return rule_id
             
@@ -705,13 +725,14 @@ class DashboardManager:
                 }}
             ]
             
-            severity_counts = {item["_id"]: item["count"] for item in self.db.alert_history.aggregate(pipeline)}
+            severity_counts = {item["_id"]: item["count"]
+                               for item in await self.db.alert_history.aggregate(pipeline).to_list(None)}
             
             # Get recent alerts
-            recent_alerts = list(self.db.alert_history.find(
+            recent_alerts = await self.db.alert_history.find(
                 {"timestamp": {"$gte": start_time}},
                 {"_id": 0}
-            ).sort("timestamp", -1).limit(10))
+            ).sort("timestamp", -1).limit(10).to_list(10)
             
             return {
                 "period_hours": hours,
@@ -2,13 +2,12 @@
 AETHER Native Chromium Browser API v6.0.0 - Complete Native Integration
 """
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
-import os
 from dotenv import load_dotenv
-from pymongo import MongoClient
 import uuid
 from datetime import datetime
 import logging
@@ -17,8 +16,14 @@ import json
 import threading
 
 # Import native components
-from native_chromium_engine import NativeChromiumEngine, initialize_native_chromium_engine
+from native_chromium_engine import NativeChromiumEngine, initialize_native_chromium_engine, LAUNCH_PROFILES, BATCH_ACTIONS
+from native_request_routing import RoutingPolicy
 from websocket_server import AETHERWebSocketServer, integrate_websocket_with_native_engine
+from database import async_collections, ensure_indexes, register_indexes, close_database
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from write_behind import write_behind
+from timeline_manager import TimelineManager
+from cache_system import cache_system
 # from enhanced_native_api import enhanced_router  # Temporarily disabled until components are ready
 
 load_dotenv()
@@ -43,10 +48,15 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-# Database connection
-MONGO_URL = os.getenv("MONGO_URL")
-client = MongoClient(MONGO_URL)
-db = client.aether_browser
+# Database connection: the process-wide pooled client from database.py.
+# Async handlers go through Motor so a slow query never blocks the event loop
+db = async_collections
+
+register_indexes("recent_tabs", IndexModel([("timestamp", DESCENDING)]))
+register_indexes("chat_sessions", IndexModel([("session_id", ASCENDING), ("timestamp", DESCENDING)]))
+
+# Timeline reads and exports; holds no connection of its own
+timeline_manager = TimelineManager()
 
 # Pydantic models
 class ChatMessage(BaseModel):
@@ -63,11 +73,17 @@ class BrowsingSession(BaseModel):
 class NativeSessionRequest(BaseModel):
     user_session: str
     user_agent: Optional[str] = None
+    launch_profile: Optional[str] = None  # interactive, automation-fast, scrape
+    block_resource_types: Optional[List[str]] = None  # e.g. image, font, media
+    block_domains: Optional[List[str]] = None
+    block_trackers: Optional[bool] = False
 
 class NavigationRequest(BaseModel):
     session_id: str
     url: str
     timeout: Optional[int] = 30000
+    wait_until: Optional[str] = None  # commit, domcontentloaded, load, networkidle, selector; None = adaptive
+    wait_selector: Optional[str] = None
 
 class JavaScriptRequest(BaseModel):
     session_id: str
@@ -91,6 +107,7 @@ class ScreenshotRequest(BaseModel):
     session_id: str
     full_page: Optional[bool] = False
     quality: Optional[int] = 80
+    reuse_if_unchanged: Optional[bool] = False
 
 class SmartClickRequest(BaseModel):
     session_id: str
@@ -104,6 +121,11 @@ class ContentRequest(BaseModel):
     session_id: str
     include_html: Optional[bool] = False
 
+class BatchRequest(BaseModel):
+    session_id: str
+    actions: List[Dict[str, Any]]  # [{"action": "navigate", "url": ...}, {"action": "click", "selector": ...}]
+    stop_on_error: Optional[bool] = True
+
 # Global state for native engine
 native_engine: Optional[NativeChromiumEngine] = None
 websocket_server: Optional[AETHERWebSocketServer] = None
@@ -117,8 +139,20 @@ async def startup_event():
     try:
         logger.info("🔥 AETHER Native Chromium Integration - Starting...")
         
+        # Create the indexes every module registered
+        try:
+            await ensure_indexes()
+        except Exception as e:
+            logger.error(f"❌ Index bootstrap failed: {e}")
+        
+        # Reload the cache snapshot before the first request
+        try:
+            await cache_system.warm_up()
+        except Exception as e:
+            logger.error(f"❌ Cache warm-up failed: {e}")
+        
         # Initialize Native Chromium Engine
-        native_engine = await initialize_native_chromium_engine(client)
+        native_engine = await initialize_native_chromium_engine()
         
         if native_engine:
             native_engine_ready = True
@@ -155,7 +189,7 @@ async def health_check():
     try:
         # Test database connection
         try:
-            db.command("ping")
+            await db.db.command("ping")
             db_status = "operational"
         except:
             db_status = "error"
@@ -163,11 +197,13 @@ async def health_check():
         # Get native engine status
         engine_status = "not_initialized"
         session_count = 0
+        session_lifecycle = {}
         websocket_stats = {}
         
         if native_engine:
             engine_status = "operational" if native_engine_ready else "initializing"
             session_count = len(native_engine.sessions)
+            session_lifecycle = native_engine.get_lifecycle_stats()
         
         if websocket_server:
             websocket_stats = await websocket_server.get_connection_stats()
@@ -179,6 +215,9 @@ async def health_check():
             "native_chromium_ready": native_engine_ready,
             "native_engine_status": engine_status,
             "active_sessions": session_count,
+            "session_lifecycle": session_lifecycle,
+            "write_behind": write_behind.get_stats(),
+            "cache_warm_start": cache_system.get_stats()["warm_start"],
             "websocket_server": websocket_stats,
             "timestamp": datetime.utcnow().isoformat(),
             "message": "AETHER Native Chromium Integration - Full Stack Operational",
@@ -222,12 +261,25 @@ async def native_status():
                     "data_extraction"
                 ],
                 "browser_ready": native_engine.is_initialized,
+                "launch_profiles": list(LAUNCH_PROFILES.keys()),
+                "context_pool": {
+                    profile: manager.get_pool_stats()
+                    for profile, manager in native_engine.shard_managers.items()
+                },
+                "browser_shards": {
+                    profile: manager.get_stats()
+                    for profile, manager in native_engine.shard_managers.items()
+                },
                 "sessions": {
                     session_id: {
                         "user_session": session.user_session,
+                        "launch_profile": session.launch_profile,
                         "created_at": session.created_at.isoformat(),
                         "last_activity": session.last_activity.isoformat(),
-                        "current_url": session.page.url if session.page else None
+                        "current_url": session.page.url if session.page else None,
+                        "screencast": native_engine.screencasts[session_id].get_stats()
+                            if session_id in native_engine.screencasts else None,
+                        "screenshot_cache": session.screenshot_cache.get_stats()
                     }
                     for session_id, session in native_engine.sessions.items()
                 }
@@ -257,9 +309,23 @@ async def create_native_session(request: NativeSessionRequest):
         if not native_engine_ready or not native_engine:
             raise HTTPException(status_code=503, detail="Native engine not available")
         
+        if request.launch_profile and request.launch_profile not in LAUNCH_PROFILES:
+            raise HTTPException(status_code=400, detail=f"Unknown launch profile: {request.launch_profile}")
+        
+        try:
+            routing_policy = RoutingPolicy.from_request(
+                request.block_resource_types,
+                request.block_domains,
+                request.block_trackers
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
         result = await native_engine.create_native_session(
             request.user_session,
-            request.user_agent
+            request.user_agent,
+            request.launch_profile,
+            routing_policy
         )
         
         if result["success"]:
@@ -283,7 +349,9 @@ async def native_navigate(request: NavigationRequest):
         result = await native_engine.navigate_to_url(
             request.session_id,
             request.url,
-            request.timeout
+            request.timeout,
+            request.wait_until,
+            request.wait_selector
         )
         
         if result["success"]:
@@ -307,7 +375,8 @@ async def native_screenshot(request: ScreenshotRequest):
         result = await native_engine.capture_screenshot(
             request.session_id,
             request.full_page,
-            request.quality
+            request.quality,
+            reuse_if_unchanged=request.reuse_if_unchanged
         )
         
         if result["success"]:
@@ -321,6 +390,38 @@ async def native_screenshot(request: ScreenshotRequest):
         logger.error(f"Screenshot error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/native/screenshot/{session_id}/image")
+async def native_screenshot_image(session_id: str, full_page: bool = False, quality: int = 80):
+    """Capture screenshot and return the raw JPEG (no base64/JSON wrapping)"""
+    try:
+        if not native_engine_ready or not native_engine:
+            raise HTTPException(status_code=503, detail="Native engine not available")
+        
+        result = await native_engine.capture_screenshot(
+            session_id,
+            full_page,
+            quality,
+            encoding='binary'
+        )
+        
+        if result["success"]:
+            return Response(
+                content=result["image"],
+                media_type="image/jpeg",
+                headers={
+                    "Cache-Control": "no-store",
+                    "X-Screenshot-Timestamp": result["metadata"]["timestamp"]
+                }
+            )
+        else:
+            raise HTTPException(status_code=400, detail=result["error"])
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Screenshot image error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/native/execute-js")
 async def native_execute_js(request: JavaScriptRequest):
     """Execute JavaScript using native browser"""
@@ -361,11 +462,12 @@ async def native_click(request: ClickRequest):
             )
         elif request.x is not None and request.y is not None:
             # Coordinate click
-            session = native_engine.sessions.get(request.session_id)
+            session = await native_engine.get_session(request.session_id)
             if not session:
                 raise HTTPException(status_code=404, detail="Session not found")
             
             await session.page.mouse.click(request.x, request.y)
+            session.screenshot_cache.invalidate()
             result = {
                 "success": True,
                 "coordinates": {"x": request.x, "y": request.y}
@@ -472,6 +574,34 @@ async def close_native_session(session_id: str):
         logger.error(f"Close session error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/native/batch")
+async def native_batch(request: BatchRequest):
+    """Run an ordered list of actions on one session in a single round trip"""
+    try:
+        if not native_engine_ready or not native_engine:
+            raise HTTPException(status_code=503, detail="Native engine not available")
+        
+        unknown = [step.get("action") for step in request.actions if step.get("action") not in BATCH_ACTIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown batch actions: {unknown}")
+        
+        result = await native_engine.run_batch(
+            request.session_id,
+            request.actions,
+            request.stop_on_error
+        )
+        
+        if "steps" in result:
+            return result
+        else:
+            raise HTTPException(status_code=404 if result["error"] == "Session not found" else 400, detail=result["error"])
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ============================================================================
 # COMPUTER USE API ENDPOINTS - AI-Powered Automation
 # ============================================================================
@@ -567,7 +697,7 @@ async def browse_page(session: BrowsingSession):
             "engine_type": "native_chromium" if native_engine_ready else "fallback"
         }
         
-        db.recent_tabs.insert_one(tab_data)
+        await write_behind.insert("recent_tabs", tab_data)
         
         return {
             "success": True,
@@ -624,7 +754,7 @@ async def chat_with_ai(chat_data: ChatMessage):
             "timestamp": datetime.utcnow()
         }
         
-        db.chat_sessions.insert_one(chat_record)
+        await write_behind.insert("chat_sessions", chat_record)
         
         return response_data
         
@@ -636,10 +766,10 @@ async def chat_with_ai(chat_data: ChatMessage):
 async def get_recent_tabs():
     """Enhanced recent tabs with native engine info"""
     try:
-        tabs = list(db.recent_tabs.find(
+        tabs = await db.recent_tabs.find(
             {}, 
             {"_id": 0}
-        ).sort("timestamp", -1).limit(8))
+        ).sort("timestamp", -1).limit(8).to_list(8)
         
         # Add native engine status to each tab
         for tab in tabs:
@@ -708,14 +838,16 @@ async def get_recommendations():
 async def clear_browsing_history():
     """Enhanced clear history with native session cleanup"""
     try:
-        # Clear database records
-        tabs_deleted = db.recent_tabs.delete_many({}).deleted_count
-        chat_deleted = db.chat_sessions.delete_many({}).deleted_count
+        # Clear database records, including writes still buffered
+        await write_behind.flush("recent_tabs")
+        await write_behind.flush("chat_sessions")
+        tabs_deleted = (await db.recent_tabs.delete_many({})).deleted_count
+        chat_deleted = (await db.chat_sessions.delete_many({})).deleted_count
         
         # Clear native sessions if available
         native_sessions_closed = 0
         if native_engine_ready and native_engine:
-            sessions_to_close = list(native_engine.sessions.keys())
+            sessions_to_close = list(native_engine.sessions.keys()) + list(native_engine.hibernated_sessions.keys())
             for session_id in sessions_to_close:
                 result = await native_engine.close_session(session_id)
                 if result["success"]:
@@ -735,6 +867,40 @@ async def clear_browsing_history():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# ============================================================================
+# TIMELINE - Paged reads and streaming exports
+# ============================================================================
+
+@app.get("/api/timeline/{session_id}")
+async def get_timeline_page(session_id: str, limit: int = 50, cursor: Optional[str] = None):
+    """Newest-first timeline page; pass next_cursor back to get the following page"""
+    try:
+        if limit < 1 or limit > 500:
+            raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+        
+        return await timeline_manager.get_timeline_page(session_id, limit=limit, cursor=cursor)
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Timeline page error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/timeline/{session_id}/export")
+async def export_timeline(session_id: str, format: str = "jsonl"):
+    """Stream the whole timeline as JSON Lines or CSV without loading it into memory"""
+    if format not in ("jsonl", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'jsonl' or 'csv'")
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        timeline_manager.stream_timeline_export(session_id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="timeline-{session_id}.{format}"'}
+    )
+
 # ============================================================================
 # ENHANCED NATIVE API INTEGRATION
 # ============================================================================
@@ -764,6 +930,10 @@ async def shutdown_event():
             await websocket_server.stop_server()
             logger.info("✅ WebSocket server stopped")
         
+        await write_behind.close()
+        await cache_system.close()
+        close_database()
+        
         logger.info("🛑 AETHER shutdown complete")
         
     except Exception as e:
@@ -284,7 +284,7 @@ if COMPREHENSIVE_PLAN_AVAILABLE:
         logger.info("   ✅ Predictive Interface")
         
         # C1: Agent Marketplace
-        agent_marketplace = initialize_agent_marketplace(client)
+        agent_marketplace = initialize_agent_marketplace()
         set_agent_marketplace_instance(agent_marketplace)
         logger.info("🏪 AGENT MARKETPLACE initialized:")
         logger.info("   ✅ Community Agent Creation")
@@ -302,7 +302,7 @@ if COMPREHENSIVE_PLAN_AVAILABLE:
         logger.info("   ✅ Multi-Format Support")
         
         # C2: Cross-Platform Sync Engine
-        cross_platform_sync_engine = initialize_cross_platform_sync_engine(client)
+        cross_platform_sync_engine = initialize_cross_platform_sync_engine()
         set_cross_platform_sync_instance(cross_platform_sync_engine)
         logger.info("🌐 CROSS-PLATFORM SYNC ENGINE initialized:")
         logger.info("   ✅ Real-time Multi-Platform Sync")
@@ -0,0 +1,103 @@
+"""
+AETHER Single-Flight
+Coalesces concurrent computations of the same key and wraps cached values
+with a freshness deadline for stale-while-revalidate
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marker key of a cached value stored with a freshness deadline
+SWR_MARKER = "__swr__"
+
+def wrap_fresh(value: Any, ttl: float) -> Dict[str, Any]:
+    """Envelope a value as fresh for ttl seconds"""
+    return {SWR_MARKER: 1, "value": value, "fresh_until": time.time() + ttl}
+
+def unwrap_fresh(stored: Any) -> Tuple[Any, bool]:
+    """(value, is_stale) of a cached envelope; plain values are always fresh"""
+    if isinstance(stored, dict) and stored.get(SWR_MARKER) == 1:
+        return stored.get("value"), stored.get("fresh_until", 0) <= time.time()
+    return stored, False
+
+class SingleFlight:
+    """
+    At most one in-flight computation per key.
+
+    Callers that arrive while a computation for their key is running await
+    its result (or its exception) instead of starting their own. Background
+    refreshes started with `refresh` share the same slot, so a stale key is
+    recomputed once no matter how many readers saw it stale.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._refreshes: Dict[str, asyncio.Task] = {}
+
+        # Stats
+        self.stats = {
+            'executions': 0,
+            'coalesced': 0,
+            'refreshes': 0,
+            'errors': 0
+        }
+
+    async def do(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Run compute() for key, or join the run already in progress
+
+        The computation runs in its own task, detached from every caller, and
+        each caller awaits it through shield: a cancelled caller (e.g. a
+        disconnected client) leaves without cancelling the others' result.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+        else:
+            self.stats['executions'] += 1
+            task = asyncio.create_task(self._run(compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    async def _run(self, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await compute()
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Callers that already left never retrieve it; avoid the warning
+            task.exception()
+
+    def refresh(self, key: str, compute: Callable[[], Awaitable[Any]]):
+        """Recompute key in the background unless a computation is already running"""
+        if key in self._inflight or key in self._refreshes:
+            return
+        self.stats['refreshes'] += 1
+        task = asyncio.create_task(self._refresh(key, compute))
+        self._refreshes[key] = task
+        task.add_done_callback(lambda _: self._refreshes.pop(key, None))
+
+    async def _refresh(self, key: str, compute: Callable[[], Awaitable[Any]]):
+        try:
+            await self.do(key, compute)
+        except Exception as e:
+            logger.warning(f"⚠️ Background refresh of {key} failed, serving stale value: {e}")
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight or key in self._refreshes
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'in_flight': len(self._inflight),
+            'refreshing': len(self._refreshes)
+        }
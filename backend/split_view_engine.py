@@ -10,8 +10,18 @@ from dataclasses import dataclass, field
 from enum import Enum
 import json
 
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+from database import get_async_database, register_indexes
+
 logger = logging.getLogger(__name__)
 
+register_indexes(
+    "split_view_sessions",
+    IndexModel([("session_id", ASCENDING)]),
+    IndexModel([("user_session", ASCENDING), ("is_active", ASCENDING), ("last_accessed", DESCENDING)])
+)
+
 class SplitLayout(Enum):
     HORIZONTAL = "horizontal"
     VERTICAL = "vertical"
@@ -58,8 +68,8 @@ class SplitViewEngine:
     This addresses Fellou.ai's ability to view and interact with multiple websites simultaneously.
     """
     
-    def __init__(self, mongo_client):
-        self.db = mongo_client.aether_browser
+    def __init__(self, mongo_client=None):
+        self.db = mongo_client.aether_browser if mongo_client else get_async_database()
         self.active_sessions: Dict[str, SplitViewSession] = {}
         self.max_panes_per_session = 9  # 3x3 grid max
         
@@ -414,14 +424,14 @@ class SplitViewEngine:
                     })
             
             # From database (recent sessions)
-            db_sessions = list(self.db.split_view_sessions.find(
+            db_sessions = await self.db.split_view_sessions.find(
                 {
                     "user_session": user_session,
                     "is_active": True,
                     "last_accessed": {"$gte": datetime.utcnow() - timedelta(days=7)}
                 },
                 {"_id": 0, "panes_data": 0}  # Exclude large pane data
-            ).sort("last_accessed", -1))
+            ).sort("last_accessed", -1).to_list(None)
             
             # Merge and deduplicate
             session_ids = {s["session_id"] for s in user_sessions}
@@ -540,7 +550,7 @@ class SplitViewEngine:
                     "metadata": pane.metadata
                 })
             
-            self.db.split_view_sessions.insert_one(doc)
+            await self.db.split_view_sessions.insert_one(doc)
             
         except Exception as e:
             logger.error(f"Error storing split session: {e}")
@@ -573,7 +583,7 @@ class SplitViewEngine:
                     "metadata": pane.metadata
                 })
             
-            self.db.split_view_sessions.update_one(
+            await self.db.split_view_sessions.update_one(
                 {"session_id": session.session_id},
                 {"$set": update_doc}
             )
@@ -584,7 +594,7 @@ class SplitViewEngine:
     async def _load_split_session(self, session_id: str):
         """Load split view session from database"""
         try:
-            doc = self.db.split_view_sessions.find_one({"session_id": session_id})
+            doc = await self.db.split_view_sessions.find_one({"session_id": session_id})
             if not doc:
                 return
             
@@ -640,7 +650,7 @@ class SplitViewEngine:
                 
                 # Mark as inactive in database
                 if inactive_sessions:
-                    self.db.split_view_sessions.update_many(
+                    await self.db.split_view_sessions.update_many(
                         {"session_id": {"$in": inactive_sessions}},
                         {"$set": {"is_active": False}}
                     )
@@ -653,7 +663,7 @@ class SplitViewEngine:
 # Global split view engine instance
 split_view_engine = None
 
-def initialize_split_view_engine(mongo_client) -> SplitViewEngine:
+def initialize_split_view_engine(mongo_client=None) -> SplitViewEngine:
     """Initialize the global split view engine"""
     global split_view_engine
     split_view_engine = SplitViewEngine(mongo_client)
@@ -0,0 +1,326 @@
+"""
+AETHER Task Broker
+Shared ready queue for background tasks across nodes: Redis streams with a
+consumer group, or an in-process broker for single-node runs and tests.
+Only task ids travel through the broker; Mongo stays the source of truth.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import ResponseError
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class BrokerMessage:
+    """One delivery of a task id; acked once the task has been handled on this node"""
+    task_id: str
+    priority: int
+    message_id: str
+    queue: str
+
+@dataclass
+class BrokerConfig:
+    """Broker backend ("local" keeps queues in-process), Redis stream naming and visibility timeout"""
+    backend: str = "local"
+    redis_url: str = "redis://localhost:6379"
+    stream_prefix: str = "aether:tasks"
+    group: str = "aether-workers"
+    visibility_timeout: int = 120
+    block_ms: int = 5000
+    max_stream_length: int = 100000
+
+    @classmethod
+    def from_env(cls) -> "BrokerConfig":
+        return cls(
+            backend=os.getenv("TASK_BROKER", "local"),
+            redis_url=os.getenv("TASK_BROKER_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379")),
+            stream_prefix=os.getenv("TASK_BROKER_STREAM", "aether:tasks"),
+            group=os.getenv("TASK_BROKER_GROUP", "aether-workers"),
+            visibility_timeout=int(os.getenv("TASK_BROKER_VISIBILITY_TIMEOUT", "120"))
+        )
+
+class PriorityStride:
+    """
+    Stride order over priorities for claims, mirroring the processor's
+    WeightedFairScheduler: each claimed message advances its priority's
+    pass by 1/weight (weight 2**(priority-1)) and the smallest pass goes
+    first, so LOW still gets a share while URGENT keeps arriving. A
+    priority with nothing to claim rejoins at the current virtual time.
+    """
+
+    def __init__(self):
+        self.passes: Dict[int, float] = {}
+        self.virtual_time = 0.0
+
+    @staticmethod
+    def weight(priority: int) -> float:
+        return float(2 ** (priority - 1))
+
+    def order(self, priorities) -> List[int]:
+        for priority in priorities:
+            self.passes[priority] = max(self.passes.get(priority, 0.0), self.virtual_time)
+        return sorted(priorities, key=lambda priority: (self.passes[priority], -priority))
+
+    def share(self, priority: int, count: int, priorities) -> int:
+        """A priority's part of one claim of count messages, at least one"""
+        total = sum(self.weight(other) for other in priorities)
+        return max(1, round(count * self.weight(priority) / total))
+
+    def charge(self, priority: int, claimed: int):
+        if claimed:
+            self.virtual_time = self.passes[priority]
+            self.passes[priority] += claimed / self.weight(priority)
+
+class TaskBroker(ABC):
+    """
+    At-least-once delivery of task ids with a visibility timeout.
+
+    A claimed message stays invisible to other consumers until it is acked
+    or its visibility timeout lapses without extend(); then any consumer
+    may claim it again. Duplicate deliveries are expected: the processor's
+    atomic claim in Mongo decides which node actually runs a task.
+    """
+
+    @abstractmethod
+    async def publish(self, task_id: str, priority: int):
+        """Make a task id available to every node"""
+
+    @abstractmethod
+    async def claim(self, consumer: str, count: int) -> List[BrokerMessage]:
+        """Up to count messages, weighted across priorities, redelivering expired ones; may block briefly"""
+
+    @abstractmethod
+    async def ack(self, message: BrokerMessage):
+        """Remove a handled message"""
+
+    @abstractmethod
+    async def extend(self, consumer: str, messages: List[BrokerMessage]):
+        """Restart the visibility timeout of messages this consumer still holds"""
+
+    async def close(self):
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__}
+
+class InMemoryBroker(TaskBroker):
+    """Single-process broker with the same delivery semantics as the Redis one"""
+
+    def __init__(self, config: BrokerConfig = None):
+        self.config = config or BrokerConfig()
+        self.ready: Dict[int, Deque[BrokerMessage]] = {}
+        self.inflight: Dict[str, Tuple[BrokerMessage, str, float]] = {}  # message_id -> (message, consumer, deadline)
+        self._condition = asyncio.Condition()
+        self.stride = PriorityStride()
+        self.redelivered = 0
+
+    async def publish(self, task_id: str, priority: int):
+        async with self._condition:
+            message = BrokerMessage(task_id, priority, uuid.uuid4().hex, f"p{priority}")
+            self.ready.setdefault(priority, deque()).append(message)
+            self._condition.notify_all()
+
+    def _requeue_expired(self):
+        now = asyncio.get_running_loop().time()
+        for message_id, (message, _, deadline) in list(self.inflight.items()):
+            if deadline <= now:
+                del self.inflight[message_id]
+                self.ready.setdefault(message.priority, deque()).appendleft(message)
+                self.redelivered += 1
+
+    def _available(self) -> bool:
+        return any(self.ready.values())
+
+    async def claim(self, consumer: str, count: int) -> List[BrokerMessage]:
+        async with self._condition:
+            self._requeue_expired()
+            if not self._available():
+                try:
+                    await asyncio.wait_for(self._condition.wait_for(self._available), self.config.block_ms / 1000)
+                except asyncio.TimeoutError:
+                    return []
+            deadline = asyncio.get_running_loop().time() + self.config.visibility_timeout
+            claimed: List[BrokerMessage] = []
+            ready = [priority for priority, queue in self.ready.items() if queue]
+            order = self.stride.order(ready)
+            # Each priority's weighted share first, then whatever is left in stride order
+            for limit in (lambda priority: self.stride.share(priority, count, ready), lambda _: count):
+                for priority in order:
+                    queue = self.ready[priority]
+                    taken = 0
+                    while queue and taken < limit(priority) and len(claimed) < count:
+                        message = queue.popleft()
+                        self.inflight[message.message_id] = (message, consumer, deadline)
+                        claimed.append(message)
+                        taken += 1
+                    self.stride.charge(priority, taken)
+            return claimed
+
+    async def ack(self, message: BrokerMessage):
+        self.inflight.pop(message.message_id, None)
+
+    async def extend(self, consumer: str, messages: List[BrokerMessage]):
+        deadline = asyncio.get_running_loop().time() + self.config.visibility_timeout
+        for message in messages:
+            entry = self.inflight.get(message.message_id)
+            if entry is not None and entry[1] == consumer:
+                self.inflight[message.message_id] = (message, consumer, deadline)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "ready": sum(len(queue) for queue in self.ready.values()),
+            "in_flight": len(self.inflight),
+            "redelivered": self.redelivered
+        }
+
+class RedisStreamBroker(TaskBroker):
+    """
+    One Redis stream per priority, read through a shared consumer group.
+
+    Claimed entries sit in the group's pending list until XACK; entries
+    idle longer than the visibility timeout (their consumer died or stopped
+    heartbeating) are taken over with XAUTOCLAIM, and extend() resets the
+    idle time of held entries with XCLAIM JUSTID. Needs Redis 6.2+.
+    """
+
+    def __init__(self, config: BrokerConfig = None, priorities: Tuple[int, ...] = (5, 4, 3, 2, 1)):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis package is required for the Redis task broker")
+        self.config = config or BrokerConfig.from_env()
+        self.priorities = tuple(sorted(priorities, reverse=True))
+        self.streams = {priority: f"{self.config.stream_prefix}:p{priority}" for priority in self.priorities}
+        self.redis_client = aioredis.Redis.from_url(self.config.redis_url, decode_responses=True)
+        self._groups_ready = False
+        self.stride = PriorityStride()
+
+        # Stats
+        self.stats = {"published": 0, "claimed": 0, "redelivered": 0, "acked": 0}
+
+    async def _ensure_groups(self):
+        if self._groups_ready:
+            return
+        for stream in self.streams.values():
+            try:
+                await self.redis_client.xgroup_create(stream, self.config.group, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+        self._groups_ready = True
+
+    async def publish(self, task_id: str, priority: int):
+        await self._ensure_groups()
+        await self.redis_client.xadd(
+            self.streams[priority], {"task_id": task_id, "priority": priority},
+            maxlen=self.config.max_stream_length, approximate=True
+        )
+        self.stats["published"] += 1
+
+    def _messages(self, stream: str, entries) -> List[BrokerMessage]:
+        priority = int(stream.rsplit(":p", 1)[1])
+        return [
+            BrokerMessage(fields["task_id"], priority, message_id, stream)
+            for message_id, fields in entries if fields
+        ]
+
+    async def claim(self, consumer: str, count: int) -> List[BrokerMessage]:
+        await self._ensure_groups()
+        timeout_ms = self.config.visibility_timeout * 1000
+
+        # Expired deliveries first, highest priority first
+        claimed: List[BrokerMessage] = []
+        for stream in self.streams.values():
+            if len(claimed) >= count:
+                break
+            result = await self.redis_client.xautoclaim(
+                stream, self.config.group, consumer, min_idle_time=timeout_ms,
+                start_id="0-0", count=count - len(claimed)
+            )
+            recovered = self._messages(stream, result[1])
+            self.stats["redelivered"] += len(recovered)
+            claimed.extend(recovered)
+        if claimed:
+            self.stats["claimed"] += len(claimed)
+            return claimed
+
+        # Then new entries: each stream's weighted share in stride order, then the
+        # rest from streams that had more (COUNT applies per stream, so read one at a time)
+        order = self.stride.order(self.priorities)
+        drained = set()
+        for limit in (lambda priority: self.stride.share(priority, count, self.priorities), lambda _: count):
+            for priority in order:
+                if len(claimed) >= count or priority in drained:
+                    continue
+                wanted = min(limit(priority), count - len(claimed))
+                response = await self.redis_client.xreadgroup(
+                    self.config.group, consumer, {self.streams[priority]: ">"}, count=wanted
+                )
+                taken = [message for _, entries in response or []
+                         for message in self._messages(self.streams[priority], entries)]
+                if len(taken) < wanted:
+                    drained.add(priority)
+                self.stride.charge(priority, len(taken))
+                claimed.extend(taken)
+
+        # Nothing ready anywhere: block across every stream until something is published
+        if not claimed:
+            response = await self.redis_client.xreadgroup(
+                self.config.group, consumer, {stream: ">" for stream in self.streams.values()},
+                count=count, block=self.config.block_ms
+            )
+            for stream, entries in response or []:
+                received = self._messages(stream, entries)
+                if received:
+                    self.stride.charge(received[0].priority, len(received))
+                claimed.extend(received)
+        self.stats["claimed"] += len(claimed)
+        return claimed
+
+    async def ack(self, message: BrokerMessage):
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.xack(message.queue, self.config.group, message.message_id)
+        pipe.xdel(message.queue, message.message_id)
+        await pipe.execute()
+        self.stats["acked"] += 1
+
+    async def extend(self, consumer: str, messages: List[BrokerMessage]):
+        by_stream: Dict[str, List[str]] = {}
+        for message in messages:
+            by_stream.setdefault(message.queue, []).append(message.message_id)
+        if not by_stream:
+            return
+        pipe = self.redis_client.pipeline(transaction=False)
+        for stream, message_ids in by_stream.items():
+            pipe.xclaim(stream, self.config.group, consumer, min_idle_time=0,
+                        message_ids=message_ids, justid=True)
+        await pipe.execute()
+
+    async def close(self):
+        await self.redis_client.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "streams": list(self.streams.values()), **self.stats}
+
+def create_broker(config: BrokerConfig = None) -> Optional[TaskBroker]:
+    """Broker for the configured backend; None keeps the processor's queues node-local"""
+    config = config or BrokerConfig.from_env()
+    if config.backend == "redis":
+        return RedisStreamBroker(config)
+    if config.backend == "memory":
+        return InMemoryBroker(config)
+    if config.backend != "local":
+        raise ValueError(f"Unknown task broker backend: {config.backend}")
+    return None
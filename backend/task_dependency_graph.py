@@ -0,0 +1,102 @@
+"""
+AETHER Task Dependency Graph
+In-memory DAG of background tasks waiting on other tasks; a completion
+releases its dependents directly instead of having them re-query Mongo
+"""
+
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, List, Set
+
+logger = logging.getLogger(__name__)
+
+class TaskDependencyGraph:
+    """
+    Waiting tasks, their unmet dependency counts and the reverse edges.
+
+    Readiness is a dictionary lookup: a task is blocked while it has a
+    remaining count. complete() decrements the count of each dependent and
+    returns those that reached zero; fail() returns every task that can now
+    never run, transitively. Recently finished task ids are remembered so
+    dependents submitted shortly afterwards resolve without a query.
+    """
+
+    def __init__(self, remember_finished: int = 10000):
+        self.waiting: Dict[str, Any] = {}  # task_id -> task
+        self.remaining: Dict[str, Set[str]] = {}  # task_id -> unmet dependency ids
+        self.dependents: Dict[str, Set[str]] = defaultdict(set)  # dependency id -> waiting task ids
+        self.finished: "OrderedDict[str, bool]" = OrderedDict()  # task_id -> succeeded
+        self.remember_finished = remember_finished
+
+    def __len__(self) -> int:
+        return len(self.waiting)
+
+    def is_waiting(self, task_id: str) -> bool:
+        return task_id in self.waiting
+
+    def finished_state(self, task_id: str):
+        """True if the task completed, False if it failed, None if unknown"""
+        return self.finished.get(task_id)
+
+    def add(self, task_id: str, task: Any, unmet: Iterable[str]) -> bool:
+        """Track a task waiting on unmet dependency ids; returns True if it is ready now"""
+        unmet = set(unmet)
+        if not unmet:
+            return True
+        self.waiting[task_id] = task
+        self.remaining[task_id] = unmet
+        for dependency_id in unmet:
+            self.dependents[dependency_id].add(task_id)
+        return False
+
+    def complete(self, task_id: str) -> List[Any]:
+        """Record a successful completion; returns dependents that became ready"""
+        self._remember(task_id, True)
+        ready = []
+        for dependent_id in self.dependents.pop(task_id, ()):
+            unmet = self.remaining.get(dependent_id)
+            if unmet is None:
+                continue
+            unmet.discard(task_id)
+            if not unmet:
+                del self.remaining[dependent_id]
+                ready.append(self.waiting.pop(dependent_id))
+        return ready
+
+    def fail(self, task_id: str) -> List[Any]:
+        """Record a permanent failure; returns every waiting task that can no longer run"""
+        self._remember(task_id, False)
+        blocked = []
+        pending = [task_id]
+        while pending:
+            for dependent_id in self.dependents.pop(pending.pop(), ()):
+                task = self.discard(dependent_id)
+                if task is not None:
+                    self._remember(dependent_id, False)
+                    blocked.append(task)
+                    pending.append(dependent_id)
+        return blocked
+
+    def discard(self, task_id: str):
+        """Stop tracking a waiting task, e.g. when it is cancelled; returns it if it was waiting"""
+        task = self.waiting.pop(task_id, None)
+        for dependency_id in self.remaining.pop(task_id, ()):
+            waiters = self.dependents.get(dependency_id)
+            if waiters is not None:
+                waiters.discard(task_id)
+                if not waiters:
+                    del self.dependents[dependency_id]
+        return task
+
+    def _remember(self, task_id: str, succeeded: bool):
+        self.finished[task_id] = succeeded
+        self.finished.move_to_end(task_id)
+        while len(self.finished) > self.remember_finished:
+            self.finished.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "waiting_tasks": len(self.waiting),
+            "tracked_dependencies": len(self.dependents),
+            "remembered_finished": len(self.finished)
+        }
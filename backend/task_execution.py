@@ -0,0 +1,230 @@
+"""
+AETHER Task Execution
+Runs task entry points on the event loop, a thread pool or a process pool
+according to a declared execution class, handing large payloads to worker
+processes through shared memory (or a temp file) instead of pickling them
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+from cache_codec import CacheCodec, CodecConfig
+
+try:
+    from multiprocessing import shared_memory
+    SHARED_MEMORY_AVAILABLE = True
+except ImportError:
+    SHARED_MEMORY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Encodes payloads crossing the process boundary; same format in every worker
+PAYLOAD_CODEC = CacheCodec(CodecConfig(compression="none"))
+
+class ExecutionClass(Enum):
+    EVENT_LOOP = "event_loop"  # coroutine or cheap sync code on the loop
+    THREAD = "thread"          # blocking I/O or GIL-releasing work
+    PROCESS = "process"        # CPU-bound Python that would hold the GIL
+
+@dataclass
+class PayloadRef:
+    """Where a worker process finds an encoded payload: a shared memory block or a file"""
+    kind: str  # "shm" or "file"
+    location: str
+    size: int
+
+def store_payload(data: bytes) -> PayloadRef:
+    """Place an encoded payload where a worker process can map or read it"""
+    if SHARED_MEMORY_AVAILABLE:
+        try:
+            block = shared_memory.SharedMemory(create=True, size=len(data))
+            block.buf[:len(data)] = data
+            ref = PayloadRef("shm", block.name, len(data))
+            block.close()
+            return ref
+        except OSError as e:
+            logger.warning(f"⚠️ Shared memory unavailable, passing payload by file: {e}")
+    fd, path = tempfile.mkstemp(prefix="aether-payload-")
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(data)
+    return PayloadRef("file", path, len(data))
+
+def load_payload(ref: PayloadRef) -> Any:
+    """Decode a stored payload; the owner releases it with release_payload"""
+    if ref.kind == "shm":
+        block = shared_memory.SharedMemory(name=ref.location)
+        try:
+            data = bytes(block.buf[:ref.size])
+        finally:
+            block.close()
+    else:
+        with open(ref.location, "rb") as handle:
+            data = handle.read()
+    return PAYLOAD_CODEC.decode(data)
+
+def release_payload(ref: PayloadRef):
+    try:
+        if ref.kind == "shm":
+            block = shared_memory.SharedMemory(name=ref.location)
+            block.close()
+            block.unlink()
+        else:
+            os.unlink(ref.location)
+    except (FileNotFoundError, OSError) as e:
+        logger.warning(f"⚠️ Could not release task payload {ref.location}: {e}")
+
+def run_entry_point(entry_point: Callable[[Dict[str, Any]], Any], params: Any) -> Any:
+    """Process-pool trampoline: resolve a payload reference, then call the entry point"""
+    if isinstance(params, PayloadRef):
+        params = load_payload(params)
+    return entry_point(params)
+
+@dataclass
+class ExecutorConfig:
+    """Pool sizes and the encoded size above which process payloads go through shared memory"""
+    max_threads: int = min(32, (os.cpu_count() or 1) + 4)
+    max_processes: int = max(1, (os.cpu_count() or 1) // 2)
+    inline_payload_bytes: int = 64 * 1024
+
+    @classmethod
+    def from_env(cls) -> "ExecutorConfig":
+        defaults = cls()
+        return cls(
+            max_threads=int(os.getenv("TASK_MAX_THREADS", str(defaults.max_threads))),
+            max_processes=int(os.getenv("TASK_MAX_PROCESSES", str(defaults.max_processes))),
+            inline_payload_bytes=int(os.getenv("TASK_INLINE_PAYLOAD_KB", "64")) * 1024
+        )
+
+class TaskExecutor:
+    """
+    Runs synchronous entry points according to their execution class.
+
+    PROCESS work goes to a spawn-context pool, so workers import only the
+    entry point's module rather than inheriting the server's loop, sockets
+    and threads. Parameters larger than inline_payload_bytes once encoded
+    are written to shared memory and the worker receives just a PayloadRef.
+
+    A cancelled PROCESS call (e.g. a task timeout) that a worker has already
+    picked up cannot be interrupted, so the pool is recycled: its workers are
+    terminated, a fresh pool takes new work, and other calls that were on
+    the old pool are resubmitted to the new one. A payload is released only
+    once the call using it has ended.
+    """
+
+    def __init__(self, config: ExecutorConfig = None):
+        self.config = config or ExecutorConfig.from_env()
+        self.thread_pool = ThreadPoolExecutor(max_workers=self.config.max_threads, thread_name_prefix="bg_task")
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._recycled_pools: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+
+        # Stats
+        self.stats = {
+            "runs_by_class": {execution_class.value: 0 for execution_class in ExecutionClass},
+            "payloads_by_reference": 0,
+            "payload_bytes_by_reference": 0,
+            "process_pool_restarts": 0,
+            "process_pool_recycles": 0,
+            "process_resubmits": 0
+        }
+
+    @property
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.config.max_processes,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_pool
+
+    async def run(self, entry_point: Callable[[Dict[str, Any]], Any], params: Dict[str, Any],
+                  execution_class: ExecutionClass) -> Any:
+        """Run entry_point(params) on the loop, a thread or a worker process"""
+        self.stats["runs_by_class"][execution_class.value] += 1
+
+        if execution_class == ExecutionClass.EVENT_LOOP:
+            return entry_point(params)
+
+        loop = asyncio.get_running_loop()
+        if execution_class == ExecutionClass.THREAD:
+            return await loop.run_in_executor(self.thread_pool, entry_point, params)
+
+        return await self._run_in_process(entry_point, params)
+
+    async def _run_in_process(self, entry_point: Callable[[Dict[str, Any]], Any], params: Dict[str, Any]) -> Any:
+        ref = self._reference_if_large(params)
+        release_on_exit = ref is not None
+        try:
+            while True:
+                pool = self.process_pool
+                future = None
+                try:
+                    future = pool.submit(run_entry_point, entry_point, ref or params)
+                    return await asyncio.wrap_future(future)
+                except BrokenProcessPool:
+                    if pool in self._recycled_pools:
+                        # Killed to stop another task's timed-out run, not by this call; run it again
+                        self.stats["process_resubmits"] += 1
+                        continue
+                    # A worker died (e.g. OOM-killed); start a fresh pool for the next task
+                    self._replace_pool(pool, "process_pool_restarts")
+                    raise
+                except asyncio.CancelledError:
+                    if future is not None and not future.cancel() and not future.done():
+                        # Already handed to a worker, which cannot be interrupted: stop it by
+                        # recycling the pool, and keep the payload until the call has ended
+                        self._replace_pool(pool, "process_pool_recycles", terminate=True)
+                        if ref is not None:
+                            release_on_exit = False
+                            future.add_done_callback(lambda _: release_payload(ref))
+                    raise
+        finally:
+            if release_on_exit:
+                release_payload(ref)
+
+    def _replace_pool(self, pool: ProcessPoolExecutor, stat: str, terminate: bool = False):
+        """Retire a pool so the next PROCESS task starts a fresh one"""
+        if self._process_pool is not pool:
+            return  # already replaced by another call
+        self.stats[stat] += 1
+        self._process_pool = None
+        if terminate:
+            self._recycled_pools.add(pool)
+            # ProcessPoolExecutor has no public way to stop a running call
+            for process in list((getattr(pool, "_processes", None) or {}).values()):
+                process.terminate()
+        pool.shutdown(wait=False)
+
+    def _reference_if_large(self, params: Dict[str, Any]) -> Optional[PayloadRef]:
+        # Cheap guard first: only payloads carrying bulk data are worth measuring
+        if not any(isinstance(value, (list, dict, str, bytes)) and len(value) > 256 for value in params.values()):
+            return None
+        data = PAYLOAD_CODEC.encode(params)
+        if len(data) <= self.config.inline_payload_bytes:
+            return None
+        ref = store_payload(data)
+        self.stats["payloads_by_reference"] += 1
+        self.stats["payload_bytes_by_reference"] += ref.size
+        return ref
+
+    def shutdown(self, wait: bool = True):
+        self.thread_pool.shutdown(wait=wait)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "max_threads": self.config.max_threads,
+            "max_processes": self.config.max_processes,
+            "process_pool_started": self._process_pool is not None,
+            "shared_memory": SHARED_MEMORY_AVAILABLE
+        }
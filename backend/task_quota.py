@@ -0,0 +1,91 @@
+"""
+AETHER Task Quota
+Cluster-wide counts of waiting background tasks per user and per priority,
+kept in Mongo so every node admits submissions against the same numbers
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+def user_key(user_session: str) -> str:
+    return f"user:{user_session}"
+
+def priority_key(priority: int) -> str:
+    return f"priority:{priority}"
+
+class TaskQuotaCounters:
+    """
+    One counter document per user and per priority holding the number of
+    tasks that are waiting (pending or retrying) anywhere in the cluster.
+
+    reserve() increments a counter only while it is below its limit, in a
+    single find_one_and_update: the filter carries the $lt guard and upsert
+    creates a missing counter, so a full counter fails the upsert with a
+    duplicate key instead of passing. Concurrent submits on any node
+    therefore cannot overshoot. Counters are moved by the processor on every
+    transition into or out of the waiting states, and reconcile() resets
+    them from the tasks themselves to repair drift left by a crashed node.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def _take(self, key: str, limit: Optional[int]) -> bool:
+        """Increment key unless it has reached limit; None means unlimited"""
+        if limit is None:
+            await self._add(key, 1)
+            return True
+        try:
+            await self.collection.find_one_and_update(
+                {"_id": key, "waiting": {"$lt": limit}},
+                {"$inc": {"waiting": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _add(self, key: str, amount: int):
+        await self.collection.update_one({"_id": key}, {"$inc": {"waiting": amount}}, upsert=True)
+
+    async def reserve(self, user_session: Optional[str], priority: int,
+                      user_limit: Optional[int], priority_limit: Optional[int]) -> Optional[str]:
+        """Count one more waiting task; "user" or "priority" names the full counter instead"""
+        if user_session is not None and not await self._take(user_key(user_session), user_limit):
+            return "user"
+        if not await self._take(priority_key(priority), priority_limit):
+            if user_session is not None:
+                await self._add(user_key(user_session), -1)
+            return "priority"
+        return None
+
+    async def add(self, user_session: Optional[str], priority: int, amount: int = 1):
+        """Move both counters of a task entering (1) or leaving (-1) the waiting states"""
+        if user_session is not None:
+            await self._add(user_key(user_session), amount)
+        await self._add(priority_key(priority), amount)
+
+    async def waiting(self, key: str) -> int:
+        doc = await self.collection.find_one({"_id": key})
+        return doc["waiting"] if doc else 0
+
+    async def reconcile(self, tasks_collection, waiting_statuses) -> Dict[str, Any]:
+        """Reset every counter to the number of waiting tasks it covers"""
+        counts: Dict[str, int] = {}
+        async for doc in tasks_collection.find(
+            {"status": {"$in": list(waiting_statuses)}}, {"_id": 0, "user_session": 1, "priority": 1}
+        ):
+            if doc.get("user_session") is not None:
+                counts[user_key(doc["user_session"])] = counts.get(user_key(doc["user_session"]), 0) + 1
+            counts[priority_key(doc["priority"])] = counts.get(priority_key(doc["priority"]), 0) + 1
+        async for doc in self.collection.find({}, {"_id": 1}):
+            counts.setdefault(doc["_id"], 0)
+        for key, waiting in counts.items():
+            await self.collection.update_one({"_id": key}, {"$set": {"waiting": waiting}}, upsert=True)
+        return counts
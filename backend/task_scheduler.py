@@ -0,0 +1,244 @@
+"""
+AETHER Task Scheduler
+Weighted-fair selection across task priorities, deficit round-robin across
+users within a priority, and per-type and per-user concurrency limits,
+feeding one shared worker pool
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, defaultdict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class _UserLane:
+    """Queued tasks of one user within one priority, with its round-robin deficit"""
+
+    __slots__ = ("tasks", "deficit")
+
+    def __init__(self):
+        self.tasks: Deque[Tuple[Any, float]] = deque()
+        self.deficit = 0.0
+
+class WeightedFairScheduler:
+    """
+    One ready queue per priority, drained by stride scheduling.
+
+    Every dispatch advances its priority's pass by 1/weight and the
+    non-empty priority with the smallest pass goes next, so under load each
+    priority gets dispatches in proportion to its weight: URGENT drains
+    fastest but LOW still makes progress. A priority that was idle rejoins
+    at the current virtual time rather than with banked credit.
+
+    Within a priority every user (task.user_session; None for system tasks)
+    has its own lane, served by deficit round-robin: a lane at the head of
+    the round gains user_quantum credit, spends one per dispatched task and
+    goes to the back once the credit is used up. One user with 500 queued
+    tasks therefore gets one turn per round, not the whole queue.
+
+    Tasks whose type or user is at its concurrency limit are skipped in
+    place until release() frees a slot. get() and put() wait on a
+    condition that is notified on every change, never on a timeout.
+    Tasks need `task_id`, `priority` (an Enum with int values), `task_type`
+    and `user_session`.
+    """
+
+    # Queued tasks inspected per lane when looking past type-limited ones
+    SCAN_LIMIT = 64
+
+    def __init__(self, priorities: Iterable[Any], weights: Optional[Dict[Any, float]] = None,
+                 max_queued: Optional[Dict[Any, int]] = None,
+                 type_limits: Optional[Dict[Any, int]] = None,
+                 user_running_limit: Optional[int] = None, user_quantum: int = 1):
+        priorities = list(priorities)
+        self.lanes: Dict[Any, "OrderedDict[Any, _UserLane]"] = {priority: OrderedDict() for priority in priorities}
+        self.sizes: Dict[Any, int] = {priority: 0 for priority in priorities}
+        self.weights = weights or {priority: float(2 ** (priority.value - 1)) for priority in priorities}
+        self.max_queued = max_queued or {}
+        self.type_limits = dict(type_limits or {})
+        self.user_running_limit = user_running_limit
+        self.user_quantum = user_quantum
+        self.running_by_type: Dict[Any, int] = defaultdict(int)
+        self.running_by_user: Dict[Any, int] = defaultdict(int)
+        self.queued_by_user: Dict[Any, int] = defaultdict(int)
+        self.reserved: Dict[Any, int] = defaultdict(int)  # room promised to put(reserved=True)
+        self.passes = {priority: 0.0 for priority in priorities}
+        self.virtual_time = 0.0
+        self._condition = asyncio.Condition()
+
+        # Stats
+        self.dispatched: Dict[Any, int] = defaultdict(int)
+        self.wait_seconds: Dict[Any, float] = defaultdict(float)
+        self.type_limit_skips = 0
+        self.user_limit_skips = 0
+
+    def has_room(self, priority: Any) -> bool:
+        limit = self.max_queued.get(priority)
+        return not limit or self.sizes[priority] + self.reserved[priority] < limit
+
+    def reserve(self, priority: Any) -> bool:
+        """Set aside room for a later put(reserved=True); False if the queue is full"""
+        if not self.has_room(priority):
+            return False
+        self.reserved[priority] += 1
+        return True
+
+    async def unreserve(self, priority: Any):
+        """Give back room reserved for a task that will not be put after all"""
+        async with self._condition:
+            self.reserved[priority] -= 1
+            self._condition.notify_all()
+
+    def queued_for(self, user: Any) -> int:
+        return self.queued_by_user.get(user, 0)
+
+    def running_for(self, user: Any) -> int:
+        return self.running_by_user.get(user, 0)
+
+    async def put(self, task: Any, reserved: bool = False, overflow: bool = False):
+        """
+        Queue a task, waiting while its priority's queue is full unless room
+        was reserved, or unless overflow allows it past max_queued
+        """
+        priority = task.priority
+        async with self._condition:
+            if reserved:
+                self.reserved[priority] -= 1
+            elif self.max_queued.get(priority) and not overflow:
+                await self._condition.wait_for(lambda: self.has_room(priority))
+            lanes = self.lanes[priority]
+            if not self.sizes[priority]:
+                self.passes[priority] = max(self.passes[priority], self.virtual_time)
+            lane = lanes.get(task.user_session)
+            if lane is None:
+                lane = lanes[task.user_session] = _UserLane()
+            lane.tasks.append((task, time.monotonic()))
+            self.sizes[priority] += 1
+            self.queued_by_user[task.user_session] += 1
+            self._condition.notify_all()
+
+    async def get(self) -> Any:
+        """Next task by weighted-fair order whose type and user have a free slot"""
+        async with self._condition:
+            while True:
+                task = self._pick()
+                if task is not None:
+                    self._condition.notify_all()  # room for blocked put() callers
+                    return task
+                await self._condition.wait()
+
+    async def release(self, task: Any):
+        """Return the type and user slots held by a task taken with get()"""
+        async with self._condition:
+            self.running_by_type[task.task_type] -= 1
+            self.running_by_user[task.user_session] -= 1
+            self._condition.notify_all()
+
+    async def discard(self, task_id: str) -> bool:
+        """Remove a queued task, e.g. when it is cancelled before it starts"""
+        async with self._condition:
+            for priority, lanes in self.lanes.items():
+                for user, lane in lanes.items():
+                    for index, (task, _) in enumerate(lane.tasks):
+                        if task.task_id == task_id:
+                            self._remove(priority, user, lane, index)
+                            self._condition.notify_all()
+                            return True
+        return False
+
+    def _remove(self, priority: Any, user: Any, lane: _UserLane, index: int):
+        del lane.tasks[index]
+        self.sizes[priority] -= 1
+        self.queued_by_user[user] -= 1
+        if not self.queued_by_user[user]:
+            del self.queued_by_user[user]
+        if not lane.tasks:
+            del self.lanes[priority][user]
+
+    def _user_blocked(self, user: Any) -> bool:
+        return (user is not None and self.user_running_limit is not None
+                and self.running_by_user[user] >= self.user_running_limit)
+
+    def _eligible(self, lane: _UserLane) -> Optional[int]:
+        """Index of the lane's first task whose type has a free slot"""
+        for index in range(min(len(lane.tasks), self.SCAN_LIMIT)):
+            task_type = lane.tasks[index][0].task_type
+            limit = self.type_limits.get(task_type)
+            if limit is not None and self.running_by_type[task_type] >= limit:
+                self.type_limit_skips += 1
+                continue
+            return index
+        return None
+
+    def _pick_lane(self, priority: Any) -> Optional[Any]:
+        """Deficit round-robin over the users queued at one priority"""
+        lanes = self.lanes[priority]
+        for _ in range(len(lanes)):
+            user, lane = next(iter(lanes.items()))
+            if lane.deficit < 1:
+                lane.deficit += self.user_quantum
+            if self._user_blocked(user):
+                self.user_limit_skips += 1
+                index = None
+            else:
+                index = self._eligible(lane)
+            if index is None:
+                # Blocked lanes keep at most one turn of credit while they wait
+                lane.deficit = min(lane.deficit, self.user_quantum)
+                lanes.move_to_end(user)
+                continue
+
+            task, queued_at = lane.tasks[index]
+            lane.deficit -= 1
+            self._remove(priority, user, lane, index)
+            if user in lanes and lane.deficit < 1:
+                lanes.move_to_end(user)
+            self.wait_seconds[priority] += time.monotonic() - queued_at
+            return task
+        return None
+
+    def _pick(self) -> Optional[Any]:
+        candidates = sorted(
+            (priority for priority, size in self.sizes.items() if size),
+            key=lambda priority: (self.passes[priority], -priority.value)
+        )
+        for priority in candidates:
+            task = self._pick_lane(priority)
+            if task is not None:
+                self.virtual_time = self.passes[priority]
+                self.passes[priority] += 1.0 / self.weights[priority]
+                self.running_by_type[task.task_type] += 1
+                self.running_by_user[task.user_session] += 1
+                self.dispatched[priority] += 1
+                return task
+        return None
+
+    def queue_sizes(self) -> Dict[str, int]:
+        return {priority.name: size for priority, size in self.sizes.items()}
+
+    def busiest_users(self, limit: int = 5) -> List[Tuple[Any, int]]:
+        return sorted(self.queued_by_user.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queue_sizes": self.queue_sizes(),
+            "dispatched": {priority.name: count for priority, count in self.dispatched.items()},
+            "average_wait_seconds": {
+                priority.name: self.wait_seconds[priority] / count
+                for priority, count in self.dispatched.items() if count
+            },
+            "running_by_type": {
+                getattr(task_type, "value", task_type): count
+                for task_type, count in self.running_by_type.items() if count
+            },
+            "type_limits": {getattr(task_type, "value", task_type): limit
+                            for task_type, limit in self.type_limits.items()},
+            "type_limit_skips": self.type_limit_skips,
+            "queued_users": len(self.queued_by_user),
+            "running_users": sum(1 for count in self.running_by_user.values() if count),
+            "busiest_users": dict(self.busiest_users()),
+            "user_running_limit": self.user_running_limit,
+            "user_limit_skips": self.user_limit_skips
+        }
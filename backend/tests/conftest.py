@@ -0,0 +1,52 @@
+"""
+Shared fixtures: the backend modules on sys.path, a processor backed by an
+in-memory Mongo and caches that never reach a real Redis
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Motor connects lazily; every test swaps in mongomock before touching a collection
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("TASK_BROKER", "local")
+
+@pytest.fixture
+def mongo():
+    from mongomock_motor import AsyncMongoMockClient
+    return AsyncMongoMockClient().aether_browser
+
+@pytest.fixture
+def make_processor(mongo):
+    """Factory for processors that read and write the in-memory database"""
+    from background_task_processor import BackgroundTaskProcessor
+
+    processors = []
+
+    def make(**kwargs):
+        processor = BackgroundTaskProcessor(**kwargs)
+        processor.tasks_collection = mongo.background_tasks
+        processor.task_logs = mongo.task_execution_logs
+        processor.quota.collection = mongo.task_quota_counters
+        processors.append(processor)
+        return processor
+
+    yield make
+    for processor in processors:
+        processor.executor.shutdown(wait=False)
+
+@pytest.fixture
+def make_cache():
+    """Factory for AdvancedCacheSystem instances on a fake Redis, or memory-only without one"""
+    from cache_system import AdvancedCacheSystem, CacheConfig
+
+    def make(redis=None, **config):
+        cache = AdvancedCacheSystem(CacheConfig(**config))
+        cache.redis_client = redis
+        cache.redis_available = redis is not None
+        return cache
+
+    return make
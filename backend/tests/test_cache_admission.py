@@ -0,0 +1,99 @@
+"""Byte budgets of the memory tiers and TinyLFU admission into L3"""
+
+import hashlib
+import time
+
+from cache_system import CacheShard, _key_hash
+
+VALUE = b"x" * 100  # 164 bytes once the per-entry overhead is counted
+
+def key(name):
+    return f"aether:test:{hashlib.md5(name.encode()).hexdigest()}"
+
+def tier_of(shard, cache_key):
+    return next((tier.name for tier in shard.tiers if cache_key in tier.entries), None)
+
+def warm(shard, cache_key, times=20):
+    for _ in range(times):
+        shard.lookup(cache_key, time.time())
+
+def test_overflowing_entries_are_demoted_one_tier_at_a_time():
+    shard = CacheShard(300, 300, 1000)
+    expiry = time.time() + 60
+    for name in ("a", "b", "c"):
+        shard.insert(key(name), VALUE, expiry, level=0)
+
+    assert [tier_of(shard, key(name)) for name in ("a", "b", "c")] == ["l3", "l2", "l1"]
+    assert all(tier.bytes <= tier.max_bytes for tier in shard.tiers)
+    assert shard.evictions == {"l1": 2, "l2": 1}
+
+def test_expired_entries_are_dropped_instead_of_demoted():
+    shard = CacheShard(300, 300, 1000)
+    shard.insert(key("old"), VALUE, time.time() - 1, level=0)
+    shard.insert(key("new"), VALUE, time.time() + 60, level=0)
+    assert tier_of(shard, key("old")) is None
+
+def test_values_skip_tiers_they_do_not_fit_and_oversized_ones_are_refused():
+    shard = CacheShard(100, 300, 1000)
+    assert shard.insert(key("mid"), VALUE, time.time() + 60, level=0)
+    assert tier_of(shard, key("mid")) == "l2"
+
+    assert not shard.insert(key("huge"), b"x" * 2000, time.time() + 60, level=0)
+    assert tier_of(shard, key("huge")) is None
+    assert shard.admissions["oversize"] == 1
+
+def test_hits_are_promoted_only_into_tiers_they_fit():
+    shard = CacheShard(100, 300, 1000)
+    shard.insert(key("small"), b"x", time.time() + 60)
+    shard.insert(key("large"), VALUE, time.time() + 60)
+
+    shard.lookup(key("small"), time.time())
+    shard.lookup(key("large"), time.time())
+    assert tier_of(shard, key("small")) == "l2"
+    assert tier_of(shard, key("large")) == "l2"
+
+    shard.lookup(key("small"), time.time())
+    shard.lookup(key("large"), time.time())
+    assert tier_of(shard, key("small")) == "l1"
+    assert tier_of(shard, key("large")) == "l2"  # larger than the whole L1 budget
+
+def test_full_l3_admits_a_newcomer_only_if_it_is_as_popular_as_the_victim():
+    shard = CacheShard(1, 1, 400)
+    expiry = time.time() + 60
+    for name in ("hot-a", "hot-b"):
+        shard.insert(key(name), VALUE, expiry)
+        warm(shard, key(name))
+
+    # A one-off key cannot flush the hot ones
+    assert not shard.insert(key("scan"), VALUE, expiry)
+    assert tier_of(shard, key("scan")) is None
+    assert shard.admissions["rejected"] == 1
+
+    # Once it has been asked for often enough it replaces the LRU entry
+    warm(shard, key("scan"))
+    assert shard.insert(key("scan"), VALUE, expiry)
+    assert tier_of(shard, key("scan")) == "l3"
+    assert tier_of(shard, key("hot-a")) is None and tier_of(shard, key("hot-b")) == "l3"
+
+def test_admission_can_be_bypassed():
+    shard = CacheShard(1, 1, 400)
+    expiry = time.time() + 60
+    for name in ("hot-a", "hot-b"):
+        shard.insert(key(name), VALUE, expiry)
+        warm(shard, key(name))
+
+    assert shard.insert(key("restored"), VALUE, expiry, admit=False)
+    assert tier_of(shard, key("restored")) == "l3"
+
+def test_sketch_counts_decay():
+    shard = CacheShard(1, 1, 400, sketch_width=16)
+    sketch = shard.sketch
+    hot = _key_hash(key("hot"))
+    for _ in range(15):
+        sketch.increment(hot)
+    assert sketch.estimate(hot) == 15
+
+    for n in range(sketch.reset_after):
+        sketch.increment(n)
+    assert sketch.resets >= 1
+    assert sketch.estimate(hot) < 15
@@ -0,0 +1,63 @@
+"""Payload header, compression round-trips and value types of the cache codec"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+from cache_codec import COMPRESSIONS, SERIALIZERS, ZSTD_AVAILABLE, CacheCodec, CodecConfig
+
+VALUE = {"url": "https://example.com", "items": [{"rank": n, "title": f"result {n}"} for n in range(200)]}
+
+def codec(serializer="msgpack", compression="none", compress_min_bytes=1024):
+    return CacheCodec(CodecConfig(serializer=serializer, compression=compression,
+                                  compress_min_bytes=compress_min_bytes))
+
+def header(payload):
+    return payload[0] >> 4, payload[0] & 0x0F
+
+@pytest.mark.parametrize("serializer", ["msgpack", "json"])
+def test_small_values_are_not_compressed(serializer):
+    payload = codec(serializer, "zlib").encode({"n": 1})
+    assert header(payload) == (SERIALIZERS[serializer], COMPRESSIONS["none"])
+    assert codec(serializer).decode(payload) == {"n": 1}
+
+@pytest.mark.parametrize("compression", [
+    "zlib",
+    pytest.param("zstd", marks=pytest.mark.skipif(not ZSTD_AVAILABLE, reason="zstandard not installed"))
+])
+def test_large_values_round_trip_compressed(compression):
+    plain = codec().encode(VALUE)
+    payload = codec(compression=compression).encode(VALUE)
+    assert header(payload) == (SERIALIZERS["msgpack"], COMPRESSIONS[compression])
+    assert len(payload) < len(plain)
+    assert codec(compression=compression).decode(payload) == VALUE
+
+def test_compression_is_dropped_when_it_does_not_shrink_the_payload():
+    payload = codec(compression="zlib", compress_min_bytes=16).encode(os.urandom(4096))
+    assert header(payload)[1] == COMPRESSIONS["none"]
+
+def test_any_codec_decodes_what_another_configuration_wrote():
+    payload = codec("json", "zlib").encode(VALUE)
+    assert codec("msgpack", "none").decode(payload) == VALUE
+
+def test_datetimes_come_back_as_iso_strings():
+    # Intended: values stay JSON-shaped whatever the serializer, as they did
+    # when the cache stored json.dumps(value, default=str); callers that
+    # need a datetime back parse it themselves
+    value = {"at": datetime(2024, 5, 1, 12, 30), "tags": ("a", "b")}
+    for serializer in SERIALIZERS:
+        assert codec(serializer).decode(codec(serializer).encode(value)) == \
+            {"at": "2024-05-01T12:30:00", "tags": ["a", "b"]}
+
+def test_msgpack_keeps_bytes_and_non_string_keys():
+    value = {"raw": b"\x00\xff", 1: "one"}
+    assert codec("msgpack").decode(codec("msgpack").encode(value)) == value
+
+def test_bad_payloads_and_configurations_are_rejected():
+    with pytest.raises(ValueError):
+        codec().decode(b"")
+    with pytest.raises(ValueError):
+        codec(serializer="pickle")
+    with pytest.raises(ValueError):
+        codec(compression="brotli")
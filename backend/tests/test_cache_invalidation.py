@@ -0,0 +1,255 @@
+"""Namespace and tag invalidation through Redis index sets, with the SCAN fallback"""
+
+import asyncio
+import re
+
+import pytest
+import redis
+import redis.asyncio as aioredis
+
+from cache_manager import CacheManager
+
+def glob_regex(pattern):
+    """Redis MATCH glob, where a backslash escapes the next character"""
+    parts, index = [], 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == "\\" and index + 1 < len(pattern):
+            index += 1
+            parts.append(re.escape(pattern[index]))
+        elif char == "*":
+            parts.append(".*")
+        elif char == "?":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    return re.compile("".join(parts) + r"\Z")
+
+class FakeRedis:
+    """The handful of Redis commands the caches use, over plain dicts; replies are bytes like the real client"""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+        self.scans = 0
+
+    @staticmethod
+    def _key(key):
+        return key.decode() if isinstance(key, bytes) else key
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        return self.values.get(self._key(key))
+
+    def pttl(self, key):
+        return 60000 if self._key(key) in self.values else -2
+
+    def setex(self, key, ttl, value):
+        self.values[self._key(key)] = value
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(self._key(key), set()).update(self._key(member) for member in members)
+
+    def expire(self, key, ttl):
+        pass
+
+    def exists(self, key):
+        return int(self._key(key) in self.values or self._key(key) in self.sets)
+
+    def srem(self, key, *members):
+        self.sets.get(self._key(key), set()).difference_update(self._key(member) for member in members)
+
+    def rename(self, key, new_key):
+        if self._key(key) not in self.sets:
+            raise self.error("ERR no such key")
+        self.sets[self._key(new_key)] = self.sets.pop(self._key(key))
+
+    def sscan(self, key, cursor=0, count=10):
+        members = sorted(self.sets.get(self._key(key), ()))
+        batch = members[cursor:cursor + count]
+        next_cursor = cursor + count if cursor + count < len(members) else 0
+        return next_cursor, [member.encode() for member in batch]
+
+    def sscan_iter(self, key, count=10):
+        return iter([member.encode() for member in sorted(self.sets.get(self._key(key), ()))])
+
+    def unlink(self, *keys):
+        removed = 0
+        for key in map(self._key, keys):
+            removed += (self.values.pop(key, None) is not None) + (self.sets.pop(key, None) is not None)
+        return removed
+
+    delete = unlink
+
+    def _matching(self, match):
+        self.scans += 1
+        regex = glob_regex(match)
+        return [key.encode() for key in list(self.values) + list(self.sets) if regex.match(key)]
+
+    def scan_iter(self, match="*", count=10):
+        return iter(self._matching(match))
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    def close(self):
+        pass
+
+    error = redis.ResponseError
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+class AsyncFakeRedis(FakeRedis):
+    """The same store behind the asyncio client's awaitable interface"""
+
+    error = aioredis.ResponseError
+
+    def __getattribute__(self, name):
+        attribute = super().__getattribute__(name)
+        if name in ("ping", "get", "pttl", "rename", "sscan", "unlink", "delete", "srem", "close"):
+            async def call(*args, **kwargs):
+                return attribute(*args, **kwargs)
+            return call
+        return attribute
+
+    async def scan_iter(self, match="*", count=10):
+        for key in self._matching(match):
+            yield key
+
+    def pipeline(self, transaction=False):
+        pipe = FakePipeline(self)
+        run = pipe.execute
+
+        async def execute():
+            return [await result if asyncio.iscoroutine(result) else result for result in run()]
+        pipe.__dict__["execute"] = execute
+        return pipe
+
+@pytest.fixture
+def fake_redis():
+    return AsyncFakeRedis()
+
+def test_clearing_a_namespace_unlinks_its_index_without_scanning(make_cache, fake_redis):
+    async def scenario():
+        cache = make_cache(redis=fake_redis)
+        for n in range(3):
+            await cache.set(f"key-{n}", n, namespace="drop")
+        await cache.set("key-0", 0, namespace="keep")
+        cleared = await cache.clear_namespace("drop")
+        await cache.close()
+        return cleared
+
+    assert asyncio.run(scenario()) == 6  # three memory copies and three Redis keys
+    assert fake_redis.scans == 0
+    assert [key.split(":")[1] for key in fake_redis.values] == ["keep"]
+    assert "aether-idx:ns:drop" not in fake_redis.sets
+    assert not any(":draining:" in key for key in fake_redis.sets)
+
+def test_unindexed_namespace_falls_back_to_scan(make_cache, fake_redis):
+    # Written before index sets existed
+    fake_redis.values.update({"aether:legacy:aa": b"", "aether:legacy:bb": b"", "aether:other:cc": b""})
+
+    async def scenario(scan_fallback):
+        cache = make_cache(redis=fake_redis)
+        cleared = await cache.clear_namespace("legacy", scan_fallback=scan_fallback)
+        await cache.close()
+        return cleared
+
+    assert asyncio.run(scenario(False)) == 0
+    assert asyncio.run(scenario(True)) == 2
+    assert list(fake_redis.values) == ["aether:other:cc"]
+
+def test_scan_pattern_escapes_glob_characters(make_cache, fake_redis):
+    fake_redis.values.update({"aether:a*:aa": b"", "aether:ab:bb": b""})
+
+    async def scenario():
+        cache = make_cache(redis=fake_redis)
+        await cache.clear_namespace("a*")
+        await cache.close()
+
+    asyncio.run(scenario())
+    assert list(fake_redis.values) == ["aether:ab:bb"]
+
+def test_tag_invalidation_drops_copies_other_nodes_filled_from_redis(make_cache, fake_redis):
+    async def scenario():
+        writer = make_cache(redis=fake_redis)
+        reader = make_cache(redis=fake_redis)
+        await writer.set("profile", {"v": 1}, namespace="users", tags=["user:1"])
+        await writer.set("other", {"v": 2}, namespace="users", tags=["user:2"])
+
+        # The reader's L3 copy came from Redis and carries no tags
+        assert await reader.get("profile", namespace="users") == {"v": 1}
+        cleared = await reader.invalidate_tag("user:1")
+        after = await reader.get("profile", namespace="users"), await reader.get("other", namespace="users")
+        await writer.close()
+        await reader.close()
+        return cleared, after
+
+    cleared, after = asyncio.run(scenario())
+    assert cleared == 1
+    assert after == (None, {"v": 2})
+    assert "aether-idx:tag:user:1" not in fake_redis.sets
+
+def test_pruning_drops_index_members_whose_keys_expired(make_cache, fake_redis):
+    async def scenario():
+        cache = make_cache(redis=fake_redis)
+        await cache.set("live", 1, namespace="ns")
+        await cache.set("gone", 2, namespace="ns")
+        del fake_redis.values[cache._generate_cache_key("gone", "ns")]
+        await cache._prune_indexes()
+        await cache.close()
+        return cache._generate_cache_key("live", "ns")
+
+    live = asyncio.run(scenario())
+    assert fake_redis.sets["aether-idx:ns:ns"] == {live}
+
+@pytest.fixture
+def manager():
+    manager = CacheManager()
+    manager.redis_client = FakeRedis()
+    manager.redis_available = True
+    return manager
+
+def test_manager_clears_prefixes_and_tags_through_index_sets(manager):
+    async def scenario():
+        await manager.cache_ai_response("q1", "ctx", "answer", "provider", user_id="u1")
+        await manager.cache_ai_response("q2", "ctx", "answer", "provider", user_id="u2")
+        await manager.cache_recommendations("pattern", [{"id": 1}])
+        removed_user = await manager.clear_user_ai_responses("u1")
+        removed_ai = await manager.clear_namespace("ai")
+        return removed_user, removed_ai
+
+    assert asyncio.run(scenario()) == (1, 1)
+    assert [key.split(":")[0] for key in manager.redis_client.values] == ["rec"]
+    assert manager.redis_client.scans == 0
+
+def test_manager_scans_a_prefix_without_an_index(manager):
+    manager.redis_client.values.update({"page:aa": b"", "page:bb": b"", "ai:cc": b""})
+    assert asyncio.run(manager.clear_namespace("page")) == 2
+    assert list(manager.redis_client.values) == ["ai:cc"]
+
+def test_manager_memory_fallback_honours_tags_and_prefixes():
+    manager = CacheManager()
+    manager.redis_available = False
+    manager.memory_cache = {}
+
+    async def scenario():
+        await manager.set("ai:1", "a", tags=["ai-user:u1"])
+        await manager.set("ai:2", "b", tags=["ai-user:u2"])
+        await manager.set("page:1", "c")
+        return await manager.invalidate_tag("ai-user:u1"), await manager.clear_namespace("page")
+
+    assert asyncio.run(scenario()) == (1, 1)
+    assert list(manager.memory_cache) == ["ai:2"]
@@ -0,0 +1,78 @@
+"""Hash striping of the memory tiers over independently locked shards"""
+
+import asyncio
+import threading
+import time
+
+from cache_system import MB
+
+def test_keys_spread_over_every_shard_and_stay_on_theirs(make_cache):
+    cache = make_cache(shard_count=8)
+    cache_keys = [cache._generate_cache_key(f"key-{n}", "spread") for n in range(400)]
+
+    owners = [cache._shard_for(cache_key) for cache_key in cache_keys]
+    assert {id(shard) for shard in owners} == {id(shard) for shard in cache.shards}
+    assert owners == [cache._shard_for(cache_key) for cache_key in cache_keys]
+
+def test_tier_budgets_are_split_between_shards(make_cache):
+    cache = make_cache(shard_count=4, l1_max_bytes=4 * MB, l2_max_bytes=8 * MB, l3_max_bytes=16 * MB)
+    for shard in cache.shards:
+        assert [tier.max_bytes for tier in shard.tiers] == [MB, 2 * MB, 4 * MB]
+
+def test_values_are_served_from_their_shard(make_cache):
+    async def scenario():
+        cache = make_cache(shard_count=4)
+        for n in range(50):
+            await cache.set(f"key-{n}", {"n": n}, namespace="served")
+        values = [await cache.get(f"key-{n}", namespace="served") for n in range(50)]
+        stats = cache.get_stats()
+        await cache.close()
+        return values, stats
+
+    values, stats = asyncio.run(scenario())
+    assert values == [{"n": n} for n in range(50)]
+    assert stats["shards"] == 4
+    assert stats["memory_usage"]["keys_by_namespace"] == {"served": 50}
+    assert sum(stats["hits_by_tier"].values()) == 50
+
+def test_concurrent_threads_keep_shard_accounting_consistent(make_cache):
+    cache = make_cache(shard_count=4, l1_max_bytes=64 * 1024, l2_max_bytes=64 * 1024, l3_max_bytes=64 * 1024)
+    expiry = time.time() + 60
+
+    def worker(offset):
+        for n in range(300):
+            cache_key = cache._generate_cache_key(f"key-{(offset + n) % 500}", "threads")
+            shard = cache._shard_for(cache_key)
+            with shard.lock:
+                if n % 3:
+                    shard.insert(cache_key, b"x" * 200, expiry, level=n % 3, admit=False)
+                else:
+                    shard.lookup(cache_key, time.time())
+
+    threads = [threading.Thread(target=worker, args=(offset * 125,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for shard in cache.shards:
+        resident = [key for tier in shard.tiers for key in tier.entries]
+        assert len(resident) == len(set(resident))  # each key in exactly one tier
+        for tier in shard.tiers:
+            assert tier.bytes == sum(entry[2] for entry in tier.entries.values())
+        assert shard.namespace_keys.get("threads", 0) == len(resident)
+
+def test_clearing_a_namespace_reaches_every_shard(make_cache):
+    async def scenario():
+        cache = make_cache(shard_count=8)
+        for n in range(40):
+            await cache.set(f"key-{n}", n, namespace="drop")
+            await cache.set(f"key-{n}", n, namespace="keep")
+        cleared = await cache.clear_namespace("drop")
+        stats = cache.get_stats()
+        await cache.close()
+        return cleared, stats
+
+    cleared, stats = asyncio.run(scenario())
+    assert cleared == 40
+    assert stats["memory_usage"]["keys_by_namespace"] == {"keep": 40}
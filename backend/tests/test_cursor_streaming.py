@@ -0,0 +1,89 @@
+"""Page tokens, keyset filtering and paging across page boundaries"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from cursor_streaming import decode_cursor, encode_cursor, fetch_page, keyset_filter, stream_csv, stream_jsonl
+
+def test_cursor_round_trips():
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    doc_id = ObjectId()
+    assert decode_cursor(encode_cursor(timestamp, doc_id)) == (timestamp, doc_id)
+
+def test_malformed_cursor_is_a_value_error():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_keyset_filter_breaks_timestamp_ties_on_id(mongo):
+    async def scenario():
+        timestamp = datetime(2024, 1, 1)
+        ids = [ObjectId() for _ in range(3)]
+        await mongo.entries.insert_many(
+            [{"_id": doc_id, "session_id": "s", "timestamp": timestamp} for doc_id in ids]
+            + [{"_id": ObjectId(), "session_id": "s", "timestamp": timestamp - timedelta(seconds=1)},
+               {"_id": ObjectId(), "session_id": "other", "timestamp": timestamp - timedelta(seconds=1)}]
+        )
+        query = keyset_filter({"session_id": "s"}, "timestamp", encode_cursor(timestamp, ids[1]))
+        return ids, await mongo.entries.find(query).to_list(None)
+
+    ids, after = asyncio.run(scenario())
+    # The older tied entry and the strictly older one; never the cursor itself or the newer tie
+    assert {doc["_id"] for doc in after if doc["timestamp"] == datetime(2024, 1, 1)} == {ids[0]}
+    assert len(after) == 2 and all(doc["session_id"] == "s" for doc in after)
+
+def test_keyset_filter_without_cursor_keeps_the_query():
+    assert keyset_filter({"session_id": "s"}, "timestamp", None) == {"session_id": "s"}
+
+def test_fetch_page_walks_every_entry_once_across_pages(mongo):
+    async def scenario():
+        base = datetime(2024, 1, 1)
+        # Pairs share a timestamp so page boundaries fall inside ties
+        await mongo.entries.insert_many(
+            [{"n": n, "timestamp": base + timedelta(minutes=n // 2)} for n in range(7)]
+        )
+        pages, cursor = [], None
+        while True:
+            page, cursor = await fetch_page(mongo.entries, {}, {"n": 1, "timestamp": 1}, limit=3, cursor=cursor)
+            pages.append(page)
+            if cursor is None:
+                return pages
+
+    pages = asyncio.run(scenario())
+    assert [len(page) for page in pages] == [3, 3, 1]
+    seen = [doc["n"] for page in pages for doc in page]
+    assert sorted(seen) == list(range(7))
+    assert [doc["timestamp"] for page in pages for doc in page] == sorted(
+        (doc["timestamp"] for page in pages for doc in page), reverse=True
+    )
+    assert all("_id" not in doc for page in pages for doc in page)
+
+def test_exact_last_page_has_no_next_cursor(mongo):
+    async def scenario():
+        await mongo.entries.insert_many([{"timestamp": datetime(2024, 1, 1, 0, n)} for n in range(3)])
+        return await fetch_page(mongo.entries, {}, limit=3)
+
+    page, cursor = asyncio.run(scenario())
+    assert len(page) == 3 and cursor is None
+
+def test_encoders_chunk_rows():
+    async def documents():
+        for n in range(5):
+            yield {"_id": ObjectId(), "n": n, "at": datetime(2024, 1, 1)}
+
+    async def rows():
+        for n in range(5):
+            yield [n, f"row {n}"]
+
+    async def collect(chunks):
+        return [chunk async for chunk in chunks]
+
+    lines = asyncio.run(collect(stream_jsonl(documents(), rows_per_chunk=2)))
+    assert [chunk.count("\n") for chunk in lines] == [2, 2, 1]
+    assert '"at": "2024-01-01T00:00:00"' in lines[0] and "_id" not in "".join(lines)
+
+    csv_chunks = asyncio.run(collect(stream_csv(rows(), ["n", "label"], rows_per_chunk=2)))
+    assert "".join(csv_chunks).splitlines()[:2] == ['"n","label"', '"0","row 0"']
+    assert len(csv_chunks) == 3
@@ -0,0 +1,60 @@
+"""Coalescing and cancellation semantics of SingleFlight"""
+
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+def test_concurrent_callers_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(flight.do("key", compute) for _ in range(5)))
+        assert results == ["value"] * 5 and calls == 1
+        assert flight.get_stats()['coalesced'] == 4 and not flight.in_flight("key")
+
+    asyncio.run(scenario())
+
+def test_cancelling_the_first_caller_does_not_cancel_the_waiters():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return "value"
+
+        leader = asyncio.create_task(flight.do("key", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("key", compute))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        release.set()
+        assert await waiter == "value"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(scenario())
+
+def test_errors_reach_every_caller():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(flight.do("key", compute) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.get_stats()['errors'] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,88 @@
+"""Delivery semantics of InMemoryBroker: visibility timeout, redelivery and weighted claims"""
+
+import asyncio
+from collections import Counter
+
+import pytest
+
+from task_broker import BrokerConfig, InMemoryBroker, create_broker
+
+def make_broker(visibility_timeout=60):
+    return InMemoryBroker(BrokerConfig(backend="memory", visibility_timeout=visibility_timeout, block_ms=20))
+
+def test_unacked_message_is_redelivered_after_the_visibility_timeout():
+    async def scenario():
+        broker = make_broker(visibility_timeout=0.05)
+        await broker.publish("task", 2)
+        [first] = await broker.claim("node-a", 10)
+        assert await broker.claim("node-b", 10) == []
+
+        await asyncio.sleep(0.06)
+        [again] = await broker.claim("node-b", 10)
+        assert again.task_id == "task" and again.message_id == first.message_id
+        assert broker.get_stats()["redelivered"] == 1
+
+    asyncio.run(scenario())
+
+def test_extend_keeps_a_held_message_invisible():
+    async def scenario():
+        broker = make_broker(visibility_timeout=0.05)
+        await broker.publish("task", 2)
+        held = await broker.claim("node-a", 1)
+        for _ in range(3):
+            await asyncio.sleep(0.03)
+            await broker.extend("node-a", held)
+            assert await broker.claim("node-b", 1) == []
+        # Another consumer cannot extend a delivery it does not hold
+        await broker.extend("node-b", held)
+        await asyncio.sleep(0.06)
+        assert [message.task_id for message in await broker.claim("node-b", 1)] == ["task"]
+
+    asyncio.run(scenario())
+
+def test_acked_message_is_never_redelivered():
+    async def scenario():
+        broker = make_broker(visibility_timeout=0.01)
+        await broker.publish("task", 2)
+        [message] = await broker.claim("node-a", 1)
+        await broker.ack(message)
+        await asyncio.sleep(0.02)
+        assert await broker.claim("node-b", 1) == []
+        assert broker.get_stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+def test_claims_are_weighted_across_priorities():
+    async def scenario():
+        broker = make_broker()
+        for priority in range(1, 6):
+            for index in range(100):
+                await broker.publish(f"{priority}-{index}", priority)
+        one_at_a_time = Counter()
+        for _ in range(31):
+            one_at_a_time.update(message.priority for message in await broker.claim("node", 1))
+        batched = Counter(message.priority for message in await broker.claim("node", 31))
+        return one_at_a_time, batched
+
+    one_at_a_time, batched = asyncio.run(scenario())
+    expected = {5: 16, 4: 8, 3: 4, 2: 2, 1: 1}
+    assert one_at_a_time == expected
+    assert batched == expected
+
+def test_claim_fills_up_from_other_priorities():
+    async def scenario():
+        broker = make_broker()
+        for index in range(10):
+            await broker.publish(f"low-{index}", 1)
+        await broker.publish("urgent", 5)
+        return await broker.claim("node", 8)
+
+    claimed = asyncio.run(scenario())
+    assert len(claimed) == 8
+    assert claimed[0].task_id == "urgent"
+
+def test_create_broker_by_backend():
+    assert create_broker(BrokerConfig(backend="local")) is None
+    assert isinstance(create_broker(BrokerConfig(backend="memory")), InMemoryBroker)
+    with pytest.raises(ValueError):
+        create_broker(BrokerConfig(backend="carrier-pigeon"))
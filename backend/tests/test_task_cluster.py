@@ -0,0 +1,253 @@
+"""Cluster mode: atomic claims, lease reclaim, owned writes, shutdown and cluster-wide quotas"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import background_task_processor
+from background_task_processor import TaskPriority, TaskQuotaExceeded, TaskStatus, TaskType
+from task_broker import BrokerConfig, InMemoryBroker
+
+@pytest.fixture(autouse=True)
+def no_execution_logs(monkeypatch):
+    async def discard(*args, **kwargs):
+        pass
+    monkeypatch.setattr(background_task_processor.write_behind, "insert", discard)
+    monkeypatch.setattr(background_task_processor.write_behind, "flush", discard)
+
+@pytest.fixture
+def broker():
+    return InMemoryBroker(BrokerConfig(backend="memory", block_ms=20))
+
+def with_handler(processor, handler):
+    processor.task_handlers[TaskType.AI_PROCESSING] = handler
+    return processor
+
+async def load(processor, mongo, task_id):
+    return processor._task_from_doc(await mongo.background_tasks.find_one({"task_id": task_id}))
+
+def test_only_one_node_claims_a_task(make_processor, mongo, broker):
+    runs = []
+
+    async def handler(task):
+        runs.append(task.task_id)
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    async def scenario():
+        node_a = with_handler(make_processor(broker=broker), handler)
+        node_b = with_handler(make_processor(broker=broker), handler)
+        task_id = await node_a.submit_task(TaskType.AI_PROCESSING, {})
+
+        await asyncio.gather(
+            node_a._execute_task(await load(node_a, mongo, task_id), "worker_0"),
+            node_b._execute_task(await load(node_b, mongo, task_id), "worker_0")
+        )
+        doc = await mongo.background_tasks.find_one({"task_id": task_id})
+        return doc, node_a.stats["claim_conflicts"] + node_b.stats["claim_conflicts"], node_a.node_id
+
+    doc, conflicts, node_a_id = asyncio.run(scenario())
+    assert len(runs) == 1
+    assert conflicts == 1
+    assert doc["status"] == TaskStatus.COMPLETED.value
+    assert doc["claimed_by"] == node_a_id
+
+def test_claim_waits_for_the_retry_schedule(make_processor, mongo, broker):
+    async def scenario():
+        processor = with_handler(make_processor(broker=broker), lambda task: asyncio.sleep(0))
+        task_id = await processor.submit_task(TaskType.AI_PROCESSING, {})
+        await mongo.background_tasks.update_one(
+            {"task_id": task_id},
+            {"$set": {"status": TaskStatus.RETRYING.value,
+                      "scheduled_at": datetime.utcnow() + timedelta(minutes=5)}}
+        )
+        await processor._execute_task(await load(processor, mongo, task_id), "worker_0")
+        return processor.stats["claim_conflicts"], await mongo.background_tasks.find_one({"task_id": task_id})
+
+    conflicts, doc = asyncio.run(scenario())
+    assert conflicts == 1
+    assert doc["status"] == TaskStatus.RETRYING.value
+
+def expire_lease(mongo, task_id, owner):
+    return mongo.background_tasks.update_one(
+        {"task_id": task_id},
+        {"$set": {"status": TaskStatus.RUNNING.value, "claimed_by": owner,
+                  "lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+
+def test_expired_lease_is_reclaimed_once(make_processor, mongo, broker):
+    async def scenario():
+        node_a = make_processor(broker=broker)
+        node_b = make_processor(broker=broker)
+        task_id = await node_a.submit_task(TaskType.AI_PROCESSING, {})
+        await broker.ack((await broker.claim("drain", 10))[0])  # the original delivery was handled
+        await expire_lease(mongo, task_id, "dead-node")
+
+        await asyncio.gather(node_a._reclaim_expired_leases(), node_b._reclaim_expired_leases())
+        doc = await mongo.background_tasks.find_one({"task_id": task_id})
+        republished = await broker.claim("node", 10)
+        return task_id, doc, node_a.stats["reclaimed_tasks"] + node_b.stats["reclaimed_tasks"], republished
+
+    task_id, doc, reclaimed, republished = asyncio.run(scenario())
+    assert reclaimed == 1
+    assert doc["status"] == TaskStatus.RETRYING.value
+    assert doc["retry_count"] == 1
+    assert doc["claimed_by"] is None and doc["lease_expires_at"] is None
+    assert [message.task_id for message in republished] == [task_id]
+
+def test_live_lease_and_own_tasks_are_not_reclaimed(make_processor, mongo, broker):
+    async def scenario():
+        processor = make_processor(broker=broker)
+        live = await processor.submit_task(TaskType.AI_PROCESSING, {})
+        own = await processor.submit_task(TaskType.AI_PROCESSING, {})
+        await mongo.background_tasks.update_one(
+            {"task_id": live},
+            {"$set": {"status": TaskStatus.RUNNING.value, "claimed_by": "other-node",
+                      "lease_expires_at": datetime.utcnow() + timedelta(minutes=1)}}
+        )
+        await expire_lease(mongo, own, processor.node_id)
+        await processor._reclaim_expired_leases()
+        return processor.stats["reclaimed_tasks"]
+
+    assert asyncio.run(scenario()) == 0
+
+def test_reclaim_past_max_retries_fails_the_task_and_its_dependents(make_processor, mongo, broker):
+    async def scenario():
+        processor = make_processor(broker=broker)
+        parent = await processor.submit_task(TaskType.AI_PROCESSING, {}, max_retries=0)
+        child = await processor.submit_task(TaskType.AI_PROCESSING, {}, depends_on=[parent])
+        await expire_lease(mongo, parent, "dead-node")
+        await processor._reclaim_expired_leases()
+        return [(await mongo.background_tasks.find_one({"task_id": task_id}))["status"]
+                for task_id in (parent, child)]
+
+    assert asyncio.run(scenario()) == [TaskStatus.FAILED.value, TaskStatus.FAILED.value]
+
+def test_node_that_lost_its_lease_cannot_overwrite_the_task(make_processor, mongo, broker):
+    async def scenario():
+        started = asyncio.Event()
+        finish = asyncio.Event()
+
+        async def handler(task):
+            started.set()
+            await finish.wait()
+            return {"stale": True}
+
+        slow_node = with_handler(make_processor(broker=broker), handler)
+        task_id = await slow_node.submit_task(TaskType.AI_PROCESSING, {})
+        execution = asyncio.create_task(slow_node._execute_task(await load(slow_node, mongo, task_id), "worker_0"))
+        await started.wait()
+
+        # Another node reclaims the lease while the slow node is still running
+        await mongo.background_tasks.update_one(
+            {"task_id": task_id}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+        )
+        await make_processor(broker=broker)._reclaim_expired_leases()
+        finish.set()
+        await execution
+        return await mongo.background_tasks.find_one({"task_id": task_id})
+
+    doc = asyncio.run(scenario())
+    assert doc["status"] == TaskStatus.RETRYING.value
+    assert doc.get("result") is None
+
+def test_shutdown_returns_running_tasks_to_the_queue(make_processor, mongo, broker):
+    async def scenario():
+        started = asyncio.Event()
+
+        async def handler(task):
+            started.set()
+            await asyncio.sleep(60)
+
+        processor = with_handler(make_processor(broker=broker, max_workers=2), handler)
+        await processor.start()
+        parent = await processor.submit_task(TaskType.AI_PROCESSING, {})
+        child = await processor.submit_task(TaskType.AI_PROCESSING, {}, depends_on=[parent])
+        await asyncio.wait_for(started.wait(), 5)
+        await processor.stop(timeout=5)
+
+        parent_doc = await mongo.background_tasks.find_one({"task_id": parent})
+        child_doc = await mongo.background_tasks.find_one({"task_id": child})
+        return parent_doc, child_doc, broker.get_stats()
+
+    parent_doc, child_doc, stats = asyncio.run(scenario())
+    assert parent_doc["status"] == TaskStatus.PENDING.value
+    assert parent_doc["claimed_by"] is None and parent_doc["lease_expires_at"] is None
+    assert child_doc["status"] == TaskStatus.PENDING.value  # still waiting, not failed
+    assert stats["ready"] == 1  # republished for the other nodes
+
+def test_user_quota_is_counted_across_nodes(make_processor, broker):
+    async def scenario():
+        node_a = make_processor(broker=broker, user_queued_limit=2)
+        node_b = make_processor(broker=broker, user_queued_limit=2)
+        await node_a.submit_task(TaskType.AI_PROCESSING, {}, user_session="busy")
+        await node_b.submit_task(TaskType.AI_PROCESSING, {}, user_session="busy")
+        with pytest.raises(TaskQuotaExceeded):
+            await node_a.submit_task(TaskType.AI_PROCESSING, {}, user_session="busy")
+        await node_b.submit_task(TaskType.AI_PROCESSING, {}, user_session="other")
+
+    asyncio.run(scenario())
+
+def test_priority_queue_limit_is_counted_across_nodes(make_processor, broker):
+    async def scenario():
+        node_a = make_processor(broker=broker)
+        node_b = make_processor(broker=broker)
+        node_a.scheduler.max_queued[TaskPriority.URGENT] = node_b.scheduler.max_queued[TaskPriority.URGENT] = 1
+        await node_a.submit_task(TaskType.AI_PROCESSING, {}, priority=TaskPriority.URGENT)
+        with pytest.raises(TaskQuotaExceeded):
+            await node_b.submit_task(TaskType.AI_PROCESSING, {}, priority=TaskPriority.URGENT)
+
+    asyncio.run(scenario())
+
+def test_concurrent_submits_cannot_overshoot_the_cluster_quota(make_processor, mongo, broker):
+    async def scenario():
+        nodes = [make_processor(broker=broker, user_queued_limit=3) for _ in range(3)]
+        for node in nodes:
+            node.scheduler.max_queued[TaskPriority.HIGH] = 4
+
+        results = await asyncio.gather(
+            *(nodes[index % 3].submit_task(TaskType.AI_PROCESSING, {}, user_session="busy")
+              for index in range(12)),
+            return_exceptions=True
+        )
+        assert sum(isinstance(result, str) for result in results) == 3
+        assert all(isinstance(result, (str, TaskQuotaExceeded)) for result in results)
+
+        results = await asyncio.gather(
+            *(nodes[index % 3].submit_task(TaskType.AI_PROCESSING, {}, priority=TaskPriority.HIGH,
+                                           user_session=f"user-{index}") for index in range(12)),
+            return_exceptions=True
+        )
+        assert sum(isinstance(result, str) for result in results) == 4
+        waiting = await mongo.background_tasks.count_documents({"priority": TaskPriority.HIGH.value})
+        assert waiting == 4
+        # Rejected submissions handed back the user counters they took
+        assert sum([await nodes[0].quota.waiting(f"user:user-{index}") for index in range(12)]) == 4
+
+    asyncio.run(scenario())
+
+def test_quota_counters_follow_the_task_lifecycle(make_processor, mongo, broker):
+    async def scenario():
+        processor = with_handler(make_processor(broker=broker, user_queued_limit=1), lambda task: asyncio.sleep(0))
+        task_id = await processor.submit_task(TaskType.AI_PROCESSING, {}, user_session="busy")
+        with pytest.raises(TaskQuotaExceeded):
+            await processor.submit_task(TaskType.AI_PROCESSING, {}, user_session="busy")
+
+        # Starting a task frees its place
+        await processor._execute_task(await load(processor, mongo, task_id), "worker_0")
+        assert await processor.quota.waiting("user:busy") == 0
+        queued = await processor.submit_task(TaskType.AI_PROCESSING, {}, user_session="busy")
+
+        # So does cancelling it
+        assert await processor.cancel_task(queued)
+        assert await processor.quota.waiting("user:busy") == 0
+
+        # Reconcile repairs a counter that drifted
+        await processor.quota.collection.update_one({"_id": "user:busy"}, {"$set": {"waiting": 5}})
+        await processor.submit_task(TaskType.AI_PROCESSING, {}, user_session="other")
+        counts = await processor.quota.reconcile(processor.tasks_collection,
+                                                 [TaskStatus.PENDING.value, TaskStatus.RETRYING.value])
+        assert counts["user:busy"] == 0 and counts["user:other"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,121 @@
+"""Dependency release and failure propagation, in the graph and through the processor"""
+
+import asyncio
+
+import background_task_processor
+from background_task_processor import TaskPriority, TaskStatus, TaskType
+from task_dependency_graph import TaskDependencyGraph
+
+def test_task_is_released_when_its_last_dependency_completes():
+    graph = TaskDependencyGraph()
+    assert graph.add("child", "child-task", ["a", "b"]) is False
+    assert graph.is_waiting("child")
+
+    assert graph.complete("a") == []
+    assert graph.is_waiting("child")
+    assert graph.complete("b") == ["child-task"]
+    assert not graph.is_waiting("child")
+    assert len(graph) == 0
+
+def test_task_without_unmet_dependencies_is_ready_immediately():
+    graph = TaskDependencyGraph()
+    assert graph.add("task", "task", []) is True
+    assert len(graph) == 0
+
+def test_failure_propagates_transitively_and_is_remembered():
+    graph = TaskDependencyGraph()
+    graph.add("child", "child", ["root"])
+    graph.add("grandchild", "grandchild", ["child"])
+    graph.add("sibling", "sibling", ["root", "other"])
+    graph.add("unrelated", "unrelated", ["other"])
+
+    assert sorted(graph.fail("root")) == ["child", "grandchild", "sibling"]
+    assert graph.finished_state("root") is False
+    assert graph.finished_state("grandchild") is False
+    assert graph.is_waiting("unrelated")
+    # The failed sibling no longer waits on "other"
+    assert graph.complete("other") == ["unrelated"]
+
+def test_discard_removes_reverse_edges():
+    graph = TaskDependencyGraph()
+    graph.add("child", "child", ["root"])
+    assert graph.discard("child") == "child"
+    assert graph.complete("root") == []
+    assert graph.get_stats()["tracked_dependencies"] == 0
+
+def test_finished_tasks_are_forgotten_oldest_first():
+    graph = TaskDependencyGraph(remember_finished=2)
+    graph.complete("a")
+    graph.fail("b")
+    graph.complete("c")
+    assert graph.finished_state("a") is None
+    assert graph.finished_state("b") is False
+    assert graph.finished_state("c") is True
+
+def test_processor_releases_and_fails_dependents(make_processor, mongo):
+    async def scenario():
+        processor = make_processor()
+        parent = await processor.submit_task(TaskType.DATA_ANALYSIS, {})
+        child = await processor.submit_task(TaskType.DATA_ANALYSIS, {}, depends_on=[parent])
+        grandchild = await processor.submit_task(TaskType.DATA_ANALYSIS, {}, depends_on=[child])
+        assert processor.queued_task_ids == {parent}
+        assert processor.dependency_graph.is_waiting(child)
+
+        await processor._release_dependents(parent)
+        assert child in processor.queued_task_ids
+        assert processor.dependency_graph.is_waiting(grandchild)
+
+        await processor._fail_dependents(child)
+        doc = await mongo.background_tasks.find_one({"task_id": grandchild})
+        assert doc["status"] == TaskStatus.FAILED.value
+        assert doc["error_message"] == f"Dependency {child} did not complete"
+
+        # A dependency that already failed fails the new task at submit time
+        late = await processor.submit_task(TaskType.DATA_ANALYSIS, {}, depends_on=[grandchild])
+        doc = await mongo.background_tasks.find_one({"task_id": late})
+        assert doc["status"] == TaskStatus.FAILED.value
+
+    asyncio.run(scenario())
+
+def test_dependents_released_into_a_full_queue_do_not_deadlock_the_pool(make_processor, mongo, monkeypatch):
+    async def discard(*args, **kwargs):
+        pass
+    monkeypatch.setattr(background_task_processor.write_behind, "insert", discard)
+
+    parent_running = asyncio.Event()
+    finish_parent = asyncio.Event()
+
+    async def handler(task):
+        if task.parameters.get("parent"):
+            parent_running.set()
+            await finish_parent.wait()
+        return {"ok": True}
+
+    async def scenario():
+        processor = make_processor(max_workers=1)
+        processor.task_handlers[TaskType.AI_PROCESSING] = handler
+        processor.scheduler.max_queued[TaskPriority.NORMAL] = 2
+
+        parent = await processor.submit_task(TaskType.AI_PROCESSING, {"parent": True})
+        child = await processor.submit_task(TaskType.AI_PROCESSING, {}, depends_on=[parent])
+        await processor.start()
+        await asyncio.wait_for(parent_running.wait(), 1)
+
+        # The only worker runs the parent while the child's priority queue fills up
+        fillers = [await processor.submit_task(TaskType.AI_PROCESSING, {}) for _ in range(2)]
+        assert not processor.scheduler.has_room(TaskPriority.NORMAL)
+        finish_parent.set()
+
+        task_ids = [parent, child, *fillers]
+        try:
+            for _ in range(200):
+                if await mongo.background_tasks.count_documents(
+                        {"task_id": {"$in": task_ids}, "status": TaskStatus.COMPLETED.value}) == 4:
+                    break
+                await asyncio.sleep(0.01)
+            statuses = {doc["task_id"]: doc["status"] async for doc in mongo.background_tasks.find()}
+        finally:
+            await processor.stop(timeout=1)
+        assert all(statuses[task_id] == TaskStatus.COMPLETED.value for task_id in task_ids)
+
+    asyncio.run(scenario())
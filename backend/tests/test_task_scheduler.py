@@ -0,0 +1,206 @@
+"""Weighted-fair ordering across priorities and users, and the concurrency limits of WeightedFairScheduler"""
+
+import asyncio
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from background_task_processor import TaskPriority, TaskType
+from task_scheduler import WeightedFairScheduler
+
+def make_task(task_id, priority=TaskPriority.NORMAL, task_type=TaskType.AI_PROCESSING, user=None):
+    return SimpleNamespace(task_id=task_id, priority=priority, task_type=task_type, user_session=user)
+
+async def drain(scheduler, count, release=True):
+    picked = []
+    for _ in range(count):
+        task = await asyncio.wait_for(scheduler.get(), 1)
+        picked.append(task)
+        if release:
+            await scheduler.release(task)
+    return picked
+
+def test_priorities_are_served_in_proportion_to_their_weights():
+    async def scenario():
+        scheduler = WeightedFairScheduler(TaskPriority)
+        for priority in TaskPriority:
+            for index in range(100):
+                await scheduler.put(make_task(f"{priority.name}-{index}", priority))
+        # Weights 1, 2, 4, 8, 16: one full round is 31 dispatches
+        return Counter(task.priority for task in await drain(scheduler, 62))
+
+    counts = asyncio.run(scenario())
+    assert counts == {
+        TaskPriority.URGENT: 32, TaskPriority.CRITICAL: 16, TaskPriority.HIGH: 8,
+        TaskPriority.NORMAL: 4, TaskPriority.LOW: 2
+    }
+
+def test_idle_priority_does_not_bank_credit():
+    async def scenario():
+        scheduler = WeightedFairScheduler(TaskPriority)
+        for index in range(40):
+            await scheduler.put(make_task(f"normal-{index}", TaskPriority.NORMAL))
+        await drain(scheduler, 20)
+        # LOW rejoins at the current virtual time instead of owning the first 20 slots
+        for index in range(20):
+            await scheduler.put(make_task(f"low-{index}", TaskPriority.LOW))
+        return Counter(task.priority for task in await drain(scheduler, 9))
+
+    counts = asyncio.run(scenario())
+    assert counts[TaskPriority.NORMAL] == 6
+    assert counts[TaskPriority.LOW] == 3
+
+def test_type_limit_skips_to_the_next_eligible_task():
+    async def scenario():
+        scheduler = WeightedFairScheduler(TaskPriority, type_limits={TaskType.DATABASE_MAINTENANCE: 1})
+        await scheduler.put(make_task("maintenance-1", task_type=TaskType.DATABASE_MAINTENANCE))
+        await scheduler.put(make_task("maintenance-2", task_type=TaskType.DATABASE_MAINTENANCE))
+        await scheduler.put(make_task("scrape", task_type=TaskType.WEB_SCRAPING))
+
+        first, second = await drain(scheduler, 2, release=False)
+        assert (first.task_id, second.task_id) == ("maintenance-1", "scrape")
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.get(), 0.05)
+
+        await scheduler.release(first)
+        third = await asyncio.wait_for(scheduler.get(), 1)
+        assert third.task_id == "maintenance-2"
+        assert scheduler.type_limit_skips > 0
+
+    asyncio.run(scenario())
+
+def test_put_waits_while_the_priority_queue_is_full():
+    async def scenario():
+        scheduler = WeightedFairScheduler(TaskPriority, max_queued={TaskPriority.HIGH: 1})
+        await scheduler.put(make_task("first", TaskPriority.HIGH))
+        assert not scheduler.has_room(TaskPriority.HIGH)
+
+        blocked = asyncio.create_task(scheduler.put(make_task("second", TaskPriority.HIGH)))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        await drain(scheduler, 1)
+        await asyncio.wait_for(blocked, 1)
+        assert scheduler.queue_sizes()["HIGH"] == 1
+
+    asyncio.run(scenario())
+
+def test_discard_removes_a_queued_task():
+    async def scenario():
+        scheduler = WeightedFairScheduler(TaskPriority)
+        await scheduler.put(make_task("keep"))
+        await scheduler.put(make_task("drop"))
+        assert await scheduler.discard("drop") is True
+        assert await scheduler.discard("missing") is False
+        assert [task.task_id for task in await drain(scheduler, 1)] == ["keep"]
+        assert scheduler.queue_sizes()["NORMAL"] == 0
+
+    asyncio.run(scenario())
+
+def test_users_take_turns_within_a_priority():
+    async def scenario():
+        scheduler = WeightedFairScheduler(TaskPriority)
+        for index in range(50):
+            await scheduler.put(make_task(f"heavy-{index}", user="heavy"))
+        await scheduler.put(make_task("light-0", user="light"))
+        await scheduler.put(make_task("light-1", user="light"))
+        assert scheduler.queued_for("heavy") == 50
+        return [task.user_session for task in await drain(scheduler, 6)]
+
+    # One turn each per round, not the heavy user's whole backlog first
+    assert asyncio.run(scenario()) == ["heavy", "light", "heavy", "light", "heavy", "heavy"]
+
+def test_user_quantum_sets_the_turn_length():
+    async def scenario():
+        scheduler = WeightedFairScheduler(TaskPriority, user_quantum=2)
+        for user in ("a", "b"):
+            for index in range(4):
+                await scheduler.put(make_task(f"{user}-{index}", user=user))
+        return [task.user_session for task in await drain(scheduler, 8)]
+
+    assert asyncio.run(scenario()) == ["a", "a", "b", "b", "a", "a", "b", "b"]
+
+def test_user_running_limit_holds_back_only_that_user():
+    async def scenario():
+        scheduler = WeightedFairScheduler(TaskPriority, user_running_limit=1)
+        await scheduler.put(make_task("a-0", user="a"))
+        await scheduler.put(make_task("a-1", user="a"))
+        await scheduler.put(make_task("b-0", user="b"))
+        await scheduler.put(make_task("system"))  # no user_session: never limited
+
+        held = await drain(scheduler, 3, release=False)
+        assert [task.task_id for task in held] == ["a-0", "b-0", "system"]
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.get(), 0.05)
+        assert scheduler.user_limit_skips > 0
+
+        await scheduler.release(held[0])
+        assert (await asyncio.wait_for(scheduler.get(), 1)).task_id == "a-1"
+        assert scheduler.running_for("a") == 1
+
+    asyncio.run(scenario())
+
+def test_submit_rejects_users_over_their_queued_quota(make_processor):
+    from background_task_processor import TaskQuotaExceeded
+
+    async def scenario():
+        processor = make_processor(user_queued_limit=2)
+        for _ in range(2):
+            await processor.submit_task(TaskType.AI_PROCESSING, {}, user_session="busy")
+        with pytest.raises(TaskQuotaExceeded) as rejected:
+            await processor.submit_task(TaskType.AI_PROCESSING, {}, user_session="busy")
+        assert rejected.value.status_code == 429
+
+        # Other users and system tasks are unaffected
+        await processor.submit_task(TaskType.AI_PROCESSING, {}, user_session="idle")
+        await processor.submit_task(TaskType.AI_PROCESSING, {})
+        assert processor.stats["rejected_tasks"] == 1
+
+    asyncio.run(scenario())
+
+def test_parked_and_scheduled_tasks_count_against_the_queued_quota(make_processor):
+    from datetime import datetime, timedelta
+
+    from background_task_processor import TaskQuotaExceeded
+
+    async def scenario():
+        processor = make_processor(user_queued_limit=2)
+        blocker = await processor.submit_task(TaskType.AI_PROCESSING, {})
+        await processor.submit_task(TaskType.AI_PROCESSING, {}, user_session="busy", depends_on=[blocker])
+        await processor.submit_task(TaskType.AI_PROCESSING, {}, user_session="busy",
+                                    scheduled_at=datetime.utcnow() + timedelta(hours=1))
+        assert processor.scheduler.queued_for("busy") == 0
+        with pytest.raises(TaskQuotaExceeded):
+            await processor.submit_task(TaskType.AI_PROCESSING, {}, user_session="busy")
+
+        # Cancelling one gives its place back
+        [parked] = [task_id for task_id, user in processor.waiting_users.items() if user == "busy"][:1]
+        assert await processor.cancel_task(parked)
+        await processor.submit_task(TaskType.AI_PROCESSING, {}, user_session="busy")
+
+    asyncio.run(scenario())
+
+def test_concurrent_submits_are_admitted_atomically_and_never_wait(make_processor):
+    from background_task_processor import TaskQuotaExceeded
+
+    async def scenario():
+        processor = make_processor(user_queued_limit=3)
+        processor.scheduler.max_queued[TaskPriority.NORMAL] = 5
+
+        results = await asyncio.wait_for(asyncio.gather(
+            *(processor.submit_task(TaskType.AI_PROCESSING, {}, user_session="busy") for _ in range(10)),
+            return_exceptions=True
+        ), 1)
+        assert sum(isinstance(result, str) for result in results) == 3
+        assert processor.scheduler.queued_for("busy") == 3
+
+        results = await asyncio.wait_for(asyncio.gather(
+            *(processor.submit_task(TaskType.AI_PROCESSING, {}, user_session=f"user-{index}") for index in range(10)),
+            return_exceptions=True
+        ), 1)
+        assert sum(isinstance(result, TaskQuotaExceeded) for result in results) == 8
+        assert processor.scheduler.sizes[TaskPriority.NORMAL] == 5
+        assert processor.scheduler.reserved[TaskPriority.NORMAL] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,100 @@
+"""Directory confinement of file workloads and the shared-memory payload hand-off"""
+
+import asyncio
+
+import pytest
+
+import task_workloads
+from task_execution import (PAYLOAD_CODEC, ExecutionClass, ExecutorConfig, PayloadRef, TaskExecutor,
+                            load_payload, release_payload, store_payload)
+
+@pytest.fixture
+def workload_dirs(tmp_path, monkeypatch):
+    reports, uploads = tmp_path / "reports", tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(task_workloads, "REPORT_DIR", str(reports))
+    monkeypatch.setattr(task_workloads, "UPLOAD_DIR", str(uploads))
+    return reports, uploads
+
+def test_process_file_reads_only_from_the_upload_dir(workload_dirs, tmp_path):
+    _, uploads = workload_dirs
+    (uploads / "notes.txt").write_text("one two\ntwo\n")
+    (tmp_path / "secret.txt").write_text("nope")
+
+    result = task_workloads.process_file({"file_path": "notes.txt", "word_counts": True})
+    assert result["lines"] == 2
+    assert result["top_words"] == {"two": 2, "one": 1}
+
+    for outside in ("../secret.txt", str(tmp_path / "secret.txt")):
+        with pytest.raises(ValueError):
+            task_workloads.process_file({"file_path": outside})
+
+def test_process_file_rejects_symlinks_out_of_the_upload_dir(workload_dirs, tmp_path):
+    _, uploads = workload_dirs
+    (tmp_path / "secret.txt").write_text("nope")
+    (uploads / "link.txt").symlink_to(tmp_path / "secret.txt")
+    with pytest.raises(ValueError):
+        task_workloads.process_file({"file_path": "link.txt"})
+
+def test_generate_report_writes_into_the_report_dir(workload_dirs):
+    reports, _ = workload_dirs
+    result = task_workloads.generate_report({
+        "task_id": "../../escape", "records": [{"x": 1}, {"x": 3}],
+        "output_path": "/tmp/ignored.txt"
+    })
+    written = reports / "report_______escape.txt"
+    assert result["file_path"] == str(written)
+    assert "x: mean=2" in written.read_text()
+
+def test_payload_round_trips_through_shared_memory():
+    data = PAYLOAD_CODEC.encode({"values": [1, 2, 3]})
+    ref = store_payload(data)
+    try:
+        assert isinstance(ref, PayloadRef) and ref.size == len(data)
+        assert load_payload(ref) == {"values": [1, 2, 3]}
+    finally:
+        release_payload(ref)
+
+def test_large_process_payloads_go_by_reference():
+    executor = TaskExecutor(ExecutorConfig(max_threads=1, max_processes=1, inline_payload_bytes=1024))
+    try:
+        params = {"values": list(range(5000))}
+        result = asyncio.run(executor.run(task_workloads.analyze_data, params, ExecutionClass.PROCESS))
+        assert result["processed_records"] == 5000
+        assert executor.stats["payloads_by_reference"] == 1
+    finally:
+        executor.shutdown()
+
+def sleep_for(params):
+    """Process entry point that holds its worker for params["seconds"]"""
+    import time
+    time.sleep(params["seconds"])
+    return params["seconds"]
+
+def test_timed_out_process_run_is_stopped_and_other_runs_are_resubmitted():
+    executor = TaskExecutor(ExecutorConfig(max_threads=1, max_processes=2, inline_payload_bytes=1024))
+
+    async def scenario():
+        # Warm the pool so the timeout below measures the call, not worker start-up
+        await executor.run(sleep_for, {"seconds": 0}, ExecutionClass.PROCESS)
+        pool = executor.process_pool
+        workers = list(pool._processes.values())
+
+        bystander = asyncio.create_task(executor.run(sleep_for, {"seconds": 0.5}, ExecutionClass.PROCESS))
+        params = {"seconds": 30, "padding": "x" * 4096}
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(executor.run(sleep_for, params, ExecutionClass.PROCESS), timeout=0.3)
+
+        assert executor.stats["process_pool_recycles"] == 1
+        assert executor.process_pool is not pool
+        for worker in workers:
+            worker.join(timeout=5)
+            assert not worker.is_alive()
+
+        assert await bystander == 0.5
+        assert executor.stats["process_resubmits"] == 1
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
@@ -0,0 +1,45 @@
+"""Retry behaviour of WriteBehindBuffer when a batch fails"""
+
+import asyncio
+
+from pymongo.errors import AutoReconnect
+
+import write_behind
+from write_behind import WriteBehindBuffer, WriteBehindConfig
+
+class FlakyCollection:
+    """Fails the first `failures` insert_many calls, then writes to the real collection"""
+
+    def __init__(self, collection, failures):
+        self.collection = collection
+        self.failures = failures
+        self.calls = 0
+
+    async def insert_many(self, documents, ordered=True):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise AutoReconnect("connection reset")
+        return await self.collection.insert_many(documents, ordered=ordered)
+
+def test_failed_batch_is_retried_without_new_inserts(mongo, monkeypatch):
+    flaky = FlakyCollection(mongo.timeline_events, failures=2)
+    monkeypatch.setattr(write_behind, "get_async_database", lambda: {"timeline_events": flaky})
+
+    async def scenario():
+        buffer = WriteBehindBuffer(WriteBehindConfig(flush_interval=0.01, max_retry_delay=0.05))
+        for index in range(3):
+            await buffer.insert("timeline_events", {"index": index})
+
+        for _ in range(100):
+            if await mongo.timeline_events.count_documents({}) == 3:
+                break
+            await asyncio.sleep(0.01)
+
+        assert await mongo.timeline_events.count_documents({}) == 3
+        assert flaky.calls == 3
+        stats = buffer.get_stats()
+        assert stats['failed_batches'] == 2 and stats['retry_flushes'] >= 2
+        assert stats['buffered'] == {}
+        await buffer.close()
+
+    asyncio.run(scenario())
@@ -1,22 +1,38 @@
 import asyncio
 import json
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, AsyncIterator
 from datetime import datetime, timedelta
-from pymongo import MongoClient
+from pymongo import IndexModel, ASCENDING, DESCENDING
 import uuid
 
+from database import async_collections, register_indexes
+from cursor_streaming import iter_documents, fetch_page, stream_jsonl, stream_csv
+
 logger = logging.getLogger(__name__)
 
+register_indexes(
+    "timeline_entries",
+    # _id as tie-breaker so keyset pages and exports read in index order
+    IndexModel([("session_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    IndexModel([("entry_id", ASCENDING)])
+)
+register_indexes(
+    "timeline_bookmarks",
+    IndexModel([("session_id", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("entry_id", ASCENDING)])
+)
+
+CSV_HEADER = ["timestamp", "type", "summary", "url", "category"]
+
 class TimelineManager:
     """
     Phase 3: Timeline and Session Management System
     Advanced timeline tracking for enhanced user experience
     """
     
-    def __init__(self, mongo_client: MongoClient):
-        self.client = mongo_client
-        self.db = mongo_client.aether_browser
+    def __init__(self):
+        self.db = async_collections.db
         self.active_sessions = {}
         self.timeline_cache = {}
     
@@ -43,7 +59,7 @@ class TimelineManager:
             }
             
             # Store in database
-            self.db.timeline_entries.insert_one(timeline_entry)
+            await self.db.timeline_entries.insert_one(timeline_entry)
             
             # Update session cache
             if session_id not in self.timeline_cache:
@@ -67,53 +83,87 @@ class TimelineManager:
             logger.error(f"Timeline entry creation failed: {e}")
             raise
     
+    def _build_query(self, session_id: str, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None, entry_types: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Timeline query for a session, time range and entry types"""
+        query = {"session_id": session_id}
+        
+        # Add time range filter
+        if start_time or end_time:
+            time_filter = {}
+            if start_time:
+                time_filter["$gte"] = start_time
+            if end_time:
+                time_filter["$lte"] = end_time
+            query["timestamp"] = time_filter
+        
+        # Add type filter
+        if entry_types:
+            query["type"] = {"$in": entry_types}
+        
+        return query
+    
+    def _process_entry(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Shape a stored entry for the frontend"""
+        return {
+            "entry_id": entry["entry_id"],
+            "type": entry["type"],
+            "timestamp": entry["timestamp"].isoformat(),
+            "summary": entry.get("ai_summary", ""),
+            "data": self._sanitize_data_for_frontend(entry["data"]),
+            "metadata": entry.get("metadata", {}),
+            "search_metadata": entry.get("search_metadata", {}),
+            "category": self._categorize_entry(entry["type"], entry["data"]),
+            "importance_score": self._calculate_importance_score(entry)
+        }
+    
     async def get_timeline(self, session_id: str, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None, entry_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """Get timeline entries for a session"""
         try:
-            # Build query
-            query = {"session_id": session_id}
-            
-            # Add time range filter
-            if start_time or end_time:
-                time_filter = {}
-                if start_time:
-                    time_filter["$gte"] = start_time
-                if end_time:
-                    time_filter["$lte"] = end_time
-                query["timestamp"] = time_filter
-            
-            # Add type filter
-            if entry_types:
-                query["type"] = {"$in": entry_types}
+            query = self._build_query(session_id, start_time, end_time, entry_types)
             
             # Get entries from database
-            entries = list(self.db.timeline_entries.find(
+            entries = await self.db.timeline_entries.find(
                 query,
                 {"_id": 0}
-            ).sort("timestamp", -1).limit(100))
+            ).sort("timestamp", -1).limit(100).to_list(100)
             
             # Process entries for frontend
-            processed_entries = []
-            for entry in entries:
-                processed_entry = {
-                    "entry_id": entry["entry_id"],
-                    "type": entry["type"],
-                    "timestamp": entry["timestamp"].isoformat(),
-                    "summary": entry.get("ai_summary", ""),
-                    "data": self._sanitize_data_for_frontend(entry["data"]),
-                    "metadata": entry.get("metadata", {}),
-                    "search_metadata": entry.get("search_metadata", {}),
-                    "category": self._categorize_entry(entry["type"], entry["data"]),
-                    "importance_score": self._calculate_importance_score(entry)
-                }
-                processed_entries.append(processed_entry)
-            
-            return processed_entries
+            return [self._process_entry(entry) for entry in entries]
             
         except Exception as e:
             logger.error(f"Timeline retrieval failed: {e}")
             return []
     
+    async def get_timeline_page(self, session_id: str, limit: int = 50, cursor: Optional[str] = None, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None, entry_types: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Newest-first page of timeline entries with keyset pagination on (timestamp, _id)"""
+        query = self._build_query(session_id, start_time, end_time, entry_types)
+        entries, next_cursor = await fetch_page(
+            self.db.timeline_entries, query, time_field="timestamp", limit=limit, cursor=cursor
+        )
+        return {
+            "entries": [self._process_entry(entry) for entry in entries],
+            "next_cursor": next_cursor
+        }
+    
+    async def stream_timeline_export(self, session_id: str, export_format: str = "jsonl", filters: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Export every matching entry as JSON Lines or CSV chunks, oldest first
+        
+        Entries are read from a batched cursor and encoded as they arrive, so
+        memory stays flat regardless of how long the timeline is.
+        """
+        query = self._build_query(session_id, **(filters or {}))
+        entries = iter_documents(self.db.timeline_entries, query, time_field="timestamp")
+        
+        if export_format == "csv":
+            async def rows():
+                async for entry in entries:
+                    yield self._csv_row(self._process_entry(entry))
+            async for chunk in stream_csv(rows(), CSV_HEADER):
+                yield chunk
+        else:
+            async for chunk in stream_jsonl(entries, self._process_entry):
+                yield chunk
+    
     async def search_timeline(self, session_id: str, search_query: str, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Search timeline entries using text search and filters"""
         try:
@@ -158,10 +208,10 @@ class TimelineManager:
                     pass
             
             # Execute search
-            entries = list(self.db.timeline_entries.find(
+            entries = await self.db.timeline_entries.find(
                 query,
                 {"_id": 0}
-            ).sort("timestamp", -1).limit(50))
+            ).sort("timestamp", -1).limit(50).to_list(50)
             
             # Process and rank results
             processed_results = []
@@ -204,10 +254,10 @@ class TimelineManager:
                 start_time = end_time - timedelta(weeks=1)
             
             # Get entries in time range
-            entries = list(self.db.timeline_entries.find({
+            entries = await self.db.timeline_entries.find({
                 "session_id": session_id,
                 "timestamp": {"$gte": start_time, "$lte": end_time}
-            }))
+            }).to_list(None)
             
             # Calculate analytics
             analytics = {
@@ -246,7 +296,7 @@ class TimelineManager:
                 "category": bookmark_data.get("category", "general")
             }
             
-            self.db.timeline_bookmarks.insert_one(bookmark)
+            await self.db.timeline_bookmarks.insert_one(bookmark)
             
             return bookmark_id
             
@@ -257,15 +307,15 @@ class TimelineManager:
     async def get_timeline_bookmarks(self, session_id: str) -> List[Dict[str, Any]]:
         """Get all bookmarks for a session"""
         try:
-            bookmarks = list(self.db.timeline_bookmarks.find(
+            bookmarks = await self.db.timeline_bookmarks.find(
                 {"session_id": session_id},
                 {"_id": 0}
-            ).sort("created_at", -1))
+            ).sort("created_at", -1).to_list(None)
             
             # Enrich bookmarks with entry data
             enriched_bookmarks = []
             for bookmark in bookmarks:
-                entry = self.db.timeline_entries.find_one(
+                entry = await self.db.timeline_entries.find_one(
                     {"entry_id": bookmark["entry_id"]},
                     {"_id": 0, "data": 1, "type": 1, "timestamp": 1, "ai_summary": 1}
                 )
@@ -292,13 +342,13 @@ class TimelineManager:
     async def delete_timeline_entry(self, session_id: str, entry_id: str) -> bool:
         """Delete a timeline entry"""
         try:
-            result = self.db.timeline_entries.delete_one({
+            result = await self.db.timeline_entries.delete_one({
                 "session_id": session_id,
                 "entry_id": entry_id
             })
             
             # Also delete related bookmarks
-            self.db.timeline_bookmarks.delete_many({
+            await self.db.timeline_bookmarks.delete_many({
                 "session_id": session_id,
                 "entry_id": entry_id
             })
@@ -316,57 +366,6 @@ class TimelineManager:
             logger.error(f"Timeline entry deletion failed: {e}")
             return False
     
-    async def export_timeline(self, session_id: str, export_format: str = "json", filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Export timeline data in various formats"""
-        try:
-            # Get filtered timeline entries
-            entries = await self.get_timeline(session_id, **filters if filters else {})
-            
-            # Get bookmarks
-            bookmarks = await self.get_timeline_bookmarks(session_id)
-            
-            # Get analytics
-            analytics = await self.get_timeline_analytics(session_id)
-            
-            export_data = {
-                "session_id": session_id,
-                "export_timestamp": datetime.utcnow().isoformat(),
-                "export_format": export_format,
-                "total_entries": len(entries),
-                "entries": entries,
-                "bookmarks": bookmarks,
-                "analytics": analytics,
-                "metadata": {
-                    "exported_by": "AETHER Timeline Manager",
-                    "version": "3.0",
-                    "filters_applied": filters or {}
-                }
-            }
-            
-            if export_format == "json":
-                return {
-                    "success": True,
-                    "data": export_data,
-                    "content_type": "application/json"
-                }
-            elif export_format == "csv":
-                csv_content = self._convert_to_csv(entries)
-                return {
-                    "success": True,
-                    "data": csv_content,
-                    "content_type": "text/csv"
-                }
-            else:
-                return {
-                    "success": True,
-                    "data": export_data,
-                    "content_type": "application/json"
-                }
-            
-        except Exception as e:
-            logger.error(f"Timeline export failed: {e}")
-            return {"success": False, "error": str(e)}
-    
     def _generate_search_metadata(self, entry_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate search metadata for timeline entry"""
         metadata = {
@@ -871,29 +870,20 @@ class TimelineManager:
         
         return stats
     
-    def _convert_to_csv(self, entries: List[Dict[str, Any]]) -> str:
-        """Convert timeline entries to CSV format"""
-        if not entries:
-            return "timestamp,type,summary,url,category\n"
-        
-        csv_lines = ["timestamp,type,summary,url,category"]
-        
-        for entry in entries:
-            timestamp = entry.get("timestamp", "")
-            entry_type = entry.get("type", "")
-            summary = entry.get("summary", "").replace(",", ";").replace("\n", " ")
-            url = entry.get("data", {}).get("url", "")
-            category = entry.get("category", "")
-            
-            csv_line = f'"{timestamp}","{entry_type}","{summary}","{url}","{category}"'
-            csv_lines.append(csv_line)
-        
-        return "\n".join(csv_lines)
+    def _csv_row(self, entry: Dict[str, Any]) -> List[str]:
+        """CSV columns of a processed timeline entry"""
+        return [
+            entry.get("timestamp", ""),
+            entry.get("type", ""),
+            entry.get("summary", "").replace("\n", " "),
+            entry.get("data", {}).get("url", ""),
+            entry.get("category", "")
+        ]
 
 # Global function to initialize timeline manager
-def initialize_timeline_manager(mongo_client: MongoClient):
+def initialize_timeline_manager():
     global timeline_manager
-    timeline_manager = TimelineManager(mongo_client)
+    timeline_manager = TimelineManager()
     return timeline_manager
 
 # Global instance
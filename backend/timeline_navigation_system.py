@@ -9,13 +9,26 @@ import uuid
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 import logging
-from pymongo import MongoClient
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from dataclasses import dataclass, asdict
 from collections import defaultdict
 import base64
 
+from database import async_collections, register_indexes
+
 logger = logging.getLogger(__name__)
 
+register_indexes(
+    "timeline_events",
+    IndexModel([("user_session", ASCENDING), ("timestamp", DESCENDING)]),
+    IndexModel([("event_type", ASCENDING), ("timestamp", DESCENDING)]),
+    IndexModel([("timestamp", DESCENDING)])
+)
+register_indexes(
+    "timeline_snapshots",
+    IndexModel([("user_session", ASCENDING), ("captured_at", DESCENDING)])
+)
+
 @dataclass
 class TimelineEvent:
     """Single timeline event"""
@@ -42,35 +55,15 @@ class TimelinePeriod:
 class TimelineNavigationSystem:
     """Advanced timeline navigation with session tracking"""
     
-    def __init__(self, mongo_client: MongoClient):
-        self.client = mongo_client
-        self.db = mongo_client.aether_browser
+    def __init__(self):
+        self.db = async_collections.db
         self.timeline_events = self.db.timeline_events
         self.timeline_snapshots = self.db.timeline_snapshots
         self.user_sessions = self.db.user_sessions_timeline
         
-        # Create indexes for performance
-        self._create_indexes()
-        
         # In-memory cache for recent events
         self.recent_events_cache = defaultdict(list)  # user_session -> events list
         
-    def _create_indexes(self):
-        """Create database indexes for performance"""
-        try:
-            # Timeline events indexes
-            self.timeline_events.create_index([("user_session", 1), ("timestamp", -1)])
-            self.timeline_events.create_index([("event_type", 1), ("timestamp", -1)])
-            self.timeline_events.create_index([("timestamp", -1)])
-            
-            # Timeline snapshots indexes
-            self.timeline_snapshots.create_index([("user_session", 1), ("captured_at", -1)])
-            
-            logger.info("Timeline indexes created successfully")
-            
-        except Exception as e:
-            logger.error(f"Failed to create timeline indexes: {e}")
-    
     async def record_event(self, user_session: str, event_type: str, title: str, 
                           description: str, url: str = None, 
                           metadata: Dict[str, Any] = None) -> str:
@@ -92,7 +85,7 @@ class TimelineNavigationSystem:
             
             # Store in database
             event_doc = asdict(event)
-            self.timeline_events.insert_one(event_doc)
+            await self.timeline_events.insert_one(event_doc)
             
             # Update cache
             self.recent_events_cache[user_session].append(event)
@@ -237,10 +230,10 @@ class TimelineNavigationSystem:
                 query["event_type"] = {"$in": event_types}
             
             # Get events from database
-            events = list(self.timeline_events.find(
+            events = await self.timeline_events.find(
                 query,
                 {"_id": 0}
-            ).sort("timestamp", -1))
+            ).sort("timestamp", -1).to_list(None)
             
             # Add screenshots if available
             for event in events:
@@ -320,7 +313,7 @@ class TimelineNavigationSystem:
                 }
             ]
             
-            grouped_data = list(self.timeline_events.aggregate(pipeline))
+            grouped_data = await self.timeline_events.aggregate(pipeline).to_list(None)
             
             # Format response
             periods = []
@@ -388,7 +381,7 @@ class TimelineNavigationSystem:
                 }
             ]
             
-            search_results = list(self.timeline_events.aggregate(pipeline))
+            search_results = await self.timeline_events.aggregate(pipeline).to_list(None)
             
             return search_results
             
@@ -420,7 +413,7 @@ class TimelineNavigationSystem:
             
             event_type_counts = {
                 item["_id"]: item["count"] 
-                for item in self.timeline_events.aggregate(type_pipeline)
+                for item in await self.timeline_events.aggregate(type_pipeline).to_list(None)
             }
             
             # Daily activity
@@ -451,7 +444,7 @@ class TimelineNavigationSystem:
                     "date": f"{item['_id']['year']}-{item['_id']['month']:02d}-{item['_id']['day']:02d}",
                     "events": item["count"]
                 }
-                for item in self.timeline_events.aggregate(daily_pipeline)
+                for item in await self.timeline_events.aggregate(daily_pipeline).to_list(None)
             ]
             
             # Total events
@@ -479,7 +472,7 @@ class TimelineNavigationSystem:
                 }
             ]
             
-            most_active_hour_result = list(self.timeline_events.aggregate(hour_pipeline))
+            most_active_hour_result = await self.timeline_events.aggregate(hour_pipeline).to_list(None)
             most_active_hour = most_active_hour_result[0]["_id"] if most_active_hour_result else None
             
             return {
@@ -500,7 +493,7 @@ class TimelineNavigationSystem:
         """Get events related to a specific event"""
         try:
             # Get the target event
-            target_event = self.timeline_events.find_one({"event_id": event_id})
+            target_event = await self.timeline_events.find_one({"event_id": event_id})
             if not target_event:
                 return []
             
@@ -508,14 +501,14 @@ class TimelineNavigationSystem:
             start_time = target_event["timestamp"] - timedelta(minutes=time_window_minutes)
             end_time = target_event["timestamp"] + timedelta(minutes=time_window_minutes)
             
-            related_events = list(self.timeline_events.find(
+            related_events = await self.timeline_events.find(
                 {
                     "user_session": target_event["user_session"],
                     "event_id": {"$ne": event_id},
                     "timestamp": {"$gte": start_time, "$lte": end_time}
                 },
                 {"_id": 0}
-            ).sort("timestamp", 1))
+            ).sort("timestamp", 1).to_list(None)
             
             # Add relationship score based on proximity and context
             for event in related_events:
@@ -559,7 +552,7 @@ class TimelineNavigationSystem:
                 "events_summary": self._create_events_summary(recent_events)
             }
             
-            self.timeline_snapshots.insert_one(snapshot)
+            await self.timeline_snapshots.insert_one(snapshot)
             
             return snapshot_id
             
@@ -570,10 +563,10 @@ class TimelineNavigationSystem:
     async def get_timeline_snapshots(self, user_session: str) -> List[Dict[str, Any]]:
         """Get user's timeline snapshots"""
         try:
-            snapshots = list(self.timeline_snapshots.find(
+            snapshots = await self.timeline_snapshots.find(
                 {"user_session": user_session},
                 {"_id": 0}
-            ).sort("captured_at", -1))
+            ).sort("captured_at", -1).to_list(None)
             
             return snapshots
             
@@ -584,7 +577,7 @@ class TimelineNavigationSystem:
     async def _update_session_activity(self, user_session: str, timestamp: datetime):
         """Update user session activity tracking"""
         try:
-            self.user_sessions.update_one(
+            await self.user_sessions.update_one(
                 {"user_session": user_session},
                 {
                     "$set": {"last_activity": timestamp},
@@ -606,7 +599,7 @@ class TimelineNavigationSystem:
                 "stored_at": datetime.utcnow()
             }
             
-            self.db.timeline_screenshots.insert_one(screenshot_doc)
+            await self.db.timeline_screenshots.insert_one(screenshot_doc)
             
         except Exception as e:
             logger.error(f"Failed to store screenshot: {e}")
@@ -614,7 +607,7 @@ class TimelineNavigationSystem:
     async def _get_screenshot(self, event_id: str) -> Optional[str]:
         """Get screenshot for event"""
         try:
-            screenshot_doc = self.db.timeline_screenshots.find_one({"event_id": event_id})
+            screenshot_doc = await self.db.timeline_screenshots.find_one({"event_id": event_id})
             return screenshot_doc.get("screenshot_data") if screenshot_doc else None
             
         except Exception as e:
@@ -673,8 +666,8 @@ class TimelineNavigationSystem:
 # Initialize global instance
 timeline_navigation_system = None
 
-def initialize_timeline_navigation_system(mongo_client: MongoClient):
+def initialize_timeline_navigation_system():
     """Initialize timeline navigation system"""
     global timeline_navigation_system
-    timeline_navigation_system = TimelineNavigationSystem(mongo_client)
+    timeline_navigation_system = TimelineNavigationSystem()
     return timeline_navigation_system
\ No newline at end of file
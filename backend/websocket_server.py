@@ -4,6 +4,7 @@ Real-time communication server for Native Chromium Engine
 """
 
 import asyncio
+import base64
 import json
 import logging
 import websockets
@@ -12,6 +13,8 @@ from typing import Dict, Set, Any
 import uuid
 from datetime import datetime
 
+from native_chromium_engine import pack_binary_frame
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -130,7 +133,9 @@ class AETHERWebSocketServer:
                 result = await self.native_engine.navigate_to_url(
                     session_id, 
                     data.get('url'),
-                    timeout=data.get('timeout', 30000)
+                    timeout=data.get('timeout', 30000),
+                    wait_until=data.get('wait_until'),
+                    wait_selector=data.get('wait_selector')
                 )
                 await self.send_message(websocket, {
                     'type': 'navigation_result',
@@ -142,9 +147,27 @@ class AETHERWebSocketServer:
                 result = await self.native_engine.capture_screenshot(
                     session_id,
                     full_page=data.get('full_page', False),
-                    quality=data.get('quality', 80)
+                    quality=data.get('quality', 80),
+                    encoding='binary'
                 )
-                # Screenshot result is broadcasted by native engine
+                if not result.get('success'):
+                    await self.send_error(websocket, result.get('error', 'Screenshot failed'), messageId=data.get('messageId'))
+                elif data.get('binary'):
+                    # Small JSON header + raw JPEG in one binary frame
+                    await self.send_binary(websocket, {
+                        'type': 'screenshot_result',
+                        'messageId': data.get('messageId'),
+                        'format': 'jpeg',
+                        'metadata': result['metadata']
+                    }, result['image'])
+                else:
+                    await self.send_message(websocket, {
+                        'type': 'screenshot_result',
+                        'messageId': data.get('messageId'),
+                        'success': True,
+                        'screenshot': base64.b64encode(result['image']).decode('utf-8'),
+                        'metadata': result['metadata']
+                    })
                 
             elif action == 'execute_js':
                 result = await self.native_engine.execute_javascript(
@@ -168,9 +191,10 @@ class AETHERWebSocketServer:
                     )
                 elif 'x' in data and 'y' in data:
                     # Coordinate click
-                    session = self.native_engine.sessions.get(session_id)
+                    session = await self.native_engine.get_session(session_id)
                     if session and session.page:
                         await session.page.mouse.click(data.get('x'), data.get('y'))
+                        session.screenshot_cache.invalidate()
                         result = {'success': True, 'coordinates': {'x': data.get('x'), 'y': data.get('y')}}
                     else:
                         result = {'success': False, 'error': 'Session not found'}
@@ -229,6 +253,18 @@ class AETHERWebSocketServer:
                     'result': result
                 })
             
+            elif action == 'batch':
+                result = await self.native_engine.run_batch(
+                    session_id,
+                    data.get('actions', []),
+                    stop_on_error=data.get('stop_on_error', True)
+                )
+                await self.send_message(websocket, {
+                    'type': 'batch_result',
+                    'messageId': data.get('messageId'),
+                    'result': result
+                })
+            
             elif action == 'get_performance':
                 result = await self.native_engine.get_performance_metrics(session_id)
                 await self.send_message(websocket, {
@@ -276,6 +312,15 @@ class AETHERWebSocketServer:
         except Exception as e:
             logger.error(f"❌ Failed to send message: {e}")
     
+    async def send_binary(self, websocket, header: Dict[str, Any], payload: bytes):
+        """Send a binary frame (JSON header + raw payload) to WebSocket client"""
+        try:
+            await websocket.send(pack_binary_frame(header, payload))
+        except ConnectionClosed:
+            pass  # Client disconnected
+        except Exception as e:
+            logger.error(f"❌ Failed to send binary frame: {e}")
+    
     async def send_error(self, websocket, error_message: str, messageId: str = None):
         """Send error message to WebSocket client"""
         error_data = {
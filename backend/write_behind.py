@@ -0,0 +1,207 @@
+"""
+AETHER Write-Behind Buffer
+Coalesces high-frequency inserts into insert_many batches flushed by size or time
+"""
+
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Set
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from database import get_async_database
+
+logger = logging.getLogger(__name__)
+
+# Per-document write errors that fail the same way on every retry:
+# duplicate key (already written) and document validation failure
+PERMANENT_WRITE_ERRORS = {11000, 11001, 121}
+
+@dataclass
+class WriteBehindConfig:
+    """Batch size, flush interval and memory bound of the write-behind buffer"""
+    max_batch: int = 500
+    flush_interval: float = 0.2  # seconds a document may wait before it is written
+    max_buffered: int = 10000  # per collection; inserts wait for a flush beyond this
+    max_retry_delay: float = 5.0  # backoff ceiling for retrying requeued documents
+    sync_collections: Set[str] = field(default_factory=set)  # written immediately, never buffered
+
+    @classmethod
+    def from_env(cls) -> "WriteBehindConfig":
+        sync_collections = os.getenv("MONGO_SYNC_WRITE_COLLECTIONS", "")
+        return cls(
+            max_batch=int(os.getenv("MONGO_WRITE_BATCH_SIZE", "500")),
+            flush_interval=float(os.getenv("MONGO_WRITE_FLUSH_MS", "200")) / 1000,
+            max_buffered=int(os.getenv("MONGO_WRITE_MAX_BUFFERED", "10000")),
+            max_retry_delay=float(os.getenv("MONGO_WRITE_MAX_RETRY_MS", "5000")) / 1000,
+            sync_collections={name.strip() for name in sync_collections.split(",") if name.strip()}
+        )
+
+class WriteBehindBuffer:
+    """Per-collection insert buffers drained with insert_many
+
+    A collection is flushed once it holds max_batch documents or its oldest
+    document has waited flush_interval, whichever comes first. Collections
+    marked durable bypass the buffer so the caller sees the write complete.
+    """
+
+    def __init__(self, config: Optional[WriteBehindConfig] = None):
+        self.config = config or WriteBehindConfig.from_env()
+        self.buffers: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._pending = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._size_flushes: Dict[str, asyncio.Task] = {}
+        self._retry_delay = 0.0  # grows while batches fail, reset by the next successful batch
+        self._closed = False
+
+        # Stats
+        self.stats = {
+            'documents_buffered': 0,
+            'documents_written': 0,
+            'documents_written_sync': 0,
+            'documents_dropped': 0,
+            'documents_rejected': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'size_flushes': 0,
+            'time_flushes': 0,
+            'retry_flushes': 0,
+            'backpressure_waits': 0
+        }
+
+    def set_durable(self, collection: str, durable: bool = True):
+        """Write a collection synchronously (durable) or through the buffer"""
+        if durable:
+            self.config.sync_collections.add(collection)
+        else:
+            self.config.sync_collections.discard(collection)
+
+    async def insert(self, collection: str, document: Dict[str, Any]):
+        """Queue a document for insertion, or insert it now if the collection is durable"""
+        if self._closed or collection in self.config.sync_collections:
+            await get_async_database()[collection].insert_one(document)
+            self.stats['documents_written_sync'] += 1
+            return
+
+        self._ensure_flusher()
+        buffer = self.buffers[collection]
+        if len(buffer) >= self.config.max_buffered:
+            # Bounded memory: the caller waits for the backlog to drain
+            self.stats['backpressure_waits'] += 1
+            await self.flush(collection)
+            if len(buffer) >= self.config.max_buffered:
+                # Flushes are failing; write through so the error reaches the caller
+                await get_async_database()[collection].insert_one(document)
+                self.stats['documents_written_sync'] += 1
+                return
+
+        buffer.append(document)
+        self.stats['documents_buffered'] += 1
+        self._pending.set()
+
+        if len(buffer) >= self.config.max_batch and collection not in self._size_flushes:
+            self.stats['size_flushes'] += 1
+            task = asyncio.create_task(self.flush(collection))
+            self._size_flushes[collection] = task
+            task.add_done_callback(lambda _: self._size_flushes.pop(collection, None))
+
+    def _ensure_flusher(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while not self._closed:
+            try:
+                await self._pending.wait()
+                retrying = self._retry_delay > 0
+                await asyncio.sleep(max(self.config.flush_interval, self._retry_delay))
+                self._pending.clear()
+                self.stats['retry_flushes' if retrying else 'time_flushes'] += 1
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Write-behind flush loop error: {e}")
+
+    async def flush(self, collection: Optional[str] = None):
+        """Write out one collection's buffer, or every buffer"""
+        names = [collection] if collection else list(self.buffers.keys())
+        for name in names:
+            async with self._locks[name]:
+                buffer = self.buffers[name]
+                while buffer:
+                    batch = buffer[:self.config.max_batch]
+                    del buffer[:self.config.max_batch]
+                    try:
+                        await get_async_database()[name].insert_many(batch, ordered=False)
+                        self.stats['documents_written'] += len(batch)
+                        self.stats['batches'] += 1
+                        self._retry_delay = 0.0
+                    except BulkWriteError as e:
+                        # Unordered insert: every document without a write error was written
+                        write_errors = e.details.get('writeErrors', [])
+                        retry = [batch[error['index']] for error in write_errors
+                                 if error.get('code') not in PERMANENT_WRITE_ERRORS]
+                        permanent = len(write_errors) - len(retry)
+                        self.stats['documents_written'] += e.details.get('nInserted', len(batch) - len(write_errors))
+                        self.stats['documents_rejected'] += permanent
+                        self.stats['batches'] += 1
+                        if permanent:
+                            logger.warning(f"⚠️ Write-behind insert into {name} rejected {permanent} documents: "
+                                           f"{write_errors[0].get('errmsg')}")
+                        if retry:
+                            self.stats['failed_batches'] += 1
+                            self._requeue(buffer, retry)
+                            break
+                    except PyMongoError as e:
+                        self.stats['failed_batches'] += 1
+                        logger.error(f"❌ Write-behind insert into {name} failed for {len(batch)} documents: {e}")
+                        self._requeue(buffer, batch)
+                        break
+
+    def _requeue(self, buffer: List[Dict[str, Any]], documents: List[Dict[str, Any]]):
+        """Put documents back while there is room, otherwise drop them
+
+        Requeued documents are retried by the flush loop after a doubling
+        backoff, so they are written even if no further insert arrives.
+        """
+        if len(buffer) + len(documents) > self.config.max_buffered:
+            self.stats['documents_dropped'] += len(documents)
+            return
+        buffer[:0] = documents
+        self._retry_delay = min(max(self._retry_delay * 2, self.config.flush_interval),
+                                self.config.max_retry_delay)
+        if not self._closed:
+            self._pending.set()
+            self._ensure_flusher()
+
+    async def close(self):
+        """Flush everything and switch to direct writes"""
+        self._closed = True
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        for task in list(self._size_flushes.values()):
+            try:
+                await task
+            except Exception:
+                pass
+        await self.flush()
+        logger.info("✅ Write-behind buffer flushed")
+
+    def get_stats(self) -> Dict[str, Any]:
+        batches = self.stats['batches']
+        return {
+            **self.stats,
+            'avg_batch_size': self.stats['documents_written'] / batches if batches else 0.0,
+            'buffered': {name: len(buffer) for name, buffer in self.buffers.items() if buffer},
+            'sync_collections': sorted(self.config.sync_collections),
+            'max_batch': self.config.max_batch,
+            'flush_interval_ms': self.config.flush_interval * 1000
+        }
+
+# Global instance
+write_behind = WriteBehindBuffer()